@@ -9,6 +9,9 @@ setup(
         "slack-sdk",
         "slack-bolt",
     ],
+    extras_require={
+        "speedups": ["numpy", "orjson"],
+    },
     package_data={
         "": ["*.webp", "*.png", "*.html", "*.lark", "*.json"],
     },
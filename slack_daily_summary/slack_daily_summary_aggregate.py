@@ -0,0 +1,277 @@
+import heapq
+from collections import defaultdict
+from typing import Dict, Any, Optional, List, Iterable, Callable, TypeVar
+
+from slack_daily_summary import slack_daily_summary_records
+from slack_daily_summary import slack_daily_summary_topics
+from slack_daily_summary.slack_daily_summary_records import MessageRecord, Interner
+
+
+T = TypeVar("T")
+
+# Longest leaderboard a recap can show
+MAX_LEADERBOARD = 10
+# Most frequent terms a channel-day keeps for trending topics, the long tail never trends anyway
+STATE_TERMS = 200
+
+
+def top_k(items: Iterable[T], k: int, rank: Callable[[T], tuple]) -> List[T]:
+    # The k items with the smallest rank, best first. nsmallest keeps a bounded heap of k, so a leaderboard over n
+    # candidates costs O(n log k) instead of a full sort. Ranks end in a timestamp or id, so ties break the same
+    # whatever order the candidates arrived or were merged in.
+    return heapq.nsmallest(k, items, key=rank)
+
+
+class Accumulator:
+    # One metric, updated message by message, so adding a metric never costs another pass over the data.
+    # state() is JSON and uses real Slack ids, so partial results for one channel-day can be stored and merged later.
+    name = ""
+
+    def add(self, rec: MessageRecord) -> None:
+        raise NotImplementedError()
+
+    def add_thread(self, thread_ts: str, replies: int, text: str) -> None:
+        # Thread activity in the window, fed separately since replies to older threads are not messages of the window
+        pass
+
+    def result(self) -> Any:
+        raise NotImplementedError()
+
+    def state(self) -> Any:
+        raise NotImplementedError()
+
+    def merge(self, state: Any) -> None:
+        raise NotImplementedError()
+
+
+class TopThread(Accumulator):
+    name = "top_thread"
+
+    def __init__(self, k: int = MAX_LEADERBOARD):
+        self.k = k
+        self.threads: Dict[str, Dict[str, Any]] = {}
+
+    def add(self, rec: MessageRecord) -> None:
+        pass
+
+    def add_thread(self, thread_ts: str, replies: int, text: str) -> None:
+        self._offer(thread_ts, replies, text)
+
+    def _offer(self, thread_ts: str, reply_count: int, text: str) -> None:
+        # Within one window a thread is counted once, by its largest count
+        if reply_count > 0:
+            if thread_ts not in self.threads or reply_count > self.threads[thread_ts]["reply_count"]:
+                self.threads[thread_ts] = {
+                    "text": text,
+                    "reply_count": reply_count,
+                }
+
+    def ranked(self, k: int) -> List[tuple]:
+        # Most replies first, the earliest thread on ties
+        return top_k(self.threads.items(), k, lambda x: (-x[1]["reply_count"], float(x[0])))
+
+    def result(self) -> List[Dict[str, Any]]:
+        return [t for _, t in self.ranked(self.k)]
+
+    def state(self) -> List[list]:
+        # Every thread with replies, a thread outside one day's top can still lead once its days add up
+        return [[thread_ts, t["reply_count"], t["text"]] for thread_ts, t in self.ranked(len(self.threads))]
+
+    def merge(self, state: List[list]) -> None:
+        # Each channel-day state counts the replies posted that day, so a thread spanning days adds up
+        for thread_ts, reply_count, text in state:
+            if thread_ts in self.threads:
+                self.threads[thread_ts]["reply_count"] += reply_count
+            else:
+                self._offer(thread_ts, reply_count, text)
+
+
+class MostActiveChannels(Accumulator):
+    name = "most_active_channels"
+
+    def __init__(self, channel_names: Dict[str, str], channels: Interner, k: int = MAX_LEADERBOARD):
+        self.channel_names = channel_names
+        self.channels = channels
+        self.k = k
+        self.counts: Dict[int, int] = defaultdict(int)
+
+    def add(self, rec: MessageRecord) -> None:
+        self.counts[rec.channel] += 1
+
+    def result(self) -> List[tuple]:
+        named = ((self.channel_names.get(self.channels.value(channel), "unknown"), count) for channel, count in self.counts.items())
+        return top_k(named, self.k, lambda x: (-x[1], x[0]))
+
+    def state(self) -> Dict[str, int]:
+        return {self.channels.value(channel): count for channel, count in self.counts.items()}
+
+    def merge(self, state: Dict[str, int]) -> None:
+        for channel_id, count in state.items():
+            self.counts[self.channels.intern(channel_id)] += count
+
+
+class MostHelpfulUser(Accumulator):
+    name = "most_helpful_user"
+
+    def __init__(self, users: Interner, k: int = MAX_LEADERBOARD):
+        self.users = users
+        self.k = k
+        self.reactions: Dict[int, int] = defaultdict(int)
+
+    def add(self, rec: MessageRecord) -> None:
+        if rec.user != slack_daily_summary_records.NO_USER:
+            self.reactions[rec.user] += rec.reaction_count
+
+    def result(self) -> List[tuple]:
+        scored = ((self.users.value(user), n) for user, n in self.reactions.items() if n)
+        return top_k(scored, self.k, lambda x: (-x[1], x[0]))
+
+    def state(self) -> Dict[str, int]:
+        return {self.users.value(user): n for user, n in self.reactions.items() if n}
+
+    def merge(self, state: Dict[str, int]) -> None:
+        for user_id, n in state.items():
+            self.reactions[self.users.intern(user_id)] += n
+
+
+class Totals(Accumulator):
+    name = "totals"
+
+    def __init__(self, users: Interner):
+        self.user_index = users
+        self.messages = 0
+        self.users = set()
+
+    def add(self, rec: MessageRecord) -> None:
+        self.messages += 1
+        if rec.user != slack_daily_summary_records.NO_USER:
+            self.users.add(rec.user)
+
+    def result(self) -> Dict[str, int]:
+        return {"messages": self.messages, "active_members": len(self.users)}
+
+    def state(self) -> Dict[str, Any]:
+        return {"messages": self.messages, "users": [self.user_index.value(u) for u in self.users]}
+
+    def merge(self, state: Dict[str, Any]) -> None:
+        self.messages += state["messages"]
+        self.users.update(self.user_index.intern(u) for u in state["users"])
+
+
+class TrendingTopics(Accumulator):
+    name = "trending_topics"
+
+    def __init__(self):
+        # Document frequency: in how many messages each term appears
+        self.docs = 0
+        self.terms: Dict[str, int] = defaultdict(int)
+
+    def add(self, rec: MessageRecord) -> None:
+        self.docs += 1
+        for term in slack_daily_summary_topics.terms(rec.text):
+            self.terms[term] += 1
+
+    def result(self) -> Dict[str, Any]:
+        # Raw frequencies, the pipeline turns them into trending terms against the stored baseline
+        return {"docs": self.docs, "terms": dict(self.terms)}
+
+    def state(self) -> Dict[str, Any]:
+        return {"docs": self.docs, "terms": dict(top_k(self.terms.items(), STATE_TERMS, lambda x: (-x[1], x[0])))}
+
+    def merge(self, state: Dict[str, Any]) -> None:
+        self.docs += state["docs"]
+        for term, n in state["terms"].items():
+            self.terms[term] += n
+
+
+class AggregationEngine:
+    def __init__(self, accumulators: List[Accumulator]):
+        self.accumulators = accumulators
+
+    def add_page(self, page: List[MessageRecord]) -> None:
+        for rec in page:
+            for acc in self.accumulators:
+                acc.add(rec)
+
+    def add_threads(self, threads: List[tuple]) -> None:
+        for thread_ts, replies, text in threads:
+            for acc in self.accumulators:
+                acc.add_thread(thread_ts, replies, text)
+
+    def results(self) -> Dict[str, Any]:
+        return {acc.name: acc.result() for acc in self.accumulators}
+
+    def state(self) -> Dict[str, Any]:
+        return {acc.name: acc.state() for acc in self.accumulators}
+
+    def merge(self, state: Dict[str, Any]) -> None:
+        for acc in self.accumulators:
+            if acc.name in state:
+                acc.merge(state[acc.name])
+
+
+def default_accumulators(channel_names: Dict[str, str], channels: Interner, users: Interner) -> List[Accumulator]:
+    return [
+        TopThread(),
+        MostActiveChannels(channel_names, channels),
+        MostHelpfulUser(users),
+        Totals(users),
+        TrendingTopics(),
+    ]
+
+
+def format_section(emoji: str, title: str, plural_title: str, entries: List[str]) -> List[str]:
+    # One entry stays a single line under the singular heading, even when more were asked for.
+    # Longer leaderboards become a numbered list under the plural one.
+    if len(entries) == 1:
+        return [f"{emoji} {title}: {entries[0]}"]
+    return [f"{emoji} {plural_title}:"] + [f"   {i}. {entry}" for i, entry in enumerate(entries, 1)]
+
+
+def format_summary(
+    results: Dict[str, Any],
+    usernames: Dict[str, str],
+    period: str = "Yesterday",
+    digest_name: Optional[str] = None,
+    top_n: int = 1,
+) -> str:
+    title = "Daily Slack Recap" if " – " not in period else "Slack Recap"
+    suffix = f" · {digest_name}" if digest_name else ""
+    summary_parts = [f"📊 {title} ({period}){suffix}\n"]
+
+    top_threads = (results.get("top_thread") or [])[:top_n]
+    if top_threads:
+        entries = []
+        for thread in top_threads:
+            thread_text = thread["text"][:60] + ("..." if len(thread["text"]) > 60 else "")
+            entries.append(f'"{thread_text}" ({thread["reply_count"]} replies)')
+        summary_parts += format_section("🔥", "Top thread", "Top threads", entries)
+
+    most_active_channels = (results.get("most_active_channels") or [])[:top_n]
+    if most_active_channels:
+        entries = [f"#{channel_name} ({count} messages)" for channel_name, count in most_active_channels]
+        summary_parts += format_section("💬", "Most active", "Most active", entries)
+
+    most_helpful_users = (results.get("most_helpful_user") or [])[:top_n]
+    if most_helpful_users:
+        entries = [f"@{usernames.get(user_id, user_id)} ({reaction_count} reactions)" for user_id, reaction_count in most_helpful_users]
+        summary_parts += format_section("⭐", "Shoutout", "Shoutouts", entries)
+
+    open_questions = (results.get("open_question") or [])[:top_n]
+    if open_questions:
+        entries = []
+        for question in open_questions:
+            text = question["text"][:80] + ("..." if len(question["text"]) > 80 else "")
+            asked = f", {question['age_days']}d open" if question["age_days"] else ""
+            entries.append(f'"{text}" (#{question["channel"]}{asked})')
+        summary_parts += format_section("❓", "Open question", "Open questions", entries)
+
+    trending_topics = results.get("trending_topics")
+    if isinstance(trending_topics, list) and trending_topics:
+        summary_parts.append("🔎 Trending: " + ", ".join(trending_topics))
+
+    totals = results.get("totals")
+    if totals:
+        summary_parts.append(f"📈 {totals['messages']} messages · {totals['active_members']} active members")
+
+    return "\n".join(summary_parts)
@@ -0,0 +1,158 @@
+import argparse
+import asyncio
+import json
+import logging
+import time
+import tracemalloc
+from typing import Dict, Any, List
+
+from slack_daily_summary import slack_daily_summary_fetch
+from slack_daily_summary import slack_daily_summary_store
+from slack_daily_summary import slack_daily_summary_channels
+from slack_daily_summary import slack_daily_summary_aggregate
+from slack_daily_summary import slack_daily_summary_records
+from slack_daily_summary import slack_daily_summary_pipeline
+from slack_daily_summary import slack_daily_summary_fakeslack
+from slack_daily_summary import slack_daily_summary_metrics
+from slack_daily_summary import slack_daily_summary_http
+
+# The fake server has no real limits, this keeps the limiter in the path without making it the bottleneck
+UNTHROTTLED_TIER = (600_000, 10_000)
+
+
+def unthrottled_limiter() -> slack_daily_summary_fetch.SlackRateLimiter:
+    return slack_daily_summary_fetch.SlackRateLimiter({m: UNTHROTTLED_TIER for m in slack_daily_summary_fetch.SLACK_METHOD_TIERS})
+
+
+def time_metrics(store: slack_daily_summary_store.SummaryStore, channel_names: Dict[str, str], oldest: float, latest: float) -> Dict[str, float]:
+    channels = slack_daily_summary_records.Interner()
+    users = slack_daily_summary_records.Interner()
+    pages = list(store.iter_records(oldest, latest, channels, users))
+    timings = {}
+    for acc in slack_daily_summary_aggregate.default_accumulators(channel_names, channels, users):
+        t0 = time.perf_counter()
+        for page in pages:
+            for rec in page:
+                acc.add(rec)
+        acc.result()
+        timings[acc.name] = time.perf_counter() - t0
+    return timings
+
+
+async def bench_one(channels: int, args: argparse.Namespace) -> Dict[str, Any]:
+    workspace = slack_daily_summary_fakeslack.SyntheticWorkspace(
+        channels=channels,
+        users=args.users,
+        mean_messages=args.mean_messages,
+        idle_fraction=args.idle_fraction,
+        seed=args.seed,
+        member_fraction=args.member_fraction,
+    )
+    server = slack_daily_summary_fakeslack.FakeSlackServer(workspace, args.rate_limit_probability, seed=args.seed)
+    url = await server.start()
+    limiter = slack_daily_summary_fetch.SlackRateLimiter() if args.real_tiers else unthrottled_limiter()
+    # The bot's own transport, so connection reuse shows up in the numbers
+    slack_client = slack_daily_summary_http.web_client("xoxb-fake", base_url=url)
+    store = slack_daily_summary_store.SummaryStore(":memory:")
+    channel_directory = slack_daily_summary_channels.ChannelDirectory(slack_client, store, limiter, discovery=args.discovery)
+
+    report: Dict[str, Any] = {"channels": channels, "messages": workspace.total_messages()}
+    try:
+        for run in ("cold", "warm"):
+            server.calls.clear()
+            server.rate_limited.clear()
+            metrics = slack_daily_summary_metrics.RunMetrics()
+            tracemalloc.start()
+            t0 = time.perf_counter()
+            summary = await slack_daily_summary_pipeline.generate_summary(
+                slack_client,
+                "UBOT",
+                "bob-testing",
+                limiter=limiter,
+                concurrency=args.concurrency,
+                store=store,
+                channel_directory=channel_directory,
+                idle_channel_days=0,
+                metrics=metrics,
+                post=False,
+            )
+            wall = time.perf_counter() - t0
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            report[run] = {
+                "wall_seconds": round(wall, 3),
+                "peak_mb": round(peak / 1e6, 2),
+                "messages_per_second": round(workspace.total_messages() / wall, 1) if wall else 0,
+                "api_calls": dict(server.calls),
+                "rate_limited": dict(server.rate_limited),
+                "summarized": bool(summary),
+                "phase_seconds": metrics.snapshot()["phase_seconds"],
+                "connections_created": metrics.counters["http_connections_created"],
+                "connections_reused": metrics.counters["http_connections_reused"],
+            }
+
+        channel_names = {c["id"]: c["name"] for c in workspace.channels}
+        timings = time_metrics(store, channel_names, workspace.day_start, workspace.day_start + 86400)
+        report["metric_seconds"] = {k: round(v, 4) for k, v in timings.items()}
+    finally:
+        store.close()
+        await server.stop()
+    return report
+
+
+async def bench(args: argparse.Namespace) -> List[Dict[str, Any]]:
+    reports = []
+    try:
+        for size in args.sizes:
+            report = await bench_one(size, args)
+            reports.append(report)
+            if not args.json:
+                cold, warm = report["cold"], report["warm"]
+                print(
+                    f"{size:>6} channels {report['messages']:>8} messages | "
+                    f"cold {cold['wall_seconds']:>7}s {sum(cold['api_calls'].values()):>6} calls "
+                    f"{sum(cold['rate_limited'].values()):>4} 429s {cold['connections_created']:>4} conns {cold['peak_mb']:>7}MB {cold['messages_per_second']:>9} msg/s | "
+                    f"warm {warm['wall_seconds']:>7}s {sum(warm['api_calls'].values()):>6} calls"
+                )
+                print("       metrics: " + ", ".join(f"{k} {v * 1000:.1f}ms" for k, v in report["metric_seconds"].items()))
+    finally:
+        await slack_daily_summary_http.close_shared_sessions()
+    return reports
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the daily summary pipeline against a local fake Slack API")
+    parser.add_argument("--sizes", type=lambda s: [int(x) for x in s.split(",")], default=[50, 500, 2000], help="Comma separated channel counts")
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--mean-messages", type=float, default=30.0, help="Scale of the per-channel message count distribution")
+    parser.add_argument("--idle-fraction", type=float, default=0.6, help="Share of channels with no messages")
+    parser.add_argument("--member-fraction", type=float, default=1.0, help="Share of channels the bot is a member of and can read")
+    parser.add_argument("--discovery", choices=slack_daily_summary_channels.DISCOVERY_MODES, default=slack_daily_summary_channels.DISCOVERY_MEMBER)
+    parser.add_argument("--rate-limit-probability", type=float, default=0.0, help="Chance that any call gets a 429")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--real-tiers", action="store_true", help="Pace calls with Slack's real tier limits")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", action="store_true", help="Print the full report as JSON")
+    parser.add_argument("--verbose", action="store_true", help="Show the pipeline's own logging")
+    parser.add_argument("--serve", type=int, metavar="PORT", help="Only run the fake Slack API for the first size, e.g. to point a real bot at it")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO if args.verbose or args.serve else logging.WARNING, format="%(asctime)s %(message)s")
+    if args.serve:
+        workspace = slack_daily_summary_fakeslack.SyntheticWorkspace(
+            channels=args.sizes[0],
+            users=args.users,
+            mean_messages=args.mean_messages,
+            idle_fraction=args.idle_fraction,
+            seed=args.seed,
+            member_fraction=args.member_fraction,
+        )
+        asyncio.run(slack_daily_summary_fakeslack.serve_forever(workspace, args.serve, args.rate_limit_probability))
+        return
+    reports = asyncio.run(bench(args))
+    if args.json:
+        print(json.dumps(reports, indent=2))
+
+
+if __name__ == "__main__":
+    main()
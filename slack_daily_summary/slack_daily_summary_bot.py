@@ -1,12 +1,10 @@
 import asyncio
 import logging
 import json
-import time
-from datetime import datetime, timezone, timedelta
-from typing import Dict, Any, Optional, List
-from collections import defaultdict
+import os
+from datetime import datetime, timedelta
+from typing import Dict, Any
 
-from slack_sdk.web.async_client import AsyncWebClient
 from slack_sdk.errors import SlackApiError
 
 from flexus_client_kit import ckit_client
@@ -17,6 +15,18 @@ from flexus_client_kit import ckit_ask_model
 from flexus_client_kit.integrations import fi_slack
 
 from slack_daily_summary import slack_daily_summary_install
+from slack_daily_summary import slack_daily_summary_fetch
+from slack_daily_summary import slack_daily_summary_store
+from slack_daily_summary import slack_daily_summary_channels
+from slack_daily_summary import slack_daily_summary_users
+from slack_daily_summary import slack_daily_summary_realtime
+from slack_daily_summary import slack_daily_summary_pipeline
+from slack_daily_summary import slack_daily_summary_metrics
+from slack_daily_summary import slack_daily_summary_rollups
+from slack_daily_summary import slack_daily_summary_digests
+from slack_daily_summary import slack_daily_summary_aggregate
+from slack_daily_summary import slack_daily_summary_http
+from slack_daily_summary import slack_daily_summary_workspace
 
 logger = logging.getLogger("slack_daily_summary")
 
@@ -26,17 +36,60 @@ BOT_VERSION = "0.1.2"
 GENERATE_SUMMARY_TOOL = ckit_cloudtool.CloudTool(
     strict=True,
     name="generate_daily_summary",
-    description="Generate and post the daily Slack summary for the previous calendar day (IST timezone).",
+    description="Generate and post the Slack summary for the previous calendar day, or for a date range such as last week or last month.",
     parameters={
         "type": "object",
-        "properties": {},
-        "required": [],
+        "properties": {
+            "start_date": {
+                "type": ["string", "null"],
+                "description": "First day to summarize as YYYY-MM-DD, null for yesterday",
+            },
+            "end_date": {
+                "type": ["string", "null"],
+                "description": "Last day to summarize as YYYY-MM-DD (inclusive), null for the same day as start_date",
+            },
+            "timezone": {
+                "type": ["string", "null"],
+                "description": "IANA timezone for day boundaries, null for the configured one",
+            },
+            "include_metrics": {
+                "type": "boolean",
+                "description": "Append timing, API call and rate-limit metrics of this run to the result. Use false unless asked why a run was slow.",
+            },
+        },
+        "required": ["start_date", "end_date", "timezone", "include_metrics"],
+        "additionalProperties": False,
+    },
+)
+
+BACKFILL_ROLLUPS_TOOL = ckit_cloudtool.CloudTool(
+    strict=True,
+    name="backfill_daily_rollups",
+    description="Fetch history and precompute daily rollups for a date range without posting, so later weekly or monthly summaries are instant.",
+    parameters={
+        "type": "object",
+        "properties": {
+            "start_date": {
+                "type": "string",
+                "description": "First day to backfill as YYYY-MM-DD",
+            },
+            "end_date": {
+                "type": "string",
+                "description": "Last day to backfill as YYYY-MM-DD (inclusive)",
+            },
+            "timezone": {
+                "type": ["string", "null"],
+                "description": "IANA timezone for day boundaries, null for the configured one",
+            },
+        },
+        "required": ["start_date", "end_date", "timezone"],
         "additionalProperties": False,
     },
 )
 
 TOOLS = [
     GENERATE_SUMMARY_TOOL,
+    BACKFILL_ROLLUPS_TOOL,
     fi_slack.SLACK_TOOL,
 ]
 
@@ -50,23 +103,166 @@ async def slack_daily_summary_main_loop(fclient: ckit_client.FlexusClient, rcx:
     SLACK_BOT_TOKEN = setup.get("SLACK_BOT_TOKEN", "")
     SLACK_APP_TOKEN = setup.get("SLACK_APP_TOKEN", "")
     target_channel = setup.get("target_channel", "bob-testing")
+    leaderboard_size = max(1, min(slack_daily_summary_aggregate.MAX_LEADERBOARD, int(setup.get("leaderboard_size", 1))))
+    try:
+        digests = slack_daily_summary_digests.parse_digests(setup.get("digests", ""), target_channel, leaderboard_size)
+    except ValueError as e:
+        logger.error(f"Invalid digests setup, posting one recap of every channel to #{target_channel}: {e}")
+        digests = [slack_daily_summary_digests.default_digest(target_channel, leaderboard_size)]
+    summary_timezone = setup.get("summary_timezone", "") or slack_daily_summary_rollups.DEFAULT_TIMEZONE
+    try:
+        slack_daily_summary_rollups.parse_timezone(summary_timezone)
+    except ValueError as e:
+        logger.error(f"Invalid summary_timezone, using {slack_daily_summary_rollups.DEFAULT_TIMEZONE}: {e}")
+        summary_timezone = slack_daily_summary_rollups.DEFAULT_TIMEZONE
+    fetch_concurrency = int(setup.get("fetch_concurrency", 8))
+    aggregation_processes = int(setup.get("aggregation_processes", 0))
+    store_path = setup.get("store_path", "")
+    channel_discovery = setup.get("channel_discovery", "") or slack_daily_summary_channels.DISCOVERY_MEMBER
+    if channel_discovery not in slack_daily_summary_channels.DISCOVERY_MODES:
+        logger.warning(f"Unknown channel_discovery {channel_discovery!r}, using {slack_daily_summary_channels.DISCOVERY_MEMBER}")
+        channel_discovery = slack_daily_summary_channels.DISCOVERY_MEMBER
+    channel_cache_ttl_minutes = float(setup.get("channel_cache_ttl_minutes", 60))
+    user_cache_ttl_hours = float(setup.get("user_cache_ttl_hours", 24))
+    idle_channel_days = float(setup.get("idle_channel_days", 14))
+    metrics_textfile = setup.get("metrics_textfile", "")
+    thread_lookback_days = float(setup.get("thread_lookback_days", 7))
+    precompute_delay_minutes = int(setup.get("precompute_delay_minutes", 10))
+    precompute_rate_percent = int(setup.get("precompute_rate_percent", 30))
+    http_timeout_seconds = max(1, int(setup.get("http_timeout_seconds", slack_daily_summary_http.DEFAULT_TIMEOUT_SECONDS)))
 
     slack_client = None
+    limiter = slack_daily_summary_fetch.SlackRateLimiter()
+    workspace = None
     bot_user_id = None
+    store = None
+    channel_directory = None
+    user_directory = None
+    realtime = None
+    precompute_task = None
+    precompute_run = None
+    # The background precompute and tool calls share the store, one summary run at a time
+    run_lock = asyncio.Lock()
 
     if SLACK_BOT_TOKEN:
         try:
-            slack_client = AsyncWebClient(token=SLACK_BOT_TOKEN)
+            slack_client = slack_daily_summary_http.web_client(SLACK_BOT_TOKEN, http_timeout_seconds)
             auth_response = await slack_client.auth_test()
             bot_user_id = auth_response["user_id"]
             logger.info(f"Bot authenticated as user_id: {bot_user_id}")
-        except SlackApiError as e:
-            logger.error(f"Failed to authenticate with Slack: {e}")
+            store = slack_daily_summary_store.SummaryStore(
+                store_path or slack_daily_summary_store.default_store_path(auth_response.get("team_id", "")),
+            )
+            logger.info(f"Using message store {store.path}")
+            # Personas of the same bot in this workspace share one rate limit budget and their identical reads.
+            # Released by the finally below, or right away if the rest of setup fails
+            workspace = slack_daily_summary_workspace.acquire(SLACK_BOT_TOKEN, auth_response.get("team_id", ""))
+            limiter = workspace.limiter
+            channel_directory = slack_daily_summary_channels.ChannelDirectory(
+                slack_client,
+                store,
+                limiter,
+                ttl_seconds=channel_cache_ttl_minutes * 60,
+                discovery=channel_discovery,
+            )
+            user_directory = slack_daily_summary_users.UserDirectory(
+                slack_client,
+                store,
+                limiter,
+                ttl_seconds=user_cache_ttl_hours * 3600,
+            )
+        except Exception as e:
+            if isinstance(e, SlackApiError):
+                logger.error(f"Failed to authenticate with Slack: {e}")
+            else:
+                # An unwritable store path or a corrupt store, the persona keeps running without summaries
+                logger.exception(f"Failed to set up Slack summaries: {e}")
+            if workspace:
+                slack_daily_summary_workspace.release(SLACK_BOT_TOKEN)
+                workspace = None
+                limiter = slack_daily_summary_fetch.SlackRateLimiter()
+            if store:
+                store.close()
+                store = None
             slack_client = None
             bot_user_id = None
     else:
         logger.warning("SLACK_BOT_TOKEN not configured, bot will run but cannot generate summaries until configured")
 
+    if slack_client and SLACK_APP_TOKEN:
+        try:
+            realtime = slack_daily_summary_realtime.RealtimeIngestor(SLACK_APP_TOKEN, slack_client, store)
+            await realtime.start()
+        except Exception as e:
+            logger.error(f"Failed to start Socket Mode, summaries will fetch history instead: {e}")
+            realtime = None
+
+    async def precompute_once(background_limiter: slack_daily_summary_fetch.SlackRateLimiter) -> bool:
+        # False when a summary request preempted it, what it fetched and rolled up so far stays in the store
+        nonlocal precompute_run
+        metrics = slack_daily_summary_metrics.RunMetrics()
+        async with run_lock:
+            run = precompute_run = asyncio.ensure_future(slack_daily_summary_pipeline.precompute_summaries(
+                slack_client,
+                bot_user_id,
+                digests,
+                store,
+                tz_name=summary_timezone,
+                limiter=background_limiter,
+                concurrency=max(1, fetch_concurrency // 2),
+                channel_directory=channel_directory,
+                user_directory=user_directory,
+                idle_channel_days=idle_channel_days,
+                thread_lookback_days=thread_lookback_days,
+                aggregation_processes=aggregation_processes,
+                realtime=realtime,
+                metrics=metrics,
+            ))
+            try:
+                await asyncio.wait([run])
+            finally:
+                run.cancel()
+                precompute_run = None
+        logger.info(f"Precompute run metrics: {json.dumps(metrics.snapshot())}")
+        if run.cancelled():
+            logger.info("Background precompute gave way to a summary request, trying again once it is done")
+            return False
+        run.result()
+        return True
+
+    async def precompute_loop() -> None:
+        share = max(1, min(100, precompute_rate_percent)) / 100.0
+        background_limiter = workspace.background_limiter(share) if workspace else limiter.scaled(share)
+        # A restart after the delay runs it right away, precompute_summaries skips days it already did
+        done_day = None
+        while not ckit_shutdown.shutdown_event.is_set():
+            try:
+                now = datetime.now(slack_daily_summary_rollups.parse_timezone(summary_timezone))
+                run_at = datetime.combine(now.date(), datetime.min.time(), tzinfo=now.tzinfo) + timedelta(minutes=precompute_delay_minutes)
+                if now < run_at or done_day == now.date():
+                    wake_at = run_at if now < run_at else run_at + timedelta(days=1)
+                    await asyncio.sleep(min(60.0, max(1.0, (wake_at - now).total_seconds())))
+                    continue
+                done_day = now.date()
+                if not await precompute_once(background_limiter):
+                    done_day = None
+            except Exception as e:
+                logger.error(f"Background precompute failed, the scheduled run will compute from scratch: {e}", exc_info=True)
+                await asyncio.sleep(60.0)
+
+    def preempt_precompute() -> None:
+        # Summary requests go first, a throttled background run would hold the lock for its whole fetch
+        if precompute_run is not None and not precompute_run.done():
+            logger.info("Preempting the background precompute for a summary request")
+            precompute_run.cancel()
+
+    # Without Socket Mode nothing sees the reactions and edits after midnight, the scheduled run would recompute anyway
+    if slack_client and bot_user_id and precompute_delay_minutes >= 0:
+        if realtime:
+            precompute_task = asyncio.create_task(precompute_loop())
+        else:
+            logger.info("Background precompute needs Socket Mode (SLACK_APP_TOKEN), not starting it")
+
     @rcx.on_updated_message
     async def updated_message_in_db(msg: ckit_ask_model.FThreadMessageOutput):
         pass
@@ -80,17 +276,94 @@ async def slack_daily_summary_main_loop(fclient: ckit_client.FlexusClient, rcx:
         if not slack_client or not bot_user_id:
             return "Configuration required: Please set SLACK_BOT_TOKEN in bot setup to enable summary generation. Go to bot settings to configure the token with required scopes: channels:read, channels:history, chat:write, reactions:read, users:read"
 
-        logger.info("Generating daily summary")
+        start_date = model_produced_args.get("start_date")
+        end_date = model_produced_args.get("end_date")
+        tz_name = model_produced_args.get("timezone") or summary_timezone
+        logger.info(f"Generating summary for {start_date or 'yesterday'} to {end_date or start_date or 'yesterday'} ({tz_name})")
+        metrics = slack_daily_summary_metrics.RunMetrics()
 
         try:
-            summary_text = await generate_summary(slack_client, bot_user_id, target_channel)
-            if not summary_text:
-                return "No activity detected for yesterday. Skipping summary post."
-
-            return f"Summary generated and posted successfully:\n\n{summary_text}"
+            preempt_precompute()
+            async with run_lock:
+                results = await slack_daily_summary_pipeline.generate_summaries(
+                    slack_client,
+                    bot_user_id,
+                    digests,
+                    limiter=limiter,
+                    concurrency=fetch_concurrency,
+                    store=store,
+                    channel_directory=channel_directory,
+                    user_directory=user_directory,
+                    idle_channel_days=idle_channel_days,
+                    thread_lookback_days=thread_lookback_days,
+                    aggregation_processes=aggregation_processes,
+                    realtime=realtime,
+                    metrics=metrics,
+                    start_date=start_date,
+                    end_date=end_date,
+                    tz_name=tz_name,
+                )
+            parts = []
+            for r in results:
+                where = f"#{r.digest.target_channel}" if r.digest.is_default() else f"digest {r.digest.name} in #{r.digest.target_channel}"
+                if not r.summary_text:
+                    parts.append(f"No activity detected for {where} in the requested period. Skipping summary post.")
+                elif r.already_posted:
+                    parts.append(f"This summary was already posted to {where}, not posting it again:\n\n{r.summary_text}")
+                else:
+                    parts.append(f"Summary generated and posted successfully to {where}:\n\n{r.summary_text}")
+            result = "\n\n".join(parts)
         except Exception as e:
             logger.error(f"Failed to generate summary: {e}", exc_info=True)
-            return f"Error generating summary: {type(e).__name__}: {e}"
+            result = f"Error generating summary: {type(e).__name__}: {e}"
+
+        logger.info(f"Summary run metrics: {json.dumps(metrics.snapshot())}")
+        if metrics_textfile:
+            try:
+                with open(metrics_textfile + ".tmp", "w") as f:
+                    f.write(metrics.to_prometheus())
+                os.replace(metrics_textfile + ".tmp", metrics_textfile)
+            except OSError as e:
+                logger.warning(f"Failed to write metrics to {metrics_textfile}: {e}")
+        if model_produced_args.get("include_metrics"):
+            result += f"\n\nRun metrics:\n{json.dumps(metrics.snapshot(), indent=2)}"
+        return result
+
+    @rcx.on_tool_call(BACKFILL_ROLLUPS_TOOL.name)
+    async def toolcall_backfill_rollups(toolcall: ckit_cloudtool.FCloudtoolCall, model_produced_args: Dict[str, Any]) -> str:
+        if not slack_client or not bot_user_id:
+            return "Configuration required: Please set SLACK_BOT_TOKEN in bot setup to enable summary generation."
+
+        tz_name = model_produced_args.get("timezone") or summary_timezone
+        metrics = slack_daily_summary_metrics.RunMetrics()
+        try:
+            preempt_precompute()
+            async with run_lock:
+                await slack_daily_summary_pipeline.generate_summaries(
+                    slack_client,
+                    bot_user_id,
+                    digests,
+                    limiter=limiter,
+                    concurrency=fetch_concurrency,
+                    store=store,
+                    channel_directory=channel_directory,
+                    user_directory=user_directory,
+                    idle_channel_days=idle_channel_days,
+                    thread_lookback_days=thread_lookback_days,
+                    aggregation_processes=aggregation_processes,
+                    realtime=realtime,
+                    metrics=metrics,
+                    start_date=model_produced_args["start_date"],
+                    end_date=model_produced_args["end_date"],
+                    tz_name=tz_name,
+                    post=False,
+                )
+        except Exception as e:
+            logger.error(f"Failed to backfill rollups: {e}", exc_info=True)
+            return f"Error backfilling rollups: {type(e).__name__}: {e}"
+        rolled_up = metrics.counters.get("days_rolled_up", 0)
+        cached = metrics.counters.get("days_from_rollups", 0)
+        return f"Backfilled {rolled_up} days, {cached} were already rolled up ({tz_name})."
 
     @rcx.on_tool_call(fi_slack.SLACK_TOOL.name)
     async def toolcall_slack(toolcall: ckit_cloudtool.FCloudtoolCall, model_produced_args: Dict[str, Any]) -> str:
@@ -102,248 +375,17 @@ async def slack_daily_summary_main_loop(fclient: ckit_client.FlexusClient, rcx:
         while not ckit_shutdown.shutdown_event.is_set():
             await rcx.unpark_collected_events(sleep_if_no_work=10.0)
     finally:
+        if precompute_task:
+            precompute_task.cancel()
+        if realtime:
+            await realtime.stop()
+        if store:
+            store.close()
+        if workspace:
+            slack_daily_summary_workspace.release(SLACK_BOT_TOKEN)
         logger.info(f"{rcx.persona.persona_id} exit")
 
 
-async def generate_summary(slack_client: AsyncWebClient, bot_user_id: str, target_channel: str) -> Optional[str]:
-    IST = timezone(timedelta(hours=5, minutes=30))
-
-    now_ist = datetime.now(IST)
-    yesterday_start = datetime.combine(now_ist.date() - timedelta(days=1), datetime.min.time(), tzinfo=IST)
-    yesterday_end = datetime.combine(now_ist.date() - timedelta(days=1), datetime.max.time(), tzinfo=IST)
-
-    oldest_ts = yesterday_start.timestamp()
-    latest_ts = yesterday_end.timestamp()
-
-    logger.info(f"Analyzing activity from {yesterday_start} to {yesterday_end} IST")
-
-    channels = await fetch_all_channels(slack_client)
-    logger.info(f"Found {len(channels)} public channels")
-
-    all_messages = []
-    user_ids = set()
-
-    for channel in channels:
-        channel_id = channel["id"]
-        channel_name = channel["name"]
-
-        try:
-            messages = await fetch_channel_history(slack_client, channel_id, oldest_ts, latest_ts)
-
-            for msg in messages:
-                if msg.get("user") == bot_user_id:
-                    continue
-
-                msg["channel_name"] = channel_name
-                all_messages.append(msg)
-
-                if msg.get("user"):
-                    user_ids.add(msg["user"])
-
-        except SlackApiError as e:
-            logger.warning(f"Failed to fetch history for {channel_name}: {e}")
-            continue
-
-    if not all_messages:
-        logger.info("No messages found for yesterday")
-        return None
-
-    logger.info(f"Found {len(all_messages)} messages from {len(user_ids)} unique users")
-
-    top_thread = find_top_thread(all_messages)
-    most_active_channels = find_most_active_channels(all_messages)
-    most_helpful_user = await find_most_helpful_user(all_messages, slack_client)
-    open_question = find_open_question(all_messages)
-
-    total_messages = len(all_messages)
-    active_members = len(user_ids)
-
-    summary_parts = ["📊 Daily Slack Recap (Yesterday)\n"]
-
-    if top_thread:
-        thread_text = top_thread["text"][:60] + ("..." if len(top_thread["text"]) > 60 else "")
-        summary_parts.append(f'🔥 Top thread: "{thread_text}" ({top_thread["reply_count"]} replies)')
-
-    if most_active_channels:
-        channel_name, count = most_active_channels[0]
-        summary_parts.append(f"💬 Most active: #{channel_name} ({count} messages)")
-
-    if most_helpful_user:
-        username, reaction_count = most_helpful_user
-        summary_parts.append(f"⭐ Shoutout: @{username} ({reaction_count} reactions)")
-
-    if open_question:
-        question_text = open_question[:80] + ("..." if len(open_question) > 80 else "")
-        summary_parts.append(f'❓ Open question: "{question_text}"')
-
-    summary_parts.append(f"📈 {total_messages} messages · {active_members} active members")
-
-    summary_text = "\n".join(summary_parts)
-
-    try:
-        channel_id = await get_channel_id(slack_client, target_channel)
-        await slack_client.chat_postMessage(
-            channel=channel_id,
-            text=summary_text,
-        )
-        logger.info(f"Posted summary to #{target_channel}")
-    except SlackApiError as e:
-        logger.error(f"Failed to post summary: {e}")
-        raise
-
-    return summary_text
-
-
-async def fetch_all_channels(slack_client: AsyncWebClient) -> List[Dict]:
-    channels = []
-    cursor = None
-
-    while True:
-        try:
-            response = await slack_client.conversations_list(
-                types="public_channel",
-                exclude_archived=True,
-                limit=200,
-                cursor=cursor,
-            )
-            channels.extend(response["channels"])
-
-            cursor = response.get("response_metadata", {}).get("next_cursor")
-            if not cursor:
-                break
-        except SlackApiError as e:
-            logger.error(f"Failed to list channels: {e}")
-            break
-
-    return channels
-
-
-async def fetch_channel_history(slack_client: AsyncWebClient, channel_id: str, oldest: float, latest: float) -> List[Dict]:
-    messages = []
-    cursor = None
-
-    while True:
-        try:
-            response = await slack_client.conversations_history(
-                channel=channel_id,
-                oldest=str(oldest),
-                latest=str(latest),
-                limit=1000,
-                cursor=cursor,
-            )
-            messages.extend(response["messages"])
-
-            cursor = response.get("response_metadata", {}).get("next_cursor")
-            if not cursor:
-                break
-        except SlackApiError:
-            break
-
-    return messages
-
-
-def find_top_thread(messages: List[Dict]) -> Optional[Dict]:
-    threads = {}
-
-    for msg in messages:
-        thread_ts = msg.get("thread_ts")
-        if not thread_ts:
-            continue
-
-        reply_count = msg.get("reply_count", 0)
-        if reply_count > 0:
-            if thread_ts not in threads or reply_count > threads[thread_ts]["reply_count"]:
-                threads[thread_ts] = {
-                    "text": msg.get("text", ""),
-                    "reply_count": reply_count,
-                }
-
-    if not threads:
-        return None
-
-    top = max(threads.values(), key=lambda x: x["reply_count"])
-    return top
-
-
-def find_most_active_channels(messages: List[Dict]) -> List[tuple]:
-    channel_counts = defaultdict(int)
-
-    for msg in messages:
-        channel_name = msg.get("channel_name", "unknown")
-        channel_counts[channel_name] += 1
-
-    sorted_channels = sorted(channel_counts.items(), key=lambda x: x[1], reverse=True)
-    return sorted_channels[:2]
-
-
-async def find_most_helpful_user(messages: List[Dict], slack_client: AsyncWebClient) -> Optional[tuple]:
-    user_reactions = defaultdict(int)
-
-    for msg in messages:
-        user_id = msg.get("user")
-        if not user_id:
-            continue
-
-        reactions = msg.get("reactions", [])
-        total_reactions = sum(r.get("count", 0) for r in reactions)
-        user_reactions[user_id] += total_reactions
-
-    if not user_reactions:
-        return None
-
-    top_user_id = max(user_reactions, key=user_reactions.get)
-    top_count = user_reactions[top_user_id]
-
-    if top_count == 0:
-        return None
-
-    try:
-        user_info = await slack_client.users_info(user=top_user_id)
-        username = user_info["user"]["name"]
-    except SlackApiError:
-        username = top_user_id
-
-    return username, top_count
-
-
-def find_open_question(messages: List[Dict]) -> Optional[str]:
-    for msg in messages:
-        text = msg.get("text", "")
-        if "?" not in text:
-            continue
-
-        reply_count = msg.get("reply_count", 0)
-        reactions = msg.get("reactions", [])
-
-        if reply_count == 0 and len(reactions) == 0:
-            return text
-
-    return None
-
-
-async def get_channel_id(slack_client: AsyncWebClient, channel_name: str) -> str:
-    channel_name = channel_name.lstrip("#")
-
-    cursor = None
-    while True:
-        response = await slack_client.conversations_list(
-            types="public_channel",
-            exclude_archived=True,
-            limit=200,
-            cursor=cursor,
-        )
-
-        for channel in response["channels"]:
-            if channel["name"] == channel_name:
-                return channel["id"]
-
-        cursor = response.get("response_metadata", {}).get("next_cursor")
-        if not cursor:
-            break
-
-    raise ValueError(f"Channel #{channel_name} not found")
-
-
 def main():
     scenario_fn = ckit_bot_exec.parse_bot_args()
     fclient = ckit_client.FlexusClient(
@@ -351,15 +393,22 @@ def main():
         endpoint="/v1/jailed-bot",
     )
 
-    asyncio.run(ckit_bot_exec.run_bots_in_this_group(
-        fclient,
-        marketable_name=BOT_NAME,
-        marketable_version_str=BOT_VERSION,
-        bot_main_loop=slack_daily_summary_main_loop,
-        inprocess_tools=TOOLS,
-        scenario_fn=scenario_fn,
-        install_func=slack_daily_summary_install.install,
-    ))
+    async def run_group() -> None:
+        try:
+            await ckit_bot_exec.run_bots_in_this_group(
+                fclient,
+                marketable_name=BOT_NAME,
+                marketable_version_str=BOT_VERSION,
+                bot_main_loop=slack_daily_summary_main_loop,
+                inprocess_tools=TOOLS,
+                scenario_fn=scenario_fn,
+                install_func=slack_daily_summary_install.install,
+            )
+        finally:
+            # Personas share the Slack connection pool, it closes once all of them are gone
+            await slack_daily_summary_http.close_shared_sessions()
+
+    asyncio.run(run_group())
 
 
 if __name__ == "__main__":
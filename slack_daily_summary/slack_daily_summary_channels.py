@@ -0,0 +1,225 @@
+import asyncio
+import logging
+import sqlite3
+import time
+from typing import Dict, Optional, List, Tuple
+
+from slack_sdk.web.async_client import AsyncWebClient
+from slack_sdk.errors import SlackApiError
+
+from slack_daily_summary import slack_daily_summary_fetch
+from slack_daily_summary import slack_daily_summary_store
+
+logger = logging.getLogger("slack_daily_summary")
+
+MISS_REFRESH_SECONDS = 60
+# Channels skipped as idle still get one real history call this often, in case they woke up
+IDLE_REPROBE_SECONDS = 3 * 86400
+# A channel whose sync stopped at most this long before the range is fetched from where it stopped, which covers
+# the days it was skipped as idle (or the bot did not run) before the reprobe
+GAP_FILL_SECONDS = IDLE_REPROBE_SECONDS + 2 * 86400
+# How far back stored message counts go when ordering fetches busiest-first
+BUSY_LOOKBACK_SECONDS = 7 * 86400
+# Channels whose history failed with one of these are not tried again for a while
+UNREADABLE_ERRORS = {"not_in_channel", "channel_not_found", "missing_scope", "access_denied", "is_archived"}
+UNREADABLE_RECHECK_SECONDS = 7 * 86400
+
+# How the directory finds channels: every public channel, or only the ones the bot is in (optionally private ones too)
+DISCOVERY_ALL = "all"
+DISCOVERY_MEMBER = "member"
+DISCOVERY_MEMBER_PRIVATE = "member+private"
+DISCOVERY_MODES = (DISCOVERY_ALL, DISCOVERY_MEMBER, DISCOVERY_MEMBER_PRIVATE)
+
+
+class ChannelDirectory:
+    # One listing sweep per TTL, shared by everything that needs channel names, ids or metadata
+    def __init__(
+        self,
+        slack_client: AsyncWebClient,
+        store: slack_daily_summary_store.SummaryStore,
+        limiter: Optional[slack_daily_summary_fetch.SlackRateLimiter] = None,
+        ttl_seconds: float = 3600,
+        discovery: str = DISCOVERY_MEMBER,
+    ):
+        if discovery not in DISCOVERY_MODES:
+            raise ValueError(f"Unknown channel discovery mode {discovery!r}, use one of {', '.join(DISCOVERY_MODES)}")
+        self.slack_client = slack_client
+        self.store = store
+        self.limiter = limiter or slack_daily_summary_fetch.SlackRateLimiter()
+        self.ttl_seconds = ttl_seconds
+        self.discovery = discovery
+        self.by_id: Dict[str, Dict] = {}
+        self.by_name: Dict[str, str] = {}
+        # Names resolved outside the listing, e.g. a target channel the bot posts to without being a member
+        self.other_names: Dict[str, str] = {}
+        self.listed_at = 0.0
+        self.lock = asyncio.Lock()
+        # A listing made in another discovery mode is kept for names but refreshed before use
+        listed_at = store.get_kv("channels_listed_at", 0.0) if store.get_kv("channels_discovery", DISCOVERY_ALL) == discovery else 0.0
+        self._index(store.load_channels(), listed_at)
+
+    def _index(self, channels: List[Dict], listed_at: float) -> None:
+        self.by_id = {c["id"]: c for c in channels}
+        self.by_name = {c["name"]: c["id"] for c in channels}
+        self.listed_at = listed_at
+
+    def is_fresh(self) -> bool:
+        return bool(self.by_id) and time.time() - self.listed_at < self.ttl_seconds
+
+    async def refresh(self) -> None:
+        channels = []
+        cursor = None
+        complete = False
+        if self.discovery == DISCOVERY_ALL:
+            method, fn, types = "conversations.list", self.slack_client.conversations_list, "public_channel"
+        else:
+            # users.conversations with a bot token lists exactly the channels the bot can read
+            method, fn = "users.conversations", self.slack_client.users_conversations
+            types = "public_channel,private_channel" if self.discovery == DISCOVERY_MEMBER_PRIVATE else "public_channel"
+
+        while True:
+            try:
+                response = await self.limiter.call(
+                    method,
+                    fn,
+                    types=types,
+                    exclude_archived=True,
+                    limit=200,
+                    cursor=cursor,
+                )
+                for channel in response["channels"]:
+                    if method == "users.conversations":
+                        channel.setdefault("is_member", True)
+                    channels.append(channel)
+
+                cursor = response.get("response_metadata", {}).get("next_cursor")
+                if not cursor:
+                    complete = True
+                    break
+            except SlackApiError as e:
+                logger.error(f"Failed to list channels: {e}")
+                break
+
+        if complete:
+            self._index(channels, time.time())
+            self.store.save_channels(channels, self.listed_at)
+            self.store.set_kv("channels_discovery", self.discovery)
+        elif self.by_id:
+            logger.warning(f"Channel listing incomplete, keeping {len(self.by_id)} channels listed at {self.listed_at:.0f}")
+        else:
+            self._index(channels, 0.0)
+
+    async def ensure_fresh(self) -> None:
+        async with self.lock:
+            if not self.is_fresh():
+                await self.refresh()
+
+    async def channels(self) -> List[Dict]:
+        await self.ensure_fresh()
+        return list(self.by_id.values())
+
+    async def get_id(self, channel_name: str) -> str:
+        channel_name = channel_name.lstrip("#")
+        await self.ensure_fresh()
+        if channel_name not in self.by_name and time.time() - self.listed_at > MISS_REFRESH_SECONDS:
+            # The channel may have been created since the last sweep
+            async with self.lock:
+                await self.refresh()
+        if channel_name in self.by_name:
+            return self.by_name[channel_name]
+        if self.discovery != DISCOVERY_ALL:
+            if channel_name not in self.other_names:
+                channel_id = await self._find_public(channel_name)
+                if channel_id:
+                    self.other_names[channel_name] = channel_id
+            if channel_name in self.other_names:
+                return self.other_names[channel_name]
+        raise ValueError(f"Channel #{channel_name} not found")
+
+    async def _find_public(self, channel_name: str) -> Optional[str]:
+        # Only the bot's own channels are listed, a public target it is not in still needs a name lookup
+        cursor = None
+        while True:
+            response = await self.limiter.call(
+                "conversations.list",
+                self.slack_client.conversations_list,
+                types="public_channel",
+                exclude_archived=True,
+                limit=200,
+                cursor=cursor,
+            )
+            for channel in response["channels"]:
+                if channel["name"] == channel_name:
+                    return channel["id"]
+            cursor = response.get("response_metadata", {}).get("next_cursor")
+            if not cursor:
+                return None
+
+
+def is_idle(channel: Dict, sync: Optional[sqlite3.Row], oldest: float, idle_days: float) -> bool:
+    if sync is None or time.time() - sync["synced_at"] > IDLE_REPROBE_SECONDS:
+        return False
+    # `updated` is in milliseconds and moves on some channel activity, never skip when it lands in the window
+    if channel.get("updated", 0) / 1000.0 >= oldest:
+        return False
+    last_activity = float(sync["latest_ts"]) if sync["latest_ts"] else float(channel.get("created", 0))
+    return last_activity < oldest - idle_days * 86400
+
+
+def is_unreadable(channel: Dict, unreadable: Optional[sqlite3.Row]) -> bool:
+    if unreadable is None or time.time() - unreadable["checked_at"] > UNREADABLE_RECHECK_SECONDS:
+        return False
+    # Invited since the failure
+    if unreadable["error"] == "not_in_channel" and channel.get("is_member"):
+        return False
+    return True
+
+
+def plan_history_fetches(
+    channels: List[Dict],
+    store: slack_daily_summary_store.SummaryStore,
+    oldest: float,
+    latest: float,
+    idle_days: float = 14,
+    live_since: Optional[float] = None,
+    live_until: Optional[float] = None,
+) -> List[Tuple[Dict, float, float]]:
+    syncs = store.load_sync()
+    unreadable = store.load_unreadable()
+    recent_counts = store.message_counts_since(oldest - BUSY_LOOKBACK_SECONDS)
+
+    fetches = []
+    covered = empty = idle = not_member = gaps = 0
+    for channel in channels:
+        if channel.get("num_members", 1) == 0:
+            empty += 1
+            continue
+        if channel.get("is_member") is False or is_unreadable(channel, unreadable.get(channel["id"])):
+            # Bot tokens can only read channels they are in, a history call would just return not_in_channel
+            not_member += 1
+            continue
+        sync = syncs.get(channel["id"])
+        if live_since is not None and live_until is not None and sync is not None and live_since <= sync["synced_until"] < live_until:
+            # Synced while the realtime listener was already connected, events have kept it current since
+            store.mark_synced(channel["id"], channel["name"], sync["synced_from"], live_until, None)
+            sync = store.get_sync(channel["id"])
+        delta = slack_daily_summary_store.plan_range(sync, oldest, latest)
+        if not delta:
+            covered += 1
+            continue
+        if idle_days > 0 and is_idle(channel, sync, oldest, idle_days):
+            idle += 1
+            continue
+        if sync is not None and oldest - GAP_FILL_SECONDS <= sync["synced_until"] < delta[0]:
+            # `updated` does not move on new messages, so an idle skip may have missed some
+            delta = (sync["synced_until"], delta[1])
+            gaps += 1
+        fetches.append((channel, delta[0], delta[1]))
+
+    # Busiest first, so the longest paginations start while the small ones fill the gaps
+    fetches.sort(key=lambda f: (recent_counts.get(f[0]["id"], 0), f[0].get("num_members", 0)), reverse=True)
+    logger.info(
+        f"History fetch plan: {len(fetches)} to fetch ({gaps} from where their sync stopped), {covered} already synced, {idle} idle, "
+        f"{empty} without members, {not_member} not readable by the bot"
+    )
+    return fetches
@@ -0,0 +1,112 @@
+import fnmatch
+import hashlib
+import json
+from typing import Dict, Any, Optional, List
+
+from slack_daily_summary import slack_daily_summary_aggregate
+
+# Every metric a digest can show, in the order they appear in the recap
+METRIC_NAMES = ["top_thread", "most_active_channels", "most_helpful_user", "open_question", "trending_topics", "totals"]
+
+DEFAULT_DIGEST_NAME = "default"
+
+
+class Digest:
+    # One recap: which channels it covers (fnmatch patterns on channel names), where it goes and what it shows
+    def __init__(
+        self,
+        name: str,
+        target_channel: str,
+        include: Optional[List[str]] = None,
+        exclude: Optional[List[str]] = None,
+        metrics: Optional[List[str]] = None,
+        top_n: int = 1,
+    ):
+        self.name = name
+        self.target_channel = target_channel.lstrip("#")
+        self.include = include or ["*"]
+        self.exclude = exclude or []
+        self.metrics = metrics or list(METRIC_NAMES)
+        # Entries per ranked section: threads, channels, helpers and open questions
+        self.top_n = top_n
+
+    def __repr__(self) -> str:
+        return f"Digest({self.name!r} -> #{self.target_channel}, include={self.include}, exclude={self.exclude})"
+
+    def matches(self, channel_name: str) -> bool:
+        if not any(fnmatch.fnmatchcase(channel_name, p) for p in self.include):
+            return False
+        return not any(fnmatch.fnmatchcase(channel_name, p) for p in self.exclude)
+
+    def channel_names(self, channel_names: Dict[str, str]) -> Dict[str, str]:
+        return {channel_id: name for channel_id, name in channel_names.items() if self.matches(name)}
+
+    def select(self, results: Dict[str, Any]) -> Dict[str, Any]:
+        return {name: value for name, value in results.items() if name in self.metrics}
+
+    def is_default(self) -> bool:
+        return self.name == DEFAULT_DIGEST_NAME
+
+
+def default_digest(target_channel: str, top_n: int = 1) -> Digest:
+    return Digest(DEFAULT_DIGEST_NAME, target_channel, top_n=top_n)
+
+
+def parse_top_n(value: Any, name: str) -> int:
+    try:
+        top_n = int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{name}: top_n must be a number, got {value!r}")
+    if not 1 <= top_n <= slack_daily_summary_aggregate.MAX_LEADERBOARD:
+        raise ValueError(f"{name}: top_n must be between 1 and {slack_daily_summary_aggregate.MAX_LEADERBOARD}, got {top_n}")
+    return top_n
+
+
+def parse_digests(raw: str, target_channel: str, top_n: int = 1) -> List[Digest]:
+    # Setup value is a JSON list like [{"name": "platform", "target_channel": "platform-recap", "include": ["platform-*"],
+    # "exclude": ["platform-alerts"], "metrics": ["top_thread", "totals"], "top_n": 3}], empty means one digest
+    # of everything. top_n falls back to the given default.
+    if not raw or not raw.strip():
+        return [default_digest(target_channel, top_n)]
+    try:
+        entries = json.loads(raw)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"digests is not valid JSON: {e}")
+    if not isinstance(entries, list) or not entries:
+        raise ValueError("digests must be a non-empty JSON list of digest definitions")
+
+    digests = []
+    for i, entry in enumerate(entries):
+        if not isinstance(entry, dict):
+            raise ValueError(f"digest #{i + 1} must be an object")
+        name = str(entry.get("name") or f"digest-{i + 1}")
+        metrics = entry.get("metrics") or list(METRIC_NAMES)
+        unknown = [m for m in metrics if m not in METRIC_NAMES]
+        if unknown:
+            raise ValueError(f"digest {name!r} has unknown metrics {unknown}, use {', '.join(METRIC_NAMES)}")
+        for key in ("include", "exclude"):
+            if not isinstance(entry.get(key, []), list):
+                raise ValueError(f"digest {name!r}: {key} must be a list of channel name patterns")
+        digests.append(Digest(
+            name,
+            entry.get("target_channel") or target_channel,
+            entry.get("include"),
+            entry.get("exclude"),
+            metrics,
+            parse_top_n(entry.get("top_n", top_n), f"digest {name!r}"),
+        ))
+
+    names = [d.name for d in digests]
+    if len(set(names)) != len(names):
+        raise ValueError(f"digest names must be unique, got {names}")
+    return digests
+
+
+def covers(digests: List[Digest], channel_name: str) -> bool:
+    return any(d.matches(channel_name) for d in digests)
+
+
+def scope_key(digests: List[Digest]) -> str:
+    # Stored rollups only hold channels some digest covered when they were built, so they are kept per set of patterns
+    patterns = json.dumps(sorted([sorted(d.include), sorted(d.exclude)] for d in digests))
+    return hashlib.sha1(patterns.encode()).hexdigest()[:16]
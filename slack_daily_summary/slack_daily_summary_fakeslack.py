@@ -0,0 +1,211 @@
+import asyncio
+import logging
+import random
+import time
+from collections import defaultdict
+from datetime import datetime, timezone, timedelta
+from typing import Dict, Any, Optional, List
+
+from aiohttp import web
+
+logger = logging.getLogger("slack_daily_summary")
+
+IST = timezone(timedelta(hours=5, minutes=30))
+
+
+class SyntheticWorkspace:
+    # Deterministic fake workspace: heavy-tailed channel sizes, threads, reactions and questions spread over one IST day
+    def __init__(
+        self,
+        channels: int = 100,
+        users: int = 200,
+        mean_messages: float = 20.0,
+        idle_fraction: float = 0.6,
+        thread_probability: float = 0.15,
+        reaction_probability: float = 0.3,
+        question_probability: float = 0.1,
+        day: Optional[datetime] = None,
+        seed: int = 42,
+        extra_channels: Optional[List[str]] = None,
+        member_fraction: float = 1.0,
+    ):
+        rng = random.Random(seed)
+        day = day or datetime.combine(datetime.now(IST).date() - timedelta(days=1), datetime.min.time(), tzinfo=IST)
+        day_start = day.timestamp()
+        self.day_start = day_start
+
+        self.users = [{"id": f"U{i:07d}", "name": f"user{i}"} for i in range(users)]
+        self.channels: List[Dict[str, Any]] = []
+        self.messages: Dict[str, List[Dict[str, Any]]] = {}
+        # (channel_id, thread_ts) -> replies oldest first, drawn from their own generator so the messages match older seeds
+        self.replies: Dict[tuple, List[Dict[str, Any]]] = {}
+        reply_rng = random.Random(seed + 1)
+        member_rng = random.Random(seed + 2)
+
+        names = [f"channel-{i}" for i in range(channels)] + list(extra_channels or ["bob-testing"])
+        for i, name in enumerate(names):
+            channel_id = f"C{i:07d}"
+            self.channels.append({
+                "id": channel_id,
+                "name": name,
+                "is_channel": True,
+                "is_member": member_rng.random() < member_fraction or name in (extra_channels or ["bob-testing"]),
+                "created": int(day_start) - 90 * 86400,
+                "updated": int(day_start * 1000),
+                "num_members": rng.randint(1, users),
+            })
+            if rng.random() < idle_fraction or name in (extra_channels or ["bob-testing"]):
+                count = 0
+            else:
+                count = int(rng.paretovariate(1.5) * mean_messages / 3)
+            msgs = []
+            for ts in sorted(day_start + rng.random() * 86399 for _ in range(count)):
+                user = rng.choice(self.users)["id"]
+                text = f"message from {user} in {name}"
+                if rng.random() < question_probability:
+                    text += " anyone know how this works?"
+                msg: Dict[str, Any] = {"type": "message", "ts": f"{ts:.6f}", "user": user, "text": text}
+                if rng.random() < thread_probability:
+                    msg["thread_ts"] = msg["ts"]
+                    msg["reply_count"] = rng.randint(1, 40)
+                    msg["latest_reply"] = f"{min(ts + rng.random() * 3600, day_start + 86399):.6f}"
+                    self.replies[(channel_id, msg["ts"])] = self.make_replies(msg, reply_rng)
+                if rng.random() < reaction_probability:
+                    msg["reactions"] = [
+                        {"name": f"emoji{k}", "count": rng.randint(1, 5), "users": []}
+                        for k in range(rng.randint(1, 3))
+                    ]
+                msgs.append(msg)
+            # conversations.history returns newest first
+            self.messages[channel_id] = list(reversed(msgs))
+
+    def make_replies(self, parent: Dict[str, Any], rng: random.Random) -> List[Dict[str, Any]]:
+        start, end = float(parent["ts"]), float(parent["latest_reply"])
+        stamps = sorted(start + (end - start) * rng.random() for _ in range(parent["reply_count"] - 1)) + [end]
+        return [
+            {"type": "message", "ts": f"{ts:.6f}", "thread_ts": parent["ts"], "user": rng.choice(self.users)["id"], "text": "reply"}
+            for ts in stamps
+        ]
+
+    def total_messages(self) -> int:
+        return sum(len(m) for m in self.messages.values())
+
+
+class FakeSlackServer:
+    # Enough of the Slack Web API for the summary pipeline, with cursors and optional injected 429s
+    def __init__(self, workspace: SyntheticWorkspace, rate_limit_probability: float = 0.0, retry_after: int = 1, seed: int = 42):
+        self.workspace = workspace
+        self.channels_by_id = {c["id"]: c for c in workspace.channels}
+        self.rate_limit_probability = rate_limit_probability
+        self.retry_after = retry_after
+        self.rng = random.Random(seed)
+        self.calls: Dict[str, int] = defaultdict(int)
+        self.rate_limited: Dict[str, int] = defaultdict(int)
+        self.posted: List[Dict[str, Any]] = []
+        self.runner: Optional[web.AppRunner] = None
+        self.url = ""
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        app = web.Application()
+        app.router.add_route("*", "/api/{method}", self.handle)
+        self.runner = web.AppRunner(app, access_log=None)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, host, port)
+        await site.start()
+        # With port 0 the OS picks a free one, the runner reports what it bound
+        self.url = f"http://{host}:{self.runner.addresses[0][1]}/api/"
+        return self.url
+
+    async def stop(self) -> None:
+        if self.runner:
+            await self.runner.cleanup()
+
+    async def handle(self, request: web.Request) -> web.Response:
+        method = request.match_info["method"]
+        self.calls[method] += 1
+        params = dict(request.query)
+        if request.can_read_body:
+            if request.content_type == "application/json":
+                params.update(await request.json())
+            else:
+                params.update(await request.post())
+
+        if method != "auth.test" and self.rng.random() < self.rate_limit_probability:
+            self.rate_limited[method] += 1
+            return web.json_response({"ok": False, "error": "ratelimited"}, status=429, headers={"Retry-After": str(self.retry_after)})
+
+        handler = getattr(self, "api_" + method.replace(".", "_"), None)
+        if handler is None:
+            return web.json_response({"ok": False, "error": "unknown_method"})
+        response = web.json_response(handler(params))
+        # Gzipped when the client accepts it, as Slack does
+        if "gzip" in request.headers.get("Accept-Encoding", ""):
+            response.enable_compression(web.ContentCoding.gzip)
+        return response
+
+    def paginate(self, items: List[Any], params: Dict[str, Any], default_limit: int) -> Dict[str, Any]:
+        start = int(params.get("cursor") or 0)
+        limit = int(params.get("limit") or default_limit)
+        page = items[start:start + limit]
+        next_cursor = str(start + limit) if start + limit < len(items) else ""
+        return {"page": page, "response_metadata": {"next_cursor": next_cursor}}
+
+    def api_auth_test(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        return {"ok": True, "user_id": "UBOT", "team_id": "TFAKE", "team": "fake"}
+
+    def api_conversations_list(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        p = self.paginate(self.workspace.channels, params, 100)
+        return {"ok": True, "channels": p["page"], "response_metadata": p["response_metadata"]}
+
+    def api_conversations_history(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        channel = params.get("channel", "")
+        if channel not in self.workspace.messages:
+            return {"ok": False, "error": "channel_not_found"}
+        if not self.channels_by_id[channel]["is_member"]:
+            return {"ok": False, "error": "not_in_channel"}
+        oldest = float(params.get("oldest") or 0)
+        latest = float(params.get("latest") or time.time())
+        window = [m for m in self.workspace.messages[channel] if oldest < float(m["ts"]) < latest]
+        p = self.paginate(window, params, 100)
+        return {"ok": True, "messages": p["page"], "has_more": bool(p["response_metadata"]["next_cursor"]), "response_metadata": p["response_metadata"]}
+
+    def api_users_conversations(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        p = self.paginate([c for c in self.workspace.channels if c["is_member"]], params, 100)
+        return {"ok": True, "channels": p["page"], "response_metadata": p["response_metadata"]}
+
+    def api_conversations_replies(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        key = (params.get("channel", ""), params.get("ts", ""))
+        parent = next((m for m in self.workspace.messages.get(key[0], []) if m["ts"] == key[1]), None)
+        if parent is None:
+            return {"ok": False, "error": "thread_not_found"}
+        oldest = float(params.get("oldest") or 0)
+        window = [parent] + [r for r in self.workspace.replies.get(key, []) if float(r["ts"]) > oldest]
+        p = self.paginate(window, params, 100)
+        return {"ok": True, "messages": p["page"], "has_more": bool(p["response_metadata"]["next_cursor"]), "response_metadata": p["response_metadata"]}
+
+    def api_users_list(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        p = self.paginate(self.workspace.users, params, 100)
+        return {"ok": True, "members": p["page"], "response_metadata": p["response_metadata"]}
+
+    def api_users_info(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        for user in self.workspace.users:
+            if user["id"] == params.get("user"):
+                return {"ok": True, "user": user}
+        return {"ok": False, "error": "user_not_found"}
+
+    def api_chat_postMessage(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        ts = f"{time.time():.6f}"
+        self.posted.append({"channel": params.get("channel"), "text": params.get("text"), "ts": ts})
+        if params.get("channel") in self.workspace.messages:
+            self.workspace.messages[params["channel"]].insert(0, {"type": "message", "user": "UBOT", "text": params.get("text"), "ts": ts})
+        return {"ok": True, "channel": params.get("channel"), "ts": ts}
+
+
+async def serve_forever(workspace: SyntheticWorkspace, port: int = 8765, rate_limit_probability: float = 0.0) -> None:
+    server = FakeSlackServer(workspace, rate_limit_probability)
+    url = await server.start(port=port)
+    logger.info(f"Fake Slack API at {url} with {len(workspace.channels)} channels, {workspace.total_messages()} messages")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await server.stop()
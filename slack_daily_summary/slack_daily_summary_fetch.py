@@ -0,0 +1,243 @@
+import asyncio
+import logging
+import time
+from typing import Dict, Any, Optional, List, Tuple, AsyncIterator, Awaitable, Callable
+
+from slack_sdk.web.async_client import AsyncWebClient
+from slack_sdk.errors import SlackApiError
+
+from slack_daily_summary import slack_daily_summary_metrics
+
+logger = logging.getLogger("slack_daily_summary")
+
+# Slack Web API tiers, (requests per minute, burst)
+# https://api.slack.com/docs/rate-limits
+TIER_1 = (1, 1)
+TIER_2 = (20, 3)
+TIER_3 = (50, 5)
+TIER_4 = (100, 10)
+
+SLACK_METHOD_TIERS = {
+    "auth.test": TIER_4,
+    "chat.postMessage": (60, 3),
+    "conversations.history": TIER_3,
+    "conversations.info": TIER_3,
+    "conversations.list": TIER_2,
+    "conversations.replies": TIER_3,
+    "users.conversations": TIER_3,
+    "users.info": TIER_4,
+    "users.list": TIER_2,
+}
+
+MAX_RATE_LIMIT_RETRIES = 5
+
+
+class TokenBucket:
+    def __init__(self, per_minute: float, burst: int):
+        self.rate = per_minute / 60.0
+        self.capacity = float(max(1, burst))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+        # Callers queued for a token ahead of low-priority ones
+        self.waiting = 0
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self) -> None:
+        self.waiting += 1
+        try:
+            async with self.lock:
+                while True:
+                    self._refill()
+                    if self.tokens >= 1.0:
+                        self.tokens -= 1.0
+                        return
+                    await asyncio.sleep((1.0 - self.tokens) / self.rate)
+        finally:
+            self.waiting -= 1
+
+    async def acquire_idle(self) -> None:
+        # Low priority: a token only goes this way while no regular caller is waiting for one
+        while True:
+            self._refill()
+            if not self.waiting and self.tokens >= 1.0:
+                self.tokens -= 1.0
+                return
+            await asyncio.sleep(max(1.0, 1.0 - self.tokens) / self.rate)
+
+
+class SlackRateLimiter:
+    def __init__(self, tiers: Optional[Dict[str, Tuple[float, int]]] = None):
+        self.tiers = dict(SLACK_METHOD_TIERS)
+        if tiers:
+            self.tiers.update(tiers)
+        self.default_tier = TIER_3
+        self.buckets: Dict[str, TokenBucket] = {}
+        self.paused_until: Dict[str, float] = {}
+        # Set on a low-priority view, whose calls also spend a token of this one
+        self.parent: Optional["SlackRateLimiter"] = None
+
+    def scaled(self, share: float) -> "SlackRateLimiter":
+        # A low-priority view capped at `share` of every tier. Its calls are paid from this limiter's own buckets
+        # after everyone else waiting on them, and it shares this limiter's Retry-After pauses
+        low = SlackRateLimiter({m: (per_minute * share, max(1, int(burst * share))) for m, (per_minute, burst) in self.tiers.items()})
+        low.default_tier = (self.default_tier[0] * share, max(1, int(self.default_tier[1] * share)))
+        low.paused_until = self.paused_until
+        low.parent = self
+        return low
+
+    def bucket(self, method: str) -> TokenBucket:
+        if method not in self.buckets:
+            per_minute, burst = self.tiers.get(method, self.default_tier)
+            self.buckets[method] = TokenBucket(per_minute, burst)
+        return self.buckets[method]
+
+    def pause(self, method: str, seconds: float) -> None:
+        until = time.monotonic() + seconds
+        self.paused_until[method] = max(self.paused_until.get(method, 0.0), until)
+
+    async def wait(self, method: str) -> None:
+        # Retry-After applies to everyone waiting on the method, not just the caller that got the 429
+        while True:
+            delay = self.paused_until.get(method, 0.0) - time.monotonic()
+            if delay <= 0:
+                break
+            await asyncio.sleep(delay)
+        await self.bucket(method).acquire()
+        if self.parent is not None:
+            await self.parent.bucket(method).acquire_idle()
+
+    async def call(self, method: str, fn: Callable[..., Awaitable[Any]], **kwargs) -> Any:
+        metrics = slack_daily_summary_metrics.current()
+        attempt = 0
+        while True:
+            await self.wait(method)
+            if metrics:
+                metrics.api_calls[method] += 1
+            try:
+                response = await fn(**kwargs)
+            except SlackApiError as e:
+                retry_after = retry_after_seconds(e)
+                if retry_after is None or attempt >= MAX_RATE_LIMIT_RETRIES:
+                    raise
+                attempt += 1
+                logger.warning(f"Rate limited on {method}, retrying in {retry_after:.0f}s (attempt {attempt}/{MAX_RATE_LIMIT_RETRIES})")
+                self.pause(method, retry_after)
+                if metrics:
+                    metrics.api_retries[method] += 1
+                    metrics.rate_limit_wait[method] += retry_after
+                continue
+            return response
+
+
+def retry_after_seconds(e: SlackApiError) -> Optional[float]:
+    response = getattr(e, "response", None)
+    if response is None or getattr(response, "status_code", None) != 429:
+        return None
+    headers = getattr(response, "headers", None) or {}
+    value = headers.get("Retry-After", headers.get("retry-after", 1))
+    try:
+        return max(1.0, float(value))
+    except (TypeError, ValueError):
+        return 1.0
+
+
+def error_code(e: SlackApiError) -> str:
+    response = getattr(e, "response", None)
+    try:
+        return response.get("error", "") if response is not None else ""
+    except AttributeError:
+        return ""
+
+
+async def iter_channel_history_pages(
+    slack_client: AsyncWebClient,
+    channel_id: str,
+    oldest: float,
+    latest: float,
+    limiter: Optional[SlackRateLimiter] = None,
+    cursor: Optional[str] = None,
+) -> AsyncIterator[Tuple[List[Dict], Optional[str]]]:
+    # Yields (page, next_cursor), next_cursor is None on the last page and can be passed back in to resume
+    limiter = limiter or SlackRateLimiter()
+
+    while True:
+        response = await limiter.call(
+            "conversations.history",
+            slack_client.conversations_history,
+            channel=channel_id,
+            oldest=str(oldest),
+            latest=str(latest),
+            limit=1000,
+            cursor=cursor,
+        )
+        cursor = response.get("response_metadata", {}).get("next_cursor") or None
+        yield response["messages"], cursor
+        if not cursor:
+            break
+
+
+async def iter_channel_histories(
+    slack_client: AsyncWebClient,
+    fetches: List[Tuple[Dict, float, float]],
+    limiter: SlackRateLimiter,
+    concurrency: int = 8,
+    cursors: Optional[Dict[str, str]] = None,
+    failures: Optional[Dict[str, str]] = None,
+) -> AsyncIterator[Tuple[Dict, List[Dict], Optional[str]]]:
+    # Yields (channel, page, next_cursor) as pages arrive from up to `concurrency` paginations running at once.
+    # next_cursor is None on a channel's last page, a channel that fails midway never gets one.
+    # `cursors` resumes channels from a checkpointed cursor instead of their newest page,
+    # `failures` collects the Slack error code of every channel that failed.
+    cursors = cursors or {}
+    queue: asyncio.Queue = asyncio.Queue(maxsize=max(1, concurrency) * 2)
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    done = object()
+
+    async def fetch_one(channel: Dict, oldest: float, latest: float) -> None:
+        async with semaphore:
+            t0 = time.perf_counter()
+            try:
+                async for page, next_cursor in iter_channel_history_pages(
+                    slack_client, channel["id"], oldest, latest, limiter, cursors.get(channel["id"]),
+                ):
+                    await queue.put((channel, page, next_cursor))
+            except SlackApiError as e:
+                code = error_code(e)
+                logger.warning(f"Failed to fetch history for {channel.get('name', channel['id'])}: {code or e}")
+                if failures is not None:
+                    failures[channel["id"]] = code
+            metrics = slack_daily_summary_metrics.current()
+            if metrics:
+                metrics.channel_fetch.observe(time.perf_counter() - t0)
+
+    tasks = [asyncio.ensure_future(fetch_one(c, o, l)) for c, o, l in fetches]
+
+    async def fetch_all() -> None:
+        # Anything but a Slack error is handed to the consumer to raise, a cancelled producer puts nothing
+        try:
+            await asyncio.gather(*tasks)
+        except Exception as e:
+            await queue.put(e)
+        else:
+            await queue.put(done)
+
+    producer = asyncio.ensure_future(fetch_all())
+    try:
+        while True:
+            item = await queue.get()
+            if item is done:
+                break
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        # A failed or abandoned run stops every pagination, none is left calling the API or blocked on the queue
+        for task in tasks:
+            task.cancel()
+        producer.cancel()
+        await asyncio.gather(producer, *tasks, return_exceptions=True)
@@ -0,0 +1,163 @@
+import asyncio
+import json
+import logging
+from typing import Dict, Any, Optional, List, Tuple
+
+import aiohttp
+from slack_sdk.web.async_client import AsyncWebClient
+from slack_sdk.http_retry.async_handler import AsyncRetryHandler
+from slack_sdk.http_retry.builtin_async_handlers import AsyncConnectionErrorRetryHandler, AsyncServerErrorRetryHandler
+
+from slack_daily_summary import slack_daily_summary_metrics
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+logger = logging.getLogger("slack_daily_summary")
+
+DEFAULT_TIMEOUT_SECONDS = 30
+CONNECT_TIMEOUT_SECONDS = 10
+# Connections kept open per process, shared by every persona, and how long an idle one is kept
+POOL_CONNECTIONS = 64
+KEEPALIVE_SECONDS = 60
+CONNECTION_RETRIES = 2
+SERVER_ERROR_RETRIES = 2
+# A post whose response was lost may have gone through, the pipeline looks it up before posting again
+NO_RETRY_METHODS = {"chat.postMessage", "chat.update", "chat.delete"}
+
+json_loads = orjson.loads if orjson is not None else json.loads
+
+
+class FastJsonResponse(aiohttp.ClientResponse):
+    # slack_sdk decodes every response with res.json(), history pages are the bulk of what it reads
+    async def json(self, *, encoding: Optional[str] = None, loads: Any = None, content_type: Optional[str] = "application/json") -> Any:
+        return await super().json(encoding=encoding, loads=loads or json_loads, content_type=content_type)
+
+
+class TransportStats:
+    # Process-wide, run metrics get the same counts for the calls they made
+    def __init__(self):
+        self.requests = 0
+        self.connections_created = 0
+        self.connections_reused = 0
+        self.bytes_received = 0
+
+    def count(self, name: str) -> None:
+        setattr(self, name, getattr(self, name) + 1)
+        metrics = slack_daily_summary_metrics.current()
+        if metrics:
+            metrics.counters[f"http_{name}"] += 1
+
+    def received(self, size: int) -> None:
+        self.bytes_received += size
+        metrics = slack_daily_summary_metrics.current()
+        if metrics:
+            metrics.bytes_received += size
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "connections_created": self.connections_created,
+            "connections_reused": self.connections_reused,
+            "bytes_received": self.bytes_received,
+            "reuse_ratio": round(self.connections_reused / max(1, self.requests), 3),
+        }
+
+
+stats = TransportStats()
+
+
+def trace_config() -> aiohttp.TraceConfig:
+    async def on_request_start(session, ctx, params) -> None:
+        stats.count("requests")
+
+    async def on_connection_create_end(session, ctx, params) -> None:
+        stats.count("connections_created")
+
+    async def on_connection_reuseconn(session, ctx, params) -> None:
+        stats.count("connections_reused")
+
+    async def on_response_chunk_received(session, ctx, params) -> None:
+        # aiohttp reports the whole body once it is read and decompressed. Content-Length would be the gzipped
+        # size, or missing for chunked responses
+        stats.received(len(params.chunk))
+
+    config = aiohttp.TraceConfig()
+    config.on_request_start.append(on_request_start)
+    config.on_connection_create_end.append(on_connection_create_end)
+    config.on_connection_reuseconn.append(on_connection_reuseconn)
+    config.on_response_chunk_received.append(on_response_chunk_received)
+    return config
+
+
+class IdempotentOnly:
+    # Mixed into slack_sdk's handlers so writes are never sent twice behind the pipeline's back
+    async def _can_retry_async(self, *, state, request, response=None, error=None) -> bool:
+        if request.url.rsplit("/", 1)[-1] in NO_RETRY_METHODS:
+            return False
+        if not await super()._can_retry_async(state=state, request=request, response=response, error=error):
+            return False
+        metrics = slack_daily_summary_metrics.current()
+        if metrics:
+            metrics.counters["http_retries"] += 1
+        return True
+
+
+class ConnectionErrorRetryHandler(IdempotentOnly, AsyncConnectionErrorRetryHandler):
+    pass
+
+
+class ServerErrorRetryHandler(IdempotentOnly, AsyncServerErrorRetryHandler):
+    pass
+
+
+def retry_handlers() -> List[AsyncRetryHandler]:
+    # 429s are left to SlackRateLimiter, which shares the Retry-After pause with every caller of the method
+    return [
+        ConnectionErrorRetryHandler(max_retry_count=CONNECTION_RETRIES),
+        ServerErrorRetryHandler(max_retry_count=SERVER_ERROR_RETRIES),
+    ]
+
+
+# One session per event loop and timeout, personas run by run_bots_in_this_group share one loop
+_sessions: Dict[Tuple[int, float], Tuple[asyncio.AbstractEventLoop, aiohttp.ClientSession]] = {}
+
+
+def shared_session(timeout: float = DEFAULT_TIMEOUT_SECONDS) -> aiohttp.ClientSession:
+    loop = asyncio.get_running_loop()
+    key = (id(loop), float(timeout))
+    entry = _sessions.get(key)
+    if entry is not None and entry[0] is loop and not entry[1].closed:
+        return entry[1]
+    session = aiohttp.ClientSession(
+        connector=aiohttp.TCPConnector(limit=POOL_CONNECTIONS, keepalive_timeout=KEEPALIVE_SECONDS, ttl_dns_cache=300),
+        timeout=aiohttp.ClientTimeout(total=timeout, connect=CONNECT_TIMEOUT_SECONDS),
+        # aiohttp decompresses gzip bodies itself, history pages shrink several times over the wire
+        headers={"Accept-Encoding": "gzip, deflate"},
+        response_class=FastJsonResponse,
+        trace_configs=[trace_config()],
+    )
+    _sessions[key] = (loop, session)
+    return session
+
+
+def web_client(token: str, timeout: float = DEFAULT_TIMEOUT_SECONDS, **kwargs) -> AsyncWebClient:
+    # The client does not own the session, closing a persona leaves the pool to the others
+    return AsyncWebClient(
+        token=token,
+        timeout=int(timeout),
+        session=shared_session(timeout),
+        retry_handlers=retry_handlers(),
+        **kwargs,
+    )
+
+
+async def close_shared_sessions() -> None:
+    loop = asyncio.get_running_loop()
+    for key, (session_loop, session) in list(_sessions.items()):
+        if session_loop is loop:
+            await session.close()
+            del _sessions[key]
+    logger.info(f"Slack transport: {json.dumps(stats.snapshot())}")
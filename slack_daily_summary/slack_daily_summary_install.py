@@ -56,7 +56,7 @@ SLACK_DAILY_SUMMARY_SETUP_SCHEMA = [
         "bs_default": "",
         "bs_group": "Slack",
         "bs_importance": 1,
-        "bs_description": "App-Level Token for Socket Mode (starts with xapp-). Optional for this bot as it only posts messages on schedule.",
+        "bs_description": "App-Level Token for Socket Mode (starts with xapp-), scope connections:write. Optional: when set, message and reaction events are stored as they happen and the daily run only reconciles what was missed. Subscribe the app to message.channels (and message.groups for private channels), reaction_added and reaction_removed",
     },
     {
         "bs_name": "target_channel",
@@ -66,6 +66,126 @@ SLACK_DAILY_SUMMARY_SETUP_SCHEMA = [
         "bs_importance": 0,
         "bs_description": "Channel name (without #) where daily summaries will be posted",
     },
+    {
+        "bs_name": "digests",
+        "bs_type": "string_long",
+        "bs_default": "",
+        "bs_group": "Configuration",
+        "bs_importance": 1,
+        "bs_description": "Optional JSON list of digests built from one fetch, e.g. [{\"name\": \"platform\", \"target_channel\": \"platform-recap\", \"include\": [\"platform-*\"], \"exclude\": [\"platform-alerts\"], \"metrics\": [\"top_thread\", \"totals\"], \"top_n\": 3}]. Patterns match channel names, metrics pick from top_thread, most_active_channels, most_helpful_user, open_question, trending_topics, totals. Empty posts one recap of every channel to target_channel",
+    },
+    {
+        "bs_name": "leaderboard_size",
+        "bs_type": "int",
+        "bs_default": 1,
+        "bs_group": "Configuration",
+        "bs_importance": 1,
+        "bs_description": "Entries shown per ranked section (top threads, most active channels, shoutouts, open questions), 1 to 10. A digest can override it with top_n",
+    },
+    {
+        "bs_name": "summary_timezone",
+        "bs_type": "string_short",
+        "bs_default": "Asia/Kolkata",
+        "bs_group": "Configuration",
+        "bs_importance": 0,
+        "bs_description": "IANA timezone whose calendar days the summaries cover, e.g. Asia/Kolkata or Europe/Berlin",
+    },
+    {
+        "bs_name": "channel_discovery",
+        "bs_type": "string_short",
+        "bs_default": "member",
+        "bs_group": "Configuration",
+        "bs_importance": 1,
+        "bs_description": "Which channels to summarize: member (public channels the bot is in, via users.conversations), member+private (also private channels it is in, needs groups:read and groups:history) or all (list every public channel)",
+    },
+    {
+        "bs_name": "fetch_concurrency",
+        "bs_type": "int",
+        "bs_default": 8,
+        "bs_group": "Performance",
+        "bs_importance": 1,
+        "bs_description": "How many channel histories to fetch at once. Requests are still paced by Slack's per-method rate limits, so raising this mostly helps workspaces with many small channels",
+    },
+    {
+        "bs_name": "aggregation_processes",
+        "bs_type": "int",
+        "bs_default": 0,
+        "bs_group": "Performance",
+        "bs_importance": 1,
+        "bs_description": "Processes for building daily rollups once a run has more than 250k messages to roll up, sharded by channel. 0 means one per CPU core, 1 always aggregates in the bot process",
+    },
+    {
+        "bs_name": "http_timeout_seconds",
+        "bs_type": "int",
+        "bs_default": 30,
+        "bs_group": "Performance",
+        "bs_importance": 1,
+        "bs_description": "Timeout for each Slack API request. Connections are kept alive and shared by every persona of this bot running in the same process, and requests that fail to connect or get a 5xx are retried up to twice (posts are never retried blindly)",
+    },
+    {
+        "bs_name": "store_path",
+        "bs_type": "string_short",
+        "bs_default": "",
+        "bs_group": "Performance",
+        "bs_importance": 1,
+        "bs_description": "SQLite file that keeps fetched messages between runs, so only new messages are downloaded. Empty means slack_daily_summary_<team_id>.sqlite3 in the bot's working directory",
+    },
+    {
+        "bs_name": "channel_cache_ttl_minutes",
+        "bs_type": "int",
+        "bs_default": 60,
+        "bs_group": "Performance",
+        "bs_importance": 1,
+        "bs_description": "How long the channel list is reused before conversations.list is called again. The list is kept in the store, so it also survives restarts",
+    },
+    {
+        "bs_name": "user_cache_ttl_hours",
+        "bs_type": "int",
+        "bs_default": 24,
+        "bs_group": "Performance",
+        "bs_importance": 1,
+        "bs_description": "How long resolved user names are trusted before being looked up again. Names are kept in the store and refreshed in bulk with users.list",
+    },
+    {
+        "bs_name": "idle_channel_days",
+        "bs_type": "int",
+        "bs_default": 14,
+        "bs_group": "Performance",
+        "bs_importance": 1,
+        "bs_description": "Channels with no messages for this many days are not fetched, except for a check every few days. 0 fetches every channel on every run",
+    },
+    {
+        "bs_name": "thread_lookback_days",
+        "bs_type": "int",
+        "bs_default": 7,
+        "bs_group": "Performance",
+        "bs_importance": 1,
+        "bs_description": "Threads started up to this many days before the summarized day still count with the replies posted that day. 0 only counts threads started that day, by their total reply count. Open questions from these days are carried over while they stay unanswered",
+    },
+    {
+        "bs_name": "precompute_delay_minutes",
+        "bs_type": "int",
+        "bs_default": 10,
+        "bs_group": "Performance",
+        "bs_importance": 1,
+        "bs_description": "Minutes after midnight (summary timezone) to precompute yesterday's summary in the background, so the scheduled post is instant. Needs SLACK_APP_TOKEN (Socket Mode). -1 turns it off",
+    },
+    {
+        "bs_name": "precompute_rate_percent",
+        "bs_type": "int",
+        "bs_default": 30,
+        "bs_group": "Performance",
+        "bs_importance": 1,
+        "bs_description": "Share of each Slack rate limit tier the background precompute may use. It only gets calls no summary request of any persona is waiting for. The precompute only runs with SLACK_APP_TOKEN (Socket Mode)",
+    },
+    {
+        "bs_name": "metrics_textfile",
+        "bs_type": "string_short",
+        "bs_default": "",
+        "bs_group": "Performance",
+        "bs_importance": 1,
+        "bs_description": "If set, metrics of each summary run are written to this file in Prometheus text format, e.g. for the node_exporter textfile collector",
+    },
 ]
 
 
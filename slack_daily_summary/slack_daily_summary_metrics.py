@@ -0,0 +1,115 @@
+import contextlib
+import contextvars
+import time
+from collections import defaultdict
+from typing import Dict, Any, Optional, List, Iterator
+
+CHANNEL_FETCH_BUCKETS = [0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0]
+
+# The run being measured, set by generate_summary and inherited by every task it starts
+current_run: contextvars.ContextVar = contextvars.ContextVar("slack_daily_summary_run_metrics", default=None)
+
+
+class Histogram:
+    def __init__(self, buckets: List[float]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0.0
+        self.n = 0
+
+    def observe(self, value: float) -> None:
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.total += value
+        self.n += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        cumulative = []
+        running = 0
+        for bound, count in zip(self.buckets + [float("inf")], self.counts):
+            running += count
+            cumulative.append(("+Inf" if bound == float("inf") else bound, running))
+        return {"count": self.n, "sum": round(self.total, 3), "buckets": cumulative}
+
+
+class RunMetrics:
+    def __init__(self):
+        self.started = time.time()
+        self.phases: Dict[str, float] = defaultdict(float)
+        self.api_calls: Dict[str, int] = defaultdict(int)
+        self.api_retries: Dict[str, int] = defaultdict(int)
+        self.rate_limit_wait: Dict[str, float] = defaultdict(float)
+        self.bytes_received = 0
+        self.channel_fetch = Histogram(CHANNEL_FETCH_BUCKETS)
+        self.counters: Dict[str, int] = defaultdict(int)
+
+    @contextlib.contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] += time.perf_counter() - t0
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "started": self.started,
+            "phase_seconds": {k: round(v, 3) for k, v in self.phases.items()},
+            "api_calls": dict(self.api_calls),
+            "api_retries": dict(self.api_retries),
+            "rate_limit_wait_seconds": {k: round(v, 3) for k, v in self.rate_limit_wait.items()},
+            "bytes_received": self.bytes_received,
+            "channel_fetch_seconds": self.channel_fetch.snapshot(),
+            "counters": dict(self.counters),
+        }
+
+    def to_prometheus(self, prefix: str = "slack_daily_summary") -> str:
+        lines = []
+
+        def family(name: str, kind: str, help_text: str) -> None:
+            lines.append(f"# HELP {prefix}_{name} {help_text}")
+            lines.append(f"# TYPE {prefix}_{name} {kind}")
+
+        family("phase_seconds", "gauge", "Time spent in each phase of the last summary run")
+        for phase, seconds in self.phases.items():
+            lines.append(f'{prefix}_phase_seconds{{phase="{phase}"}} {seconds:.6f}')
+        # Every run starts from zero, so these are the last run's values rather than counters that only grow
+        family("api_calls", "gauge", "Slack Web API calls by method in the last summary run")
+        for method, n in self.api_calls.items():
+            lines.append(f'{prefix}_api_calls{{method="{method}"}} {n}')
+        family("api_retries", "gauge", "Slack Web API retries after a 429 by method in the last summary run")
+        for method, n in self.api_retries.items():
+            lines.append(f'{prefix}_api_retries{{method="{method}"}} {n}')
+        family("rate_limit_wait_seconds", "gauge", "Time spent waiting out Retry-After by method in the last summary run")
+        for method, seconds in self.rate_limit_wait.items():
+            lines.append(f'{prefix}_rate_limit_wait_seconds{{method="{method}"}} {seconds:.6f}')
+        family("bytes_received", "gauge", "Response bytes received from Slack in the last summary run, after decompression")
+        lines.append(f"{prefix}_bytes_received {self.bytes_received}")
+        family("channel_fetch_seconds", "histogram", "Wall time to fetch one channel's history in the last summary run")
+        hist = self.channel_fetch.snapshot()
+        for bound, cumulative in hist["buckets"]:
+            lines.append(f'{prefix}_channel_fetch_seconds_bucket{{le="{bound}"}} {cumulative}')
+        lines.append(f"{prefix}_channel_fetch_seconds_sum {hist['sum']}")
+        lines.append(f"{prefix}_channel_fetch_seconds_count {hist['count']}")
+        for name, n in self.counters.items():
+            family(name, "gauge", name.replace("_", " "))
+            lines.append(f"{prefix}_{name} {n}")
+        return "\n".join(lines) + "\n"
+
+
+def current() -> Optional[RunMetrics]:
+    return current_run.get()
+
+
+@contextlib.contextmanager
+def phase(name: str) -> Iterator[None]:
+    metrics = current()
+    if metrics is None:
+        yield
+        return
+    with metrics.phase(name):
+        yield
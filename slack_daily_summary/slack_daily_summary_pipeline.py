@@ -0,0 +1,536 @@
+import asyncio
+import logging
+import sqlite3
+import time
+from typing import Dict, Any, Optional, List, NamedTuple, Set
+
+from slack_sdk.web.async_client import AsyncWebClient
+from slack_sdk.errors import SlackApiError
+
+from slack_daily_summary import slack_daily_summary_fetch
+from slack_daily_summary import slack_daily_summary_store
+from slack_daily_summary import slack_daily_summary_aggregate
+from slack_daily_summary import slack_daily_summary_channels
+from slack_daily_summary import slack_daily_summary_users
+from slack_daily_summary import slack_daily_summary_realtime
+from slack_daily_summary import slack_daily_summary_metrics
+from slack_daily_summary import slack_daily_summary_rollups
+from slack_daily_summary import slack_daily_summary_threads
+from slack_daily_summary import slack_daily_summary_digests
+from slack_daily_summary import slack_daily_summary_pool
+from slack_daily_summary import slack_daily_summary_topics
+from slack_daily_summary import slack_daily_summary_questions
+
+logger = logging.getLogger("slack_daily_summary")
+
+# Summary job states, a job is keyed by its day range, timezone and target channel
+JOB_FETCHING = "fetching"
+JOB_AGGREGATED = "aggregated"
+JOB_POSTING = "posting"
+JOB_POSTED = "posted"
+
+
+class DigestResult(NamedTuple):
+    digest: slack_daily_summary_digests.Digest
+    summary_text: Optional[str]
+    already_posted: bool
+
+
+def job_key(
+    windows: List[slack_daily_summary_rollups.DayWindow],
+    tz_name: str,
+    target_channel: str,
+    digest_name: Optional[str] = None,
+) -> str:
+    key = f"summary:{windows[0].day}:{windows[-1].day}:{tz_name}:{target_channel}"
+    # Several digests may share a target channel, the default one keeps the key it always had
+    if digest_name and digest_name != slack_daily_summary_digests.DEFAULT_DIGEST_NAME:
+        key += f":{digest_name}"
+    return key
+
+
+def digest_job_key(windows: List[slack_daily_summary_rollups.DayWindow], tz_name: str, digest: slack_daily_summary_digests.Digest) -> str:
+    return job_key(windows, tz_name, digest.target_channel, digest.name)
+
+
+async def find_posted_summary(
+    slack_client: AsyncWebClient,
+    limiter: slack_daily_summary_fetch.SlackRateLimiter,
+    channel_id: str,
+    bot_user_id: str,
+    since: float,
+    title: str,
+) -> Optional[str]:
+    # A post whose outcome was never recorded (crash or timeout mid-call) may still have landed, look before posting again
+    response = await limiter.call(
+        "conversations.history",
+        slack_client.conversations_history,
+        channel=channel_id,
+        oldest=str(since),
+        limit=100,
+    )
+    for msg in response["messages"]:
+        # The whole title line, the default recap's title is a prefix of every named digest's title
+        first_line = msg.get("text", "").split("\n", 1)[0]
+        if msg.get("user") == bot_user_id and unescape_text(first_line) == title:
+            return msg["ts"]
+    return None
+
+
+def unescape_text(text: str) -> str:
+    # Slack returns posted text with &, < and > escaped
+    return text.replace("&lt;", "<").replace("&gt;", ">").replace("&amp;", "&")
+
+
+async def generate_summary(
+    slack_client: AsyncWebClient,
+    bot_user_id: str,
+    target_channel: str,
+    **kwargs,
+) -> Optional[str]:
+    results = await generate_summaries(
+        slack_client, bot_user_id, [slack_daily_summary_digests.default_digest(target_channel)], **kwargs,
+    )
+    return results[0].summary_text
+
+
+async def generate_summaries(
+    slack_client: AsyncWebClient,
+    bot_user_id: str,
+    digests: List[slack_daily_summary_digests.Digest],
+    limiter: Optional[slack_daily_summary_fetch.SlackRateLimiter] = None,
+    concurrency: int = 8,
+    store: Optional[slack_daily_summary_store.SummaryStore] = None,
+    channel_directory: Optional[slack_daily_summary_channels.ChannelDirectory] = None,
+    user_directory: Optional[slack_daily_summary_users.UserDirectory] = None,
+    idle_channel_days: float = 14,
+    realtime: Optional[slack_daily_summary_realtime.RealtimeIngestor] = None,
+    metrics: Optional[slack_daily_summary_metrics.RunMetrics] = None,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    tz_name: str = slack_daily_summary_rollups.DEFAULT_TIMEZONE,
+    post: bool = True,
+    thread_lookback_days: float = slack_daily_summary_threads.DEFAULT_THREAD_LOOKBACK_DAYS,
+    aggregation_processes: int = 0,
+) -> List[DigestResult]:
+    limiter = limiter or slack_daily_summary_fetch.SlackRateLimiter()
+    store = store or slack_daily_summary_store.SummaryStore(":memory:")
+    channel_directory = channel_directory or slack_daily_summary_channels.ChannelDirectory(slack_client, store, limiter)
+    user_directory = user_directory or slack_daily_summary_users.UserDirectory(slack_client, store, limiter)
+    metrics = metrics or slack_daily_summary_metrics.RunMetrics()
+    metrics_token = slack_daily_summary_metrics.current_run.set(metrics)
+    try:
+        return await _generate_summaries(
+            slack_client, bot_user_id, digests, limiter, concurrency, store,
+            channel_directory, user_directory, idle_channel_days, realtime, metrics,
+            start_date, end_date, tz_name, post, thread_lookback_days, aggregation_processes,
+        )
+    finally:
+        slack_daily_summary_metrics.current_run.reset(metrics_token)
+
+
+async def _generate_summaries(
+    slack_client: AsyncWebClient,
+    bot_user_id: str,
+    digests: List[slack_daily_summary_digests.Digest],
+    limiter: slack_daily_summary_fetch.SlackRateLimiter,
+    concurrency: int,
+    store: slack_daily_summary_store.SummaryStore,
+    channel_directory: slack_daily_summary_channels.ChannelDirectory,
+    user_directory: slack_daily_summary_users.UserDirectory,
+    idle_channel_days: float,
+    realtime: Optional[slack_daily_summary_realtime.RealtimeIngestor],
+    metrics: slack_daily_summary_metrics.RunMetrics,
+    start_date: Optional[str],
+    end_date: Optional[str],
+    tz_name: str,
+    post: bool,
+    thread_lookback_days: float,
+    aggregation_processes: int,
+) -> List[DigestResult]:
+    windows, period = slack_daily_summary_rollups.resolve_days(start_date, end_date, tz_name)
+    logger.info(f"Summarizing {windows[0].day} to {windows[-1].day} ({tz_name}) into {len(digests)} digests")
+
+    # Stored rollups only hold the channels some digest covered when they were built
+    scope = slack_daily_summary_digests.scope_key(digests)
+
+    questions_state = open_questions_state(store, digests, windows, thread_lookback_days, bot_user_id)
+    outcomes: Dict[str, DigestResult] = {}
+    to_post = []
+    to_compute = []
+    refresh = False
+    for digest in digests:
+        key = digest_job_key(windows, tz_name, digest)
+        job = store.get_job(key) if post else None
+        if job is not None and job["state"] == JOB_POSTED:
+            logger.info(f"Summary {key} was already posted as {job['message_ts']}, not posting again")
+            metrics.counters["already_posted"] += 1
+            outcomes[digest.name] = DigestResult(digest, job["summary_text"], True)
+            continue
+        if job is not None and job["state"] == JOB_AGGREGATED and job["summary_text"]:
+            if cached_summary_fresh(store, job, windows, tz_name, scope, realtime, questions_state):
+                logger.info(f"Posting the summary {key} precomputed at {job['updated_at']:.0f}")
+                metrics.counters["cached_summary"] += 1
+                to_post.append((digest, key, job, job["summary_text"]))
+                continue
+            # Without a live event stream nothing saw the reactions and edits since the cache was built
+            refresh = refresh or not realtime_covers(realtime, job["started_at"])
+            logger.info(f"Precomputed summary {key} is stale, recomputing")
+        if post:
+            if job is not None:
+                logger.info(f"Resuming summary job {key} from state {job['state']}")
+            store.set_job_state(key, JOB_FETCHING)
+        to_compute.append((digest, key, job))
+
+    if to_compute:
+        texts = await _compute_summaries(
+            slack_client, bot_user_id, digests, [d for d, _, _ in to_compute], limiter, concurrency, store,
+            channel_directory, user_directory, idle_channel_days, realtime, metrics,
+            windows, period, tz_name, scope, refresh, thread_lookback_days, aggregation_processes,
+        )
+        questions_state = open_questions_state(store, digests, windows, thread_lookback_days, bot_user_id)
+        for digest, key, job in to_compute:
+            summary_text = texts[digest.name]
+            if summary_text and post:
+                save_aggregated(store, key, summary_text, questions_state)
+                to_post.append((digest, key, job, summary_text))
+            else:
+                outcomes[digest.name] = DigestResult(digest, summary_text, False)
+
+    if to_post:
+        with metrics.phase("posting"):
+            posted = await asyncio.gather(
+                *(
+                    _post_summary(slack_client, limiter, store, channel_directory, bot_user_id, digest.target_channel, key, job, summary_text, metrics)
+                    for digest, key, job, summary_text in to_post
+                ),
+                return_exceptions=True,
+            )
+        errors = []
+        for (digest, key, job, summary_text), found in zip(to_post, posted):
+            if isinstance(found, BaseException):
+                errors.append(found)
+            else:
+                outcomes[digest.name] = DigestResult(digest, summary_text, found)
+        # Every digest got its chance to post, a failed one stays resumable from its job state
+        if errors:
+            raise errors[0]
+    return [outcomes[d.name] for d in digests]
+
+
+async def _compute_summaries(
+    slack_client: AsyncWebClient,
+    bot_user_id: str,
+    all_digests: List[slack_daily_summary_digests.Digest],
+    digests: List[slack_daily_summary_digests.Digest],
+    limiter: slack_daily_summary_fetch.SlackRateLimiter,
+    concurrency: int,
+    store: slack_daily_summary_store.SummaryStore,
+    channel_directory: slack_daily_summary_channels.ChannelDirectory,
+    user_directory: slack_daily_summary_users.UserDirectory,
+    idle_channel_days: float,
+    realtime: Optional[slack_daily_summary_realtime.RealtimeIngestor],
+    metrics: slack_daily_summary_metrics.RunMetrics,
+    windows: List[slack_daily_summary_rollups.DayWindow],
+    period: str,
+    tz_name: str,
+    scope: str,
+    refresh: bool,
+    thread_lookback_days: float,
+    aggregation_processes: int,
+) -> Dict[str, Optional[str]]:
+    # Every channel any digest covers is fetched and rolled up once, each digest then merges its own subset
+    with metrics.phase("channel_listing"):
+        listed = await channel_directory.channels()
+    channels = [c for c in listed if slack_daily_summary_digests.covers(all_digests, c["name"])]
+    channel_names = {c["id"]: c["name"] for c in channels}
+    digest_channels = {d.name: d.channel_names(channel_names) for d in all_digests}
+    metrics.counters["channels_listed"] = len(listed)
+
+    if refresh:
+        with metrics.phase("late_edit_refresh"):
+            await refresh_late_edits(slack_client, limiter, concurrency, store, channels, windows, tz_name)
+
+    # Finished days are rolled up once, later summaries over them never touch raw messages again
+    complete = store.complete_rollup_days(tz_name, scope, [w.day for w in windows])
+    pending = [w for w in windows if w.day not in complete]
+    metrics.counters["days_from_rollups"] = len(windows) - len(pending)
+    computed: Dict[str, Dict[str, Any]] = {}
+    if pending:
+        oldest_ts, latest_ts = pending[0].oldest, pending[-1].latest
+
+        live_since, live_until = None, None
+        if realtime and realtime.connected_since is not None:
+            live_since, live_until = realtime.connected_since, realtime.live_until()
+            logger.info(f"Realtime events ingested since {live_since:.0f}, only reconciling channels synced before that")
+        fetches = slack_daily_summary_channels.plan_history_fetches(
+            channels, store, oldest_ts, latest_ts, idle_channel_days, live_since, live_until,
+        )
+        gap_starts = {c["id"]: o for c, o, _ in fetches}
+        # With events flowing since the last re-scan, realtime has kept every parent's latest_reply current
+        parents_current = realtime_covers(realtime, store.get_kv("threads_rescanned_at", 0.0))
+        rescan_since = oldest_ts - thread_lookback_days * 86400
+        if thread_lookback_days > 0 and not parents_current:
+            fetches = slack_daily_summary_threads.extend_fetches(store, fetches, rescan_since, latest_ts)
+        logger.info(f"Found {len(channels)} channels covered by digests, fetching {len(fetches)} with concurrency {concurrency}")
+        metrics.counters["channels_fetched"] = len(fetches)
+        fetch_started = time.time()
+        newest_seen: Dict[str, str] = {}
+        fetch_ranges = {c["id"]: (o, l) for c, o, l in fetches}
+
+        # A checkpoint only resumes the exact range it was taken for, anything else starts over from the newest page
+        cursors = {}
+        for channel_id, cp in store.load_cursors().items():
+            if fetch_ranges.get(channel_id) == (cp["oldest"], cp["latest"]):
+                cursors[channel_id] = cp["cursor"]
+                if cp["newest_ts"]:
+                    newest_seen[channel_id] = cp["newest_ts"]
+        if cursors:
+            logger.info(f"Resuming {len(cursors)} channel histories from checkpointed cursors")
+        metrics.counters["channels_resumed"] = len(cursors)
+
+        completed = set()
+        failures: Dict[str, str] = {}
+        backfilled: List[float] = []
+        with metrics.phase("history_fetch"):
+            async for channel, messages, next_cursor in slack_daily_summary_fetch.iter_channel_histories(
+                slack_client, fetches, limiter, concurrency, cursors, failures,
+            ):
+                store.upsert_messages(channel["id"], messages)
+                metrics.counters["messages_fetched"] += len(messages)
+                backfilled.extend(float(m["ts"]) for m in messages if gap_starts[channel["id"]] <= float(m["ts"]) < oldest_ts)
+                for msg in messages:
+                    if float(msg["ts"]) > float(newest_seen.get(channel["id"], 0)):
+                        newest_seen[channel["id"]] = msg["ts"]
+                o, l = fetch_ranges[channel["id"]]
+                if next_cursor:
+                    store.save_cursor(channel["id"], o, l, next_cursor, newest_seen.get(channel["id"]))
+                else:
+                    store.mark_synced(channel["id"], channel["name"], o, min(l, fetch_started), newest_seen.get(channel["id"]))
+                    completed.add(channel["id"])
+
+        for channel_id, error in failures.items():
+            if error in slack_daily_summary_channels.UNREADABLE_ERRORS:
+                # Nothing to miss in a channel the bot cannot read, and no reason to ask again next run
+                store.mark_unreadable(channel_id, error)
+                completed.add(channel_id)
+                metrics.counters["channels_unreadable"] += 1
+        all_fetched = len(completed) == len(fetch_ranges)
+        if backfilled:
+            # Days rolled up while a channel was skipped as idle now have its messages, roll them up again
+            logger.info(f"Fetched {len(backfilled)} messages from before the range, invalidating their days' rollups")
+            metrics.counters["messages_backfilled"] = len(backfilled)
+            slack_daily_summary_rollups.invalidate_at(store, *backfilled)
+            complete = store.complete_rollup_days(tz_name, scope, [w.day for w in windows])
+            pending = [w for w in windows if w.day not in complete]
+            metrics.counters["days_from_rollups"] = len(windows) - len(pending)
+        if not all_fetched:
+            logger.warning(f"{len(fetch_ranges) - len(completed)} channels failed to fetch, not storing rollups for this range")
+
+        if thread_lookback_days > 0:
+            with metrics.phase("thread_sync"):
+                reread = {cid for cid in completed if fetch_ranges[cid][0] <= rescan_since}
+                threads_synced = await slack_daily_summary_threads.sync_threads(
+                    slack_client, store, limiter, concurrency, channels, oldest_ts, latest_ts, thread_lookback_days, parents_current, reread,
+                )
+                if not parents_current and threads_synced:
+                    store.set_kv("threads_rescanned_at", fetch_started)
+            if not threads_synced:
+                logger.warning("Some threads failed to sync, not storing rollups for this range")
+                all_fetched = False
+        with metrics.phase("rollup"):
+            built = await slack_daily_summary_pool.build_day_rollups(store, pending, channel_names, bot_user_id, aggregation_processes)
+            for window in pending:
+                states = built[window.day]
+                # Only days that were over before the fetch started are final
+                if all_fetched and window.latest < fetch_started:
+                    store.save_rollups(window.day, tz_name, scope, states)
+                    for digest in all_digests:
+                        if "trending_topics" in digest.metrics:
+                            own = {cid: state for cid, state in states.items() if cid in digest_channels[digest.name]}
+                            slack_daily_summary_topics.save_day_terms(store, window.day, tz_name, digest_terms_scope(digest), own)
+                    metrics.counters["days_rolled_up"] += 1
+                else:
+                    computed[window.day] = states
+
+    with metrics.phase("aggregation"):
+        # Only channels still listed count, archived ones may linger in the store
+        scopes = {d.name: digest_channels[d.name] for d in digests}
+        merged = await slack_daily_summary_rollups.merge_scoped_rollups(store, tz_name, scope, windows, computed, scopes)
+
+    helpful = set()
+    for digest in digests:
+        results = merged[digest.name]
+        metrics.counters["messages_aggregated"] += results["totals"]["messages"]
+        if "most_helpful_user" in digest.metrics:
+            helpful.update(user_id for user_id, _ in results["most_helpful_user"][:digest.top_n])
+    usernames = {}
+    if helpful:
+        with metrics.phase("user_lookup"):
+            usernames = await user_directory.names(sorted(helpful))
+
+    questions = None
+    if any("open_question" in d.metrics for d in digests):
+        # Carried over as far back as thread sync keeps parents current, older answers would go unnoticed
+        questions = slack_daily_summary_questions.OpenQuestions(store, windows[0].oldest, windows[-1].latest, thread_lookback_days, bot_user_id)
+
+    texts: Dict[str, Optional[str]] = {}
+    for digest in digests:
+        results = merged[digest.name]
+        if "trending_topics" in digest.metrics:
+            baseline = slack_daily_summary_topics.load_baseline(store, tz_name, digest_terms_scope(digest), windows[0].day)
+            results["trending_topics"] = slack_daily_summary_topics.trending(results["trending_topics"], baseline)
+        if questions is not None:
+            results["open_question"] = questions.ranked(scopes[digest.name], digest.top_n)
+        totals = results["totals"]
+        if not totals["messages"]:
+            logger.info(f"No messages found for {period} in digest {digest.name}")
+            texts[digest.name] = None
+            continue
+        logger.info(f"Digest {digest.name}: {totals['messages']} messages from {totals['active_members']} unique users")
+        texts[digest.name] = slack_daily_summary_aggregate.format_summary(
+            digest.select(results), usernames, period, None if digest.is_default() else digest.name, digest.top_n,
+        )
+    return texts
+
+
+async def _post_summary(
+    slack_client: AsyncWebClient,
+    limiter: slack_daily_summary_fetch.SlackRateLimiter,
+    store: slack_daily_summary_store.SummaryStore,
+    channel_directory: slack_daily_summary_channels.ChannelDirectory,
+    bot_user_id: str,
+    target_channel: str,
+    key: str,
+    job: Optional[sqlite3.Row],
+    summary_text: str,
+    metrics: slack_daily_summary_metrics.RunMetrics,
+) -> bool:
+    # Returns whether an earlier attempt turned out to have posted it already
+    try:
+        channel_id = await channel_directory.get_id(target_channel)
+        message_ts = None
+        if job is not None and job["state"] == JOB_POSTING:
+            title = summary_text.split("\n", 1)[0]
+            message_ts = await find_posted_summary(slack_client, limiter, channel_id, bot_user_id, job["updated_at"] - 60, title)
+            if message_ts:
+                logger.info(f"Found the summary {key} already posted as {message_ts}")
+                metrics.counters["already_posted"] += 1
+                store.set_job_state(key, JOB_POSTED, message_ts=message_ts)
+                return True
+        store.set_job_state(key, JOB_POSTING)
+        response = await limiter.call(
+            "chat.postMessage",
+            slack_client.chat_postMessage,
+            channel=channel_id,
+            text=summary_text,
+        )
+        logger.info(f"Posted summary {key} to #{target_channel}")
+        store.set_job_state(key, JOB_POSTED, message_ts=response.get("ts"))
+        return False
+    except SlackApiError as e:
+        logger.error(f"Failed to post summary {key}: {e}")
+        raise
+
+
+def digest_terms_scope(digest: slack_daily_summary_digests.Digest) -> str:
+    # Trends are measured against the digest's own channels, a small team's everyday words are rare workspace-wide
+    return slack_daily_summary_digests.scope_key([digest])
+
+
+def realtime_covers(realtime: Optional[slack_daily_summary_realtime.RealtimeIngestor], since: float) -> bool:
+    return realtime is not None and realtime.connected_since is not None and realtime.connected_since <= since
+
+
+def open_questions_state(
+    store: slack_daily_summary_store.SummaryStore,
+    digests: List[slack_daily_summary_digests.Digest],
+    windows: List[slack_daily_summary_rollups.DayWindow],
+    thread_lookback_days: float,
+    bot_user_id: str,
+) -> Optional[str]:
+    if not any("open_question" in d.metrics for d in digests):
+        return None
+    return slack_daily_summary_questions.state_key(store, windows[0].oldest, windows[-1].latest, thread_lookback_days, bot_user_id)
+
+
+def save_aggregated(store: slack_daily_summary_store.SummaryStore, key: str, summary_text: str, questions_state: Optional[str]) -> None:
+    store.set_job_state(key, JOB_AGGREGATED, summary_text)
+    store.set_kv(f"open_questions:{key}", questions_state)
+
+
+def cached_summary_fresh(
+    store: slack_daily_summary_store.SummaryStore,
+    job: sqlite3.Row,
+    windows: List[slack_daily_summary_rollups.DayWindow],
+    tz_name: str,
+    scope: str,
+    realtime: Optional[slack_daily_summary_realtime.RealtimeIngestor],
+    questions_state: Optional[str] = None,
+) -> bool:
+    # Realtime drops a day's rollups on any late edit, so intact rollups no newer than the cache mean nothing changed
+    computed = store.complete_rollup_days(tz_name, scope, [w.day for w in windows])
+    if len(computed) < len(windows) or max(computed.values()) > job["updated_at"]:
+        return False
+    # Questions carried over from earlier days are not in those rollups, an answer or edit since shows in their state
+    if questions_state != store.get_kv(f"open_questions:{job['job_key']}"):
+        return False
+    return realtime_covers(realtime, job["started_at"])
+
+
+async def refresh_late_edits(
+    slack_client: AsyncWebClient,
+    limiter: slack_daily_summary_fetch.SlackRateLimiter,
+    concurrency: int,
+    store: slack_daily_summary_store.SummaryStore,
+    channels: List[Dict],
+    windows: List[slack_daily_summary_rollups.DayWindow],
+    tz_name: str,
+) -> None:
+    # Re-fetch only channels that had messages in the range, reactions and edits can only land on those
+    oldest, latest = windows[0].oldest, windows[-1].latest
+    active = store.message_counts_since(oldest, latest)
+    fetches = [(c, oldest, latest) for c in channels if c["id"] in active]
+    logger.info(f"Re-fetching {len(fetches)} active channels for late edits and reactions")
+    metrics = slack_daily_summary_metrics.current()
+    seen: Dict[str, Set[str]] = {}
+    async for channel, messages, next_cursor in slack_daily_summary_fetch.iter_channel_histories(
+        slack_client, fetches, limiter, concurrency,
+    ):
+        store.upsert_messages(channel["id"], messages)
+        seen.setdefault(channel["id"], set()).update(m["ts"] for m in messages if m.get("ts"))
+        if not next_cursor:
+            pruned = store.prune_messages(channel["id"], oldest, latest, seen.pop(channel["id"]))
+            if metrics:
+                metrics.counters["messages_pruned"] += pruned
+    store.invalidate_rollup_days(tz_name, [w.day for w in windows])
+
+
+async def precompute_summaries(
+    slack_client: AsyncWebClient,
+    bot_user_id: str,
+    digests: List[slack_daily_summary_digests.Digest],
+    store: slack_daily_summary_store.SummaryStore,
+    tz_name: str = slack_daily_summary_rollups.DEFAULT_TIMEZONE,
+    **kwargs,
+) -> List[DigestResult]:
+    # Computes yesterday's recaps ahead of the scheduled post, which then only checks freshness and posts them.
+    # Nothing to do once every digest was precomputed or posted, a restart later that day does not redo it
+    windows, _ = slack_daily_summary_rollups.resolve_days(None, None, tz_name)
+    keys = {d.name: digest_job_key(windows, tz_name, d) for d in digests}
+    jobs = {name: store.get_job(key) for name, key in keys.items()}
+    if all(job is not None and job["state"] in (JOB_AGGREGATED, JOB_POSTING, JOB_POSTED) for job in jobs.values()):
+        return []
+    results = await generate_summaries(
+        slack_client, bot_user_id, digests, store=store, tz_name=tz_name, post=False, **kwargs,
+    )
+    questions_state = open_questions_state(
+        store, digests, windows, kwargs.get("thread_lookback_days", slack_daily_summary_threads.DEFAULT_THREAD_LOOKBACK_DAYS), bot_user_id,
+    )
+    for result in results:
+        job = jobs[result.digest.name]
+        if not result.summary_text or (job is not None and job["state"] in (JOB_POSTING, JOB_POSTED)):
+            continue
+        save_aggregated(store, keys[result.digest.name], result.summary_text, questions_state)
+        logger.info(f"Precomputed summary {keys[result.digest.name]}")
+    return results
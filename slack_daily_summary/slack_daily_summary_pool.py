@@ -0,0 +1,90 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Any, Optional, List
+
+from slack_daily_summary import slack_daily_summary_store
+from slack_daily_summary import slack_daily_summary_rollups
+from slack_daily_summary import slack_daily_summary_metrics
+
+logger = logging.getLogger("slack_daily_summary")
+
+# Below this many messages a process pool costs more to start than it saves
+POOL_MIN_MESSAGES = 250_000
+# More shards than processes, so one busy channel does not leave the other processes idle at the end
+SHARDS_PER_PROCESS = 3
+
+
+def pool_processes(processes: int, messages: int, store_path: str) -> int:
+    # 0 means one per core, 1 never pools. Workers open the store themselves, so an in-memory store stays in-process.
+    if store_path == ":memory:" or messages < POOL_MIN_MESSAGES:
+        return 1
+    return max(1, processes or os.cpu_count() or 1)
+
+
+def plan_shards(counts: Dict[str, int], channel_ids: List[str], shards: int) -> List[List[str]]:
+    # Busiest channel first onto the lightest shard
+    planned: List[List[str]] = [[] for _ in range(shards)]
+    loads = [0] * shards
+    for channel_id in sorted(channel_ids, key=lambda c: counts.get(c, 0), reverse=True):
+        i = loads.index(min(loads))
+        planned[i].append(channel_id)
+        loads[i] += counts.get(channel_id, 0) + 1
+    return [s for s in planned if s]
+
+
+def rollup_shard(
+    store_path: str,
+    window: slack_daily_summary_rollups.DayWindow,
+    channel_names: Dict[str, str],
+    exclude_user: Optional[str],
+) -> Dict[str, Any]:
+    # Runs in a worker process, WAL lets it read while the bot keeps writing
+    store = slack_daily_summary_store.SummaryStore(store_path)
+    try:
+        return slack_daily_summary_rollups.compute_rollups(store, window, channel_names, exclude_user)
+    finally:
+        store.close()
+
+
+async def build_day_rollups(
+    store: slack_daily_summary_store.SummaryStore,
+    windows: List[slack_daily_summary_rollups.DayWindow],
+    channel_names: Dict[str, str],
+    exclude_user: Optional[str] = None,
+    processes: int = 0,
+) -> Dict[str, Dict[str, Any]]:
+    # Per-channel rollup states for each day. Per-channel states merge losslessly, so channel shards can be
+    # built in separate processes and simply combined, while the event loop only awaits their futures.
+    counts = store.message_counts_since(windows[0].oldest, windows[-1].latest)
+    messages = sum(n for channel_id, n in counts.items() if channel_id in channel_names)
+    workers = pool_processes(processes, messages, store.path)
+    metrics = slack_daily_summary_metrics.current()
+    if metrics:
+        metrics.counters["rollup_processes"] = workers
+
+    if workers == 1:
+        return {w.day: await slack_daily_summary_rollups.build_rollups(store, w, channel_names, exclude_user) for w in windows}
+
+    shards = plan_shards(counts, list(channel_names), workers * SHARDS_PER_PROCESS)
+    logger.info(f"Rolling up {messages} messages over {len(windows)} days in {workers} processes, {len(shards)} channel shards")
+    t0 = time.perf_counter()
+    loop = asyncio.get_running_loop()
+    # Forking a process with a running event loop and open sockets is unsafe, workers start fresh
+    pool = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn"))
+    try:
+        futures = [
+            (w.day, loop.run_in_executor(pool, rollup_shard, store.path, w, {c: channel_names[c] for c in shard}, exclude_user))
+            for w in windows
+            for shard in shards
+        ]
+        built: Dict[str, Dict[str, Any]] = {w.day: {} for w in windows}
+        for day, future in futures:
+            built[day].update(await future)
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+    logger.info(f"Pooled rollups took {time.perf_counter() - t0:.1f}s")
+    return built
@@ -0,0 +1,58 @@
+import hashlib
+import json
+import math
+from typing import Dict, Any, Optional, List
+
+from slack_daily_summary import slack_daily_summary_aggregate
+from slack_daily_summary import slack_daily_summary_records
+from slack_daily_summary import slack_daily_summary_store
+
+
+class OpenQuestions:
+    # Questions still unanswered at the end of the summarized range, asked in it or up to `carry_days` before.
+    # Read from the store's open_questions index, which answers and reactions already keep current, so carried
+    # over questions cost no history fetches. Older days stay current as long as their parents are rescanned,
+    # which is why the pipeline carries them over for thread_lookback_days.
+    def __init__(
+        self,
+        store: slack_daily_summary_store.SummaryStore,
+        oldest: float,
+        latest: float,
+        carry_days: float = 0,
+        exclude_user: Optional[str] = None,
+    ):
+        self.latest = latest
+        since = oldest - max(0.0, carry_days) * 86400
+        self.candidates = store.open_questions(since, latest, exclude_user)
+        self.activity = store.message_counts_since(since, latest)
+
+    def score(self, row: Any) -> float:
+        # The longer a question waited and the more its channel talked past it, the more it needs an answer
+        age_days = (self.latest - row["ts_num"]) / 86400
+        return age_days * math.log2(2 + self.activity.get(row["channel_id"], 0))
+
+    def ranked(self, channel_names: Dict[str, str], k: int) -> List[Dict[str, Any]]:
+        rows = [r for r in self.candidates if r["channel_id"] in channel_names]
+        top = slack_daily_summary_aggregate.top_k(rows, k, lambda r: (-self.score(r), r["ts_num"], r["channel_id"]))
+        return [
+            {
+                "text": (r["text"] or "")[:slack_daily_summary_records.TEXT_PREVIEW_CHARS],
+                "channel": channel_names[r["channel_id"]],
+                "age_days": int((self.latest - r["ts_num"]) // 86400),
+            }
+            for r in top
+        ]
+
+
+def state_key(
+    store: slack_daily_summary_store.SummaryStore,
+    oldest: float,
+    latest: float,
+    carry_days: float = 0,
+    exclude_user: Optional[str] = None,
+) -> str:
+    # Fingerprint of the candidates OpenQuestions would rank. Answering or editing a carried over question changes it
+    # without touching the rollups of the summarized range.
+    since = oldest - max(0.0, carry_days) * 86400
+    rows = [[r["channel_id"], r["ts_num"], r["text"]] for r in store.open_questions(since, latest, exclude_user)]
+    return hashlib.sha1(json.dumps(rows).encode()).hexdigest()[:16]
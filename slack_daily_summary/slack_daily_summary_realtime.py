@@ -0,0 +1,119 @@
+import logging
+import time
+from collections import deque
+from typing import Dict, Any, Optional
+
+from slack_sdk.web.async_client import AsyncWebClient
+from slack_sdk.socket_mode.aiohttp import SocketModeClient
+from slack_sdk.socket_mode.request import SocketModeRequest
+from slack_sdk.socket_mode.response import SocketModeResponse
+
+from slack_daily_summary import slack_daily_summary_store
+from slack_daily_summary import slack_daily_summary_rollups
+
+logger = logging.getLogger("slack_daily_summary")
+
+# Events still in flight when a summary starts are not trusted to be in the store yet
+LIVE_SAFETY_SECONDS = 10
+
+# Parent-thread updates, the reply itself arrives as its own event
+IGNORED_MESSAGE_SUBTYPES = {"message_replied"}
+
+
+class RealtimeIngestor:
+    # Socket Mode listener that keeps the store current, so the daily run only reconciles what it missed
+    def __init__(
+        self,
+        app_token: str,
+        web_client: AsyncWebClient,
+        store: slack_daily_summary_store.SummaryStore,
+    ):
+        self.store = store
+        self.client = SocketModeClient(app_token=app_token, web_client=web_client, logger=logger)
+        self.client.socket_mode_request_listeners.append(self.on_request)
+        self.client.message_listeners.append(self.on_message)
+        self.client.on_close_listeners.append(self.on_close)
+        # Start of the current unbroken connection, everything after it is in the store
+        self.connected_since: Optional[float] = None
+        self.recent_event_ids: deque = deque(maxlen=1000)
+        self.events_ingested = 0
+
+    async def start(self) -> None:
+        await self.client.connect()
+        logger.info("Socket Mode connected, ingesting message and reaction events")
+
+    async def stop(self) -> None:
+        self.connected_since = None
+        await self.client.close()
+
+    def live_until(self) -> float:
+        return time.time() - LIVE_SAFETY_SECONDS
+
+    async def on_message(self, client: SocketModeClient, message: Dict[str, Any], raw_message: Optional[str]) -> None:
+        if message.get("type") == "hello":
+            # Every (re)connect starts a new coverage window, events may have been lost in between
+            self.connected_since = time.time()
+
+    async def on_close(self, *args) -> None:
+        self.connected_since = None
+
+    async def on_request(self, client: SocketModeClient, req: SocketModeRequest) -> None:
+        if req.type != "events_api":
+            return
+        await client.send_socket_mode_response(SocketModeResponse(envelope_id=req.envelope_id))
+
+        event_id = req.payload.get("event_id")
+        if event_id:
+            if event_id in self.recent_event_ids:
+                return
+            self.recent_event_ids.append(event_id)
+
+        self.handle_event(req.payload.get("event", {}))
+
+    def handle_event(self, event: Dict[str, Any]) -> None:
+        event_type = event.get("type")
+
+        if event_type == "message":
+            self.handle_message(event)
+        elif event_type in ("reaction_added", "reaction_removed"):
+            item = event.get("item", {})
+            if item.get("type") == "message":
+                delta = 1 if event_type == "reaction_added" else -1
+                self.store.add_reactions(item["channel"], item["ts"], delta)
+                self.touched(item["ts"])
+        else:
+            return
+        self.events_ingested += 1
+
+    def touched(self, ts: Optional[str]) -> None:
+        if ts:
+            slack_daily_summary_rollups.invalidate_at(self.store, float(ts))
+
+    def handle_message(self, event: Dict[str, Any]) -> None:
+        channel_id = event.get("channel")
+        subtype = event.get("subtype")
+        if not channel_id or subtype in IGNORED_MESSAGE_SUBTYPES:
+            return
+
+        if subtype == "message_changed":
+            changed = event.get("message", {})
+            self.store.update_message_text(channel_id, changed.get("ts", ""), changed.get("text", ""))
+            self.touched(changed.get("ts"))
+            return
+
+        if subtype == "message_deleted":
+            # The deleted message only survives as previous_message, its thread_ts tells a reply from a parent
+            self.store.delete_message(channel_id, event.get("deleted_ts", ""), (event.get("previous_message") or {}).get("thread_ts"))
+            self.touched(event.get("deleted_ts"))
+            return
+
+        thread_ts = event.get("thread_ts")
+        is_reply = thread_ts and thread_ts != event.get("ts")
+        if is_reply:
+            # Same shape as conversations.history: replies only count on their parent, unless broadcast
+            self.store.add_thread_reply(channel_id, thread_ts, event)
+            self.touched(thread_ts)
+            if subtype != "thread_broadcast":
+                return
+
+        self.store.upsert_messages(channel_id, [event])
@@ -0,0 +1,61 @@
+from typing import Dict, Optional, List
+
+# Only this much text is kept per message, the recap never shows more than 80 characters
+TEXT_PREVIEW_CHARS = 160
+
+NO_USER = -1
+
+
+class Interner:
+    # Maps repeated ids (users, channels) to small ints so records don't each hold their own strings
+    def __init__(self):
+        self.index: Dict[str, int] = {}
+        self.values: List[str] = []
+
+    def intern(self, value: str) -> int:
+        i = self.index.get(value)
+        if i is None:
+            i = len(self.values)
+            self.index[value] = i
+            self.values.append(value)
+        return i
+
+    def value(self, i: int) -> str:
+        return self.values[i]
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+
+class MessageRecord:
+    # Threads and open questions are read from the store's own tables, records only carry what per-message metrics use
+    __slots__ = ("ts", "user", "channel", "reaction_count", "text")
+
+    def __init__(self, ts: float, user: int, channel: int, reaction_count: int, text: str):
+        self.ts = ts
+        self.user = user
+        self.channel = channel
+        self.reaction_count = reaction_count
+        self.text = text
+
+    def __repr__(self) -> str:
+        return f"MessageRecord(ts={self.ts}, user={self.user}, channel={self.channel}, reactions={self.reaction_count})"
+
+
+def from_fields(
+    channels: Interner,
+    users: Interner,
+    channel_id: str,
+    ts: float,
+    user: Optional[str],
+    text: Optional[str],
+    reaction_count: int,
+) -> MessageRecord:
+    return MessageRecord(
+        ts,
+        users.intern(user) if user else NO_USER,
+        channels.intern(channel_id),
+        reaction_count or 0,
+        (text or "")[:TEXT_PREVIEW_CHARS],
+    )
+
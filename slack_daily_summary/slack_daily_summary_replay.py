@@ -0,0 +1,285 @@
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, Any, Optional, List, Iterator, Tuple
+
+# Only the stdlib is imported up front so --help and bad arguments return instantly, the pipeline modules
+# (and the store's sqlite) load once there is something to replay
+
+logger = logging.getLogger("slack_daily_summary")
+
+BATCH_SIZE = 2000
+
+# Replay events: ("channel", None, channel), ("user", None, user) or ("message", channel_id, message)
+Event = Tuple[str, Optional[str], Dict[str, Any]]
+
+
+def iter_capture(path: str, first_day: Optional[date] = None, last_day: Optional[date] = None) -> Iterator[Event]:
+    # One JSON object per line: {"kind": "channel", "channel": {"id", "name"}}, {"kind": "user", "user": {"id", "name"}}
+    # or {"kind": "message", "channel": "C123", "message": {...}}, thread replies are messages with a thread_ts.
+    # Messages from UTC days outside [first_day, last_day] are skipped like the export's day files.
+    oldest = datetime.combine(first_day, datetime.min.time(), tzinfo=timezone.utc).timestamp() if first_day else None
+    latest = datetime.combine(last_day + timedelta(days=1), datetime.min.time(), tzinfo=timezone.utc).timestamp() if last_day else None
+    if path.endswith(".gz"):
+        import gzip
+        f = gzip.open(path, "rt", encoding="utf-8")
+    else:
+        f = open(path, encoding="utf-8")
+    with f:
+        for n, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"{path}:{n}: {e}")
+            kind = entry.get("kind")
+            if kind == "message":
+                ts = float(entry["message"].get("ts", 0))
+                if (oldest is not None and ts < oldest) or (latest is not None and ts >= latest):
+                    continue
+                yield "message", entry["channel"], entry["message"]
+            elif kind in ("channel", "user"):
+                yield kind, None, entry[kind]
+
+
+def iter_export(path: str, first_day: Optional[date] = None, last_day: Optional[date] = None) -> Iterator[Event]:
+    # A standard workspace export, unzipped or not: channels.json, groups.json, users.json and one
+    # <channel name>/<YYYY-MM-DD>.json array per channel and day. Day files outside [first_day, last_day] are
+    # never opened, and only one day file is in memory at a time.
+    import zipfile
+    if zipfile.is_zipfile(path):
+        archive = zipfile.ZipFile(path)
+        names = archive.namelist()
+        open_member = archive.open
+    else:
+        archive = None
+        names = []
+        for root, _, files in os.walk(path):
+            names.extend(os.path.relpath(os.path.join(root, f), path).replace(os.sep, "/") for f in files)
+
+        def open_member(name: str):
+            return open(os.path.join(path, name), "rb")
+
+    try:
+        listed = set(names)
+        by_name: Dict[str, str] = {}
+        for listing in ("channels.json", "groups.json"):
+            if listing in listed:
+                with open_member(listing) as f:
+                    for channel in json.load(f):
+                        by_name[channel["name"]] = channel["id"]
+                        yield "channel", None, channel
+        if "users.json" in listed:
+            with open_member("users.json") as f:
+                for user in json.load(f):
+                    yield "user", None, user
+
+        day_files = []
+        for name in names:
+            parts = name.split("/")
+            if len(parts) != 2 or parts[0] not in by_name or not parts[1].endswith(".json"):
+                continue
+            try:
+                day = date.fromisoformat(parts[1][:-5])
+            except ValueError:
+                continue
+            if (first_day and day < first_day) or (last_day and day > last_day):
+                continue
+            day_files.append((day, name, by_name[parts[0]]))
+        # Oldest first, so thread parents are stored before their replies
+        for _, name, channel_id in sorted(day_files):
+            with open_member(name) as f:
+                for msg in json.load(f):
+                    yield "message", channel_id, msg
+    finally:
+        if archive is not None:
+            archive.close()
+
+
+def is_reply(msg: Dict[str, Any]) -> bool:
+    # Exports and captures keep replies inline, the API only shows them through conversations.replies
+    thread_ts = msg.get("thread_ts")
+    return bool(thread_ts) and thread_ts != msg.get("ts") and msg.get("subtype") != "thread_broadcast"
+
+
+def load_events(store: Any, events: Iterator[Event], metrics: Any) -> Tuple[Dict[str, str], Dict[str, str]]:
+    # Streams events into the store in batches, returns channel names and user names
+    channel_names: Dict[str, str] = {}
+    usernames: Dict[str, str] = {}
+    messages: Dict[str, List[Dict]] = {}
+    replies: Dict[Tuple[str, str], List[Dict]] = {}
+    pending = 0
+
+    def flush() -> None:
+        for channel_id, batch in messages.items():
+            store.upsert_messages(channel_id, batch)
+        for (channel_id, thread_ts), batch in replies.items():
+            store.save_thread_replies(channel_id, thread_ts, batch, max((r["ts"] for r in batch), key=float))
+        messages.clear()
+        replies.clear()
+
+    for kind, channel_id, obj in events:
+        if kind == "channel":
+            channel_names[obj["id"]] = obj["name"]
+        elif kind == "user":
+            usernames[obj["id"]] = obj.get("name") or obj["id"]
+        elif not obj.get("ts"):
+            continue
+        elif is_reply(obj):
+            replies.setdefault((channel_id, obj["thread_ts"]), []).append(obj)
+            metrics.counters["replies_loaded"] += 1
+            pending += 1
+        else:
+            messages.setdefault(channel_id, []).append(obj)
+            metrics.counters["messages_loaded"] += 1
+            pending += 1
+        if pending >= BATCH_SIZE:
+            flush()
+            pending = 0
+    flush()
+    return channel_names, usernames
+
+
+async def replay(args: argparse.Namespace) -> Dict[str, Any]:
+    from slack_daily_summary import slack_daily_summary_store
+    from slack_daily_summary import slack_daily_summary_aggregate
+    from slack_daily_summary import slack_daily_summary_metrics
+    from slack_daily_summary import slack_daily_summary_rollups
+    from slack_daily_summary import slack_daily_summary_digests
+    from slack_daily_summary import slack_daily_summary_pool
+    from slack_daily_summary import slack_daily_summary_topics
+    from slack_daily_summary import slack_daily_summary_questions
+
+    metrics = slack_daily_summary_metrics.RunMetrics()
+    metrics_token = slack_daily_summary_metrics.current_run.set(metrics)
+    try:
+        windows, period = slack_daily_summary_rollups.resolve_days(args.start_date, args.end_date, args.timezone)
+        top_n = slack_daily_summary_digests.parse_top_n(args.top_n, "--top-n")
+        digests = [slack_daily_summary_digests.default_digest("replay", top_n)]
+        if args.digests:
+            with open(args.digests, encoding="utf-8") as f:
+                digests = slack_daily_summary_digests.parse_digests(f.read(), "replay", top_n)
+
+        # Threads started up to the lookback before the range still count the replies posted in it
+        first_day = date.fromisoformat(windows[0].day) - timedelta(days=args.thread_lookback_days + 1)
+        baseline_windows = []
+        if args.baseline_days > 0:
+            baseline_windows, _ = slack_daily_summary_rollups.resolve_days(
+                (date.fromisoformat(windows[0].day) - timedelta(days=args.baseline_days)).isoformat(),
+                (date.fromisoformat(windows[0].day) - timedelta(days=1)).isoformat(),
+                args.timezone,
+            )
+            first_day = min(first_day, date.fromisoformat(baseline_windows[0].day) - timedelta(days=1))
+        last_day = date.fromisoformat(windows[-1].day) + timedelta(days=1)
+        if os.path.isdir(args.source) or args.source.endswith(".zip"):
+            events = iter_export(args.source, first_day, last_day)
+        else:
+            events = iter_capture(args.source, first_day, last_day)
+
+        # A file rather than memory even when thrown away, so a large replay pages through SQLite's cache and can pool
+        scratch = None
+        store_path = args.store
+        if not store_path:
+            import tempfile
+            scratch = tempfile.TemporaryDirectory(prefix="slack_daily_summary_replay_")
+            store_path = os.path.join(scratch.name, "replay.sqlite")
+        store = slack_daily_summary_store.SummaryStore(store_path)
+        try:
+            with metrics.phase("load"):
+                channel_names, usernames = load_events(store, events, metrics)
+            metrics.counters["channels_listed"] = len(channel_names)
+            channel_names = {cid: name for cid, name in channel_names.items() if slack_daily_summary_digests.covers(digests, name)}
+
+            with metrics.phase("rollup"):
+                computed = await slack_daily_summary_pool.build_day_rollups(store, windows, channel_names, args.exclude_user, args.processes)
+            with metrics.phase("aggregation"):
+                scopes = {d.name: d.channel_names(channel_names) for d in digests}
+                merged = await slack_daily_summary_rollups.merge_scoped_rollups(
+                    store, args.timezone, slack_daily_summary_digests.scope_key(digests), windows, computed, scopes,
+                )
+            # Trending baselines are rolled up here rather than read from the term table, a replay stores no days.
+            # Each digest's comes from its own channels, like the pipeline's
+            baselines = {d.name: slack_daily_summary_topics.Baseline(0, 0, {}) for d in digests}
+            if baseline_windows:
+                with metrics.phase("baseline"):
+                    built = await slack_daily_summary_pool.build_day_rollups(store, baseline_windows, channel_names, args.exclude_user, args.processes)
+                    for digest in digests:
+                        own = scopes[digest.name]
+                        baselines[digest.name] = slack_daily_summary_topics.sum_baseline([
+                            slack_daily_summary_topics.day_terms({cid: state for cid, state in states.items() if cid in own})
+                            for states in built.values()
+                        ])
+            questions = slack_daily_summary_questions.OpenQuestions(
+                store, windows[0].oldest, windows[-1].latest, args.thread_lookback_days, args.exclude_user,
+            )
+        finally:
+            store.close()
+            if scratch is not None:
+                scratch.cleanup()
+
+        recaps = {}
+        for digest in digests:
+            results = merged[digest.name]
+            results["trending_topics"] = slack_daily_summary_topics.trending(results["trending_topics"], baselines[digest.name])
+            results["open_question"] = questions.ranked(scopes[digest.name], digest.top_n)
+            metrics.counters["messages_aggregated"] += results["totals"]["messages"]
+            if not results["totals"]["messages"]:
+                recaps[digest.name] = None
+                continue
+            recaps[digest.name] = slack_daily_summary_aggregate.format_summary(
+                digest.select(results), usernames, period, None if digest.is_default() else digest.name, digest.top_n,
+            )
+        logger.info(f"Replayed {windows[0].day} to {windows[-1].day} ({args.timezone})")
+        return {"recaps": recaps, "metrics": metrics.snapshot()}
+    finally:
+        slack_daily_summary_metrics.current_run.reset(metrics_token)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the summary pipeline offline over a recorded JSONL capture or a Slack workspace export")
+    parser.add_argument("source", help="JSONL capture (optionally .gz), export directory or export .zip")
+    parser.add_argument("--start-date", required=True, help="First day to summarize as YYYY-MM-DD")
+    parser.add_argument("--end-date", help="Last day to summarize as YYYY-MM-DD (inclusive), defaults to --start-date")
+    parser.add_argument("--timezone", default="Asia/Kolkata", help="IANA timezone for day boundaries")
+    parser.add_argument("--digests", help="JSON file with digest definitions, same format as the digests setup value")
+    parser.add_argument("--top-n", type=int, default=1, help="Entries per ranked section of the recap")
+    parser.add_argument("--exclude-user", help="User id whose messages are left out, normally the bot's own")
+    parser.add_argument("--thread-lookback-days", type=int, default=7, help="Days of earlier export files to load for thread parents")
+    parser.add_argument("--baseline-days", type=int, default=0, help="Days before the range to load and roll up as the trending topics baseline, 0 leaves trending topics out")
+    parser.add_argument("--store", help="SQLite store path to keep, by default a temporary file removed afterwards. Use :memory: for small replays")
+    parser.add_argument("--processes", type=int, default=0, help="Rollup processes for large replays, 0 is one per core, 1 never pools")
+    parser.add_argument("--json", action="store_true", help="Print recaps and metrics as JSON")
+    parser.add_argument("--verbose", action="store_true", help="Show the pipeline's own logging")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING, format="%(asctime)s %(message)s")
+    t0 = time.perf_counter()
+    import asyncio
+    try:
+        report = asyncio.run(replay(args))
+    except (OSError, ValueError, KeyError) as e:
+        print(f"replay failed: {type(e).__name__}: {e}", file=sys.stderr)
+        sys.exit(1)
+    report["wall_seconds"] = round(time.perf_counter() - t0, 3)
+
+    if args.json:
+        print(json.dumps(report, indent=2, ensure_ascii=False))
+        return
+    for name, recap in report["recaps"].items():
+        print(recap or f"No activity for digest {name}")
+        print()
+    snapshot = report["metrics"]
+    counters = snapshot["counters"]
+    print(f"loaded {counters.get('messages_loaded', 0)} messages and {counters.get('replies_loaded', 0)} replies "
+          f"from {counters.get('channels_listed', 0)} channels in {report['wall_seconds']:.3f}s")
+    for phase, seconds in snapshot["phase_seconds"].items():
+        print(f"  {phase:<12} {seconds:8.3f}s")
+
+
+if __name__ == "__main__":
+    main()
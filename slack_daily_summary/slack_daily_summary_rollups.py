@@ -0,0 +1,178 @@
+import asyncio
+from datetime import datetime, date, timedelta
+from typing import Dict, Any, Optional, List, NamedTuple, Tuple, Iterator
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from slack_daily_summary import slack_daily_summary_aggregate
+from slack_daily_summary import slack_daily_summary_records
+from slack_daily_summary import slack_daily_summary_store
+
+DEFAULT_TIMEZONE = "Asia/Kolkata"
+MAX_RANGE_DAYS = 92
+
+
+class DayWindow(NamedTuple):
+    day: str
+    oldest: float
+    latest: float
+
+
+def parse_timezone(tz_name: str) -> ZoneInfo:
+    try:
+        return ZoneInfo(tz_name or DEFAULT_TIMEZONE)
+    except (ZoneInfoNotFoundError, ValueError):
+        raise ValueError(f"Unknown timezone {tz_name!r}, use an IANA name like Asia/Kolkata or Europe/Berlin")
+
+
+def resolve_days(
+    start_date: Optional[str],
+    end_date: Optional[str],
+    tz_name: str = DEFAULT_TIMEZONE,
+    now: Optional[datetime] = None,
+) -> Tuple[List[DayWindow], str]:
+    # Returns one window per calendar day in tz, both ends inclusive, and a label for the recap title
+    tz = parse_timezone(tz_name)
+    today = (now or datetime.now(tz)).astimezone(tz).date()
+    yesterday = today - timedelta(days=1)
+    try:
+        start = date.fromisoformat(start_date) if start_date else None
+        end = date.fromisoformat(end_date) if end_date else None
+    except ValueError:
+        raise ValueError(f"Dates must look like 2024-01-31, got {start_date!r} and {end_date!r}")
+    start = start or end or yesterday
+    end = end or start
+    if end < start:
+        raise ValueError(f"end_date {end} is before start_date {start}")
+    if end > today:
+        raise ValueError(f"end_date {end} is in the future")
+    if (end - start).days + 1 > MAX_RANGE_DAYS:
+        raise ValueError(f"At most {MAX_RANGE_DAYS} days per summary, got {(end - start).days + 1}")
+
+    windows = []
+    d = start
+    while d <= end:
+        day_start = datetime.combine(d, datetime.min.time(), tzinfo=tz)
+        next_start = datetime.combine(d + timedelta(days=1), datetime.min.time(), tzinfo=tz)
+        windows.append(DayWindow(d.isoformat(), day_start.timestamp(), next_start.timestamp() - 1e-6))
+        d += timedelta(days=1)
+
+    if start == end:
+        label = "Yesterday" if start == yesterday else start.isoformat()
+    else:
+        label = f"{start.isoformat()} – {end.isoformat()}"
+    return windows, label
+
+
+def invalidate_at(store: slack_daily_summary_store.SummaryStore, *timestamps: float) -> None:
+    # A late edit, reaction or reply to a message from a rolled up day makes that day's rollups stale
+    for tz_name in store.rollup_timezones():
+        tz = parse_timezone(tz_name)
+        days = {datetime.fromtimestamp(ts, tz).date().isoformat() for ts in timestamps}
+        store.invalidate_rollup_days(tz_name, sorted(days))
+
+
+class RollupBuilder:
+    # One accumulator set per channel for the day, kept as mergeable JSON state keyed by channel id
+    def __init__(self, channel_names: Dict[str, str]):
+        self.channel_names = channel_names
+        self.channels = slack_daily_summary_records.Interner()
+        self.users = slack_daily_summary_records.Interner()
+        self.per_channel: Dict[int, slack_daily_summary_aggregate.AggregationEngine] = {}
+
+    def engine_for(self, channel: int) -> slack_daily_summary_aggregate.AggregationEngine:
+        engine = self.per_channel.get(channel)
+        if engine is None:
+            engine = slack_daily_summary_aggregate.AggregationEngine(
+                slack_daily_summary_aggregate.default_accumulators(self.channel_names, self.channels, self.users),
+            )
+            self.per_channel[channel] = engine
+        return engine
+
+    def pages(
+        self,
+        store: slack_daily_summary_store.SummaryStore,
+        window: DayWindow,
+        exclude_user: Optional[str] = None,
+    ) -> Iterator[List[slack_daily_summary_records.MessageRecord]]:
+        return store.iter_records(window.oldest, window.latest, self.channels, self.users, exclude_user, set(self.channel_names))
+
+    def add_page(self, page: List[slack_daily_summary_records.MessageRecord]) -> None:
+        for rec in page:
+            for acc in self.engine_for(rec.channel).accumulators:
+                acc.add(rec)
+
+    def add_thread_activity(
+        self,
+        store: slack_daily_summary_store.SummaryStore,
+        window: DayWindow,
+        exclude_user: Optional[str] = None,
+    ) -> None:
+        for channel_id, thread_ts, replies, text in store.iter_thread_activity(window.oldest, window.latest, exclude_user, set(self.channel_names)):
+            self.engine_for(self.channels.intern(channel_id)).add_threads([(thread_ts, replies, text)])
+
+    def states(self) -> Dict[str, Any]:
+        return {self.channels.value(c): engine.state() for c, engine in self.per_channel.items()}
+
+
+def compute_rollups(
+    store: slack_daily_summary_store.SummaryStore,
+    window: DayWindow,
+    channel_names: Dict[str, str],
+    exclude_user: Optional[str] = None,
+) -> Dict[str, Any]:
+    # Same as build_rollups without yielding to an event loop, for worker processes
+    builder = RollupBuilder(channel_names)
+    for page in builder.pages(store, window, exclude_user):
+        builder.add_page(page)
+    builder.add_thread_activity(store, window, exclude_user)
+    return builder.states()
+
+
+async def build_rollups(
+    store: slack_daily_summary_store.SummaryStore,
+    window: DayWindow,
+    channel_names: Dict[str, str],
+    exclude_user: Optional[str] = None,
+) -> Dict[str, Any]:
+    builder = RollupBuilder(channel_names)
+    for page in builder.pages(store, window, exclude_user):
+        builder.add_page(page)
+        await asyncio.sleep(0)
+    builder.add_thread_activity(store, window, exclude_user)
+    return builder.states()
+
+
+async def merge_scoped_rollups(
+    store: slack_daily_summary_store.SummaryStore,
+    tz_name: str,
+    rollup_scope: str,
+    windows: List[DayWindow],
+    computed: Dict[str, Dict[str, Any]],
+    scopes: Dict[str, Dict[str, str]],
+) -> Dict[str, Dict[str, Any]]:
+    # One read of the stored days feeds every scope, a channel's state goes to each scope that lists it.
+    # Stored days come from the store, days that could not be stored yet (today, failed fetches) from `computed`.
+    channels = slack_daily_summary_records.Interner()
+    users = slack_daily_summary_records.Interner()
+    engines = {
+        name: slack_daily_summary_aggregate.AggregationEngine(
+            slack_daily_summary_aggregate.default_accumulators(channel_names, channels, users),
+        )
+        for name, channel_names in scopes.items()
+    }
+
+    def merge(channel_id: str, state: Dict[str, Any]) -> None:
+        for name, channel_names in scopes.items():
+            if channel_id in channel_names:
+                engines[name].merge(state)
+
+    stored_days = [w.day for w in windows if w.day not in computed]
+    if stored_days:
+        for i, (day, channel_id, state) in enumerate(store.iter_rollups(tz_name, rollup_scope, stored_days)):
+            merge(channel_id, state)
+            if i % 1000 == 999:
+                await asyncio.sleep(0)
+    for states in computed.values():
+        for channel_id, state in states.items():
+            merge(channel_id, state)
+    return {name: engine.results() for name, engine in engines.items()}
@@ -0,0 +1,575 @@
+import json
+import logging
+import sqlite3
+import time
+from pathlib import Path
+from typing import Dict, Any, Optional, List, Tuple, Iterator, Set
+
+from slack_daily_summary import slack_daily_summary_records
+from slack_daily_summary.slack_daily_summary_records import MessageRecord, Interner
+
+logger = logging.getLogger("slack_daily_summary")
+
+# Each entry upgrades the schema by one version, PRAGMA user_version tracks how far a file got
+MIGRATIONS = [
+    """
+    CREATE TABLE messages (
+        channel_id TEXT NOT NULL,
+        ts TEXT NOT NULL,
+        ts_num REAL NOT NULL,
+        user TEXT,
+        text TEXT,
+        thread_ts TEXT,
+        reply_count INTEGER NOT NULL DEFAULT 0,
+        reaction_count INTEGER NOT NULL DEFAULT 0,
+        subtype TEXT,
+        PRIMARY KEY (channel_id, ts)
+    );
+    CREATE INDEX messages_by_time ON messages (ts_num);
+    CREATE TABLE channel_sync (
+        channel_id TEXT PRIMARY KEY,
+        channel_name TEXT,
+        synced_from REAL NOT NULL,
+        synced_until REAL NOT NULL,
+        latest_ts TEXT,
+        synced_at REAL NOT NULL
+    );
+    """,
+    """
+    CREATE TABLE channels (
+        channel_id TEXT PRIMARY KEY,
+        name TEXT NOT NULL,
+        data TEXT NOT NULL
+    );
+    CREATE TABLE kv (
+        key TEXT PRIMARY KEY,
+        value TEXT NOT NULL
+    );
+    """,
+    """
+    CREATE TABLE users (
+        user_id TEXT PRIMARY KEY,
+        name TEXT NOT NULL,
+        fetched_at REAL NOT NULL
+    );
+    """,
+    """
+    CREATE TABLE rollups (
+        day TEXT NOT NULL,
+        tz TEXT NOT NULL,
+        channel_id TEXT NOT NULL,
+        state TEXT NOT NULL,
+        PRIMARY KEY (day, tz, channel_id)
+    );
+    CREATE TABLE rollup_days (
+        day TEXT NOT NULL,
+        tz TEXT NOT NULL,
+        computed_at REAL NOT NULL,
+        PRIMARY KEY (day, tz)
+    );
+    """,
+    """
+    CREATE TABLE fetch_cursors (
+        channel_id TEXT PRIMARY KEY,
+        oldest REAL NOT NULL,
+        latest REAL NOT NULL,
+        cursor TEXT NOT NULL,
+        newest_ts TEXT,
+        saved_at REAL NOT NULL
+    );
+    CREATE TABLE jobs (
+        job_key TEXT PRIMARY KEY,
+        state TEXT NOT NULL,
+        summary_text TEXT,
+        message_ts TEXT,
+        started_at REAL NOT NULL,
+        updated_at REAL NOT NULL
+    );
+    """,
+    """
+    ALTER TABLE messages ADD COLUMN latest_reply TEXT;
+    CREATE TABLE thread_replies (
+        channel_id TEXT NOT NULL,
+        ts TEXT NOT NULL,
+        thread_ts TEXT NOT NULL,
+        ts_num REAL NOT NULL,
+        user TEXT,
+        PRIMARY KEY (channel_id, ts)
+    );
+    CREATE INDEX thread_replies_by_time ON thread_replies (ts_num);
+    CREATE TABLE threads (
+        channel_id TEXT NOT NULL,
+        thread_ts TEXT NOT NULL,
+        latest_reply TEXT NOT NULL,
+        synced_at REAL NOT NULL,
+        PRIMARY KEY (channel_id, thread_ts)
+    );
+    """,
+    """
+    CREATE TABLE unreadable_channels (
+        channel_id TEXT PRIMARY KEY,
+        error TEXT NOT NULL,
+        checked_at REAL NOT NULL
+    );
+    """,
+    """
+    CREATE TABLE term_days (
+        day TEXT NOT NULL,
+        tz TEXT NOT NULL,
+        docs INTEGER NOT NULL,
+        PRIMARY KEY (day, tz)
+    );
+    CREATE TABLE term_df (
+        day TEXT NOT NULL,
+        tz TEXT NOT NULL,
+        term TEXT NOT NULL,
+        docs INTEGER NOT NULL,
+        PRIMARY KEY (day, tz, term)
+    );
+    """,
+    """
+    CREATE INDEX open_questions ON messages (ts_num) WHERE reply_count = 0 AND reaction_count = 0 AND instr(text, '?') > 0;
+    """,
+    # Rollups and term tables per digest scope, personas sharing a store with different channel patterns keep their own.
+    # Both are rebuilt from stored messages, so the old rows are dropped rather than carried over.
+    """
+    DROP TABLE rollups;
+    DROP TABLE rollup_days;
+    DROP TABLE term_days;
+    DROP TABLE term_df;
+    CREATE TABLE rollups (
+        day TEXT NOT NULL,
+        tz TEXT NOT NULL,
+        scope TEXT NOT NULL,
+        channel_id TEXT NOT NULL,
+        state TEXT NOT NULL,
+        PRIMARY KEY (day, tz, scope, channel_id)
+    );
+    CREATE TABLE rollup_days (
+        day TEXT NOT NULL,
+        tz TEXT NOT NULL,
+        scope TEXT NOT NULL,
+        computed_at REAL NOT NULL,
+        PRIMARY KEY (day, tz, scope)
+    );
+    CREATE TABLE term_days (
+        day TEXT NOT NULL,
+        tz TEXT NOT NULL,
+        scope TEXT NOT NULL,
+        docs INTEGER NOT NULL,
+        PRIMARY KEY (day, tz, scope)
+    );
+    CREATE TABLE term_df (
+        day TEXT NOT NULL,
+        tz TEXT NOT NULL,
+        scope TEXT NOT NULL,
+        term TEXT NOT NULL,
+        docs INTEGER NOT NULL,
+        PRIMARY KEY (day, tz, scope, term)
+    );
+    """,
+]
+
+
+# Larger channel filters are applied in Python rather than as an IN list
+SQL_IN_LIMIT = 500
+
+
+def default_store_path(team_id: str) -> str:
+    return str(Path.cwd() / f"slack_daily_summary_{team_id or 'default'}.sqlite3")
+
+
+def message_row(channel_id: str, msg: Dict) -> Tuple:
+    reaction_count = sum(r.get("count", 0) for r in msg.get("reactions", []))
+    return (
+        channel_id,
+        msg["ts"],
+        float(msg["ts"]),
+        msg.get("user"),
+        msg.get("text", ""),
+        msg.get("thread_ts"),
+        msg.get("reply_count", 0),
+        reaction_count,
+        msg.get("subtype"),
+        msg.get("latest_reply"),
+    )
+
+
+def plan_range(sync: Optional[sqlite3.Row], oldest: float, latest: float) -> Optional[Tuple[float, float]]:
+    # Only the part of [oldest, latest] past the high-water mark needs the API, None when fully covered
+    if sync is None or oldest < sync["synced_from"] or oldest > sync["synced_until"]:
+        return oldest, latest
+    if latest <= sync["synced_until"]:
+        return None
+    return sync["synced_until"], latest
+
+
+class SummaryStore:
+    def __init__(self, path: str):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self._migrate()
+
+    def _migrate(self) -> None:
+        version = self.conn.execute("PRAGMA user_version").fetchone()[0]
+        for i, script in enumerate(MIGRATIONS[version:], start=version + 1):
+            with self.conn:
+                self.conn.executescript(script)
+                self.conn.execute(f"PRAGMA user_version = {i}")
+            logger.info(f"Migrated {self.path} to schema version {i}")
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def upsert_messages(self, channel_id: str, messages: List[Dict]) -> None:
+        rows = [message_row(channel_id, m) for m in messages if m.get("ts")]
+        if not rows:
+            return
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO messages VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+
+    def add_reactions(self, channel_id: str, ts: str, delta: int) -> None:
+        with self.conn:
+            self.conn.execute(
+                "UPDATE messages SET reaction_count = MAX(0, reaction_count + ?) WHERE channel_id = ? AND ts = ?",
+                (delta, channel_id, ts),
+            )
+
+    def add_thread_reply(self, channel_id: str, thread_ts: str, reply: Dict) -> None:
+        # A reply seen live: count it on the parent, and if the thread's replies were in sync before, they still are
+        parent = self.conn.execute(
+            "SELECT latest_reply FROM messages WHERE channel_id = ? AND ts = ?", (channel_id, thread_ts),
+        ).fetchone()
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR IGNORE INTO thread_replies VALUES (?, ?, ?, ?, ?)",
+                (channel_id, reply["ts"], thread_ts, float(reply["ts"]), reply.get("user")),
+            )
+            self.conn.execute(
+                "UPDATE messages SET reply_count = reply_count + 1, thread_ts = ts, latest_reply = ? WHERE channel_id = ? AND ts = ?",
+                (reply["ts"], channel_id, thread_ts),
+            )
+            if parent is not None and parent["latest_reply"]:
+                self.conn.execute(
+                    "UPDATE threads SET latest_reply = ?, synced_at = ? WHERE channel_id = ? AND thread_ts = ? AND latest_reply = ?",
+                    (reply["ts"], time.time(), channel_id, thread_ts, parent["latest_reply"]),
+                )
+
+    def update_message_text(self, channel_id: str, ts: str, text: str) -> None:
+        with self.conn:
+            self.conn.execute("UPDATE messages SET text = ? WHERE channel_id = ? AND ts = ?", (text, channel_id, ts))
+
+    def delete_message(self, channel_id: str, ts: str, thread_ts: Optional[str] = None) -> None:
+        # A deleted reply also comes off its parent's count, and if it was the latest one, the next stored reply
+        # becomes the latest of both the parent and the synced thread
+        if not thread_ts:
+            row = self.conn.execute("SELECT thread_ts FROM thread_replies WHERE channel_id = ? AND ts = ?", (channel_id, ts)).fetchone()
+            thread_ts = row["thread_ts"] if row else None
+        with self.conn:
+            self.conn.execute("DELETE FROM messages WHERE channel_id = ? AND ts = ?", (channel_id, ts))
+            self.conn.execute("DELETE FROM thread_replies WHERE channel_id = ? AND ts = ?", (channel_id, ts))
+            if not thread_ts or thread_ts == ts:
+                return
+            previous = self.conn.execute(
+                "SELECT ts FROM thread_replies WHERE channel_id = ? AND thread_ts = ? ORDER BY ts_num DESC LIMIT 1", (channel_id, thread_ts),
+            ).fetchone()
+            previous_ts = previous["ts"] if previous else None
+            self.conn.execute(
+                "UPDATE messages SET reply_count = MAX(0, reply_count - 1), "
+                "latest_reply = CASE WHEN reply_count <= 1 THEN NULL WHEN latest_reply = ? THEN COALESCE(?, latest_reply) ELSE latest_reply END "
+                "WHERE channel_id = ? AND ts = ?",
+                (ts, previous_ts, channel_id, thread_ts),
+            )
+            if previous_ts is None:
+                self.conn.execute("DELETE FROM threads WHERE channel_id = ? AND thread_ts = ? AND latest_reply = ?", (channel_id, thread_ts, ts))
+            else:
+                self.conn.execute(
+                    "UPDATE threads SET latest_reply = ? WHERE channel_id = ? AND thread_ts = ? AND latest_reply = ?",
+                    (previous_ts, channel_id, thread_ts, ts),
+                )
+
+    def prune_messages(self, channel_id: str, oldest: float, latest: float, keep: Set[str]) -> int:
+        # After a complete re-fetch of [oldest, latest], anything Slack no longer returned was deleted
+        rows = self.conn.execute(
+            "SELECT ts FROM messages WHERE channel_id = ? AND ts_num >= ? AND ts_num <= ?",
+            (channel_id, oldest, latest),
+        )
+        gone = [(channel_id, r["ts"]) for r in rows if r["ts"] not in keep]
+        if gone:
+            with self.conn:
+                self.conn.executemany("DELETE FROM messages WHERE channel_id = ? AND ts = ?", gone)
+        return len(gone)
+
+    def get_sync(self, channel_id: str) -> Optional[sqlite3.Row]:
+        return self.conn.execute("SELECT * FROM channel_sync WHERE channel_id = ?", (channel_id,)).fetchone()
+
+    def load_sync(self) -> Dict[str, sqlite3.Row]:
+        return {r["channel_id"]: r for r in self.conn.execute("SELECT * FROM channel_sync")}
+
+    def message_counts_since(self, oldest: float, latest: Optional[float] = None) -> Dict[str, int]:
+        rows = self.conn.execute(
+            "SELECT channel_id, COUNT(*) AS n FROM messages WHERE ts_num >= ? AND ts_num <= ? GROUP BY channel_id",
+            (oldest, latest if latest is not None else float("inf")),
+        )
+        return {r["channel_id"]: r["n"] for r in rows}
+
+    def mark_synced(self, channel_id: str, channel_name: str, oldest: float, latest: float, latest_ts: Optional[str]) -> None:
+        sync = self.get_sync(channel_id)
+        synced_from, synced_until = oldest, latest
+        if sync is not None and sync["synced_from"] <= latest and oldest <= sync["synced_until"]:
+            synced_from = min(oldest, sync["synced_from"])
+            synced_until = max(latest, sync["synced_until"])
+        if sync is not None and sync["latest_ts"] and (not latest_ts or float(sync["latest_ts"]) > float(latest_ts)):
+            latest_ts = sync["latest_ts"]
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO channel_sync VALUES (?, ?, ?, ?, ?, ?)",
+                (channel_id, channel_name, synced_from, synced_until, latest_ts, time.time()),
+            )
+            self.conn.execute("DELETE FROM fetch_cursors WHERE channel_id = ?", (channel_id,))
+            self.conn.execute("DELETE FROM unreadable_channels WHERE channel_id = ?", (channel_id,))
+
+    def load_unreadable(self) -> Dict[str, sqlite3.Row]:
+        return {r["channel_id"]: r for r in self.conn.execute("SELECT * FROM unreadable_channels")}
+
+    def mark_unreadable(self, channel_id: str, error: str) -> None:
+        # Cleared again by the next successful fetch of the channel
+        with self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO unreadable_channels VALUES (?, ?, ?)", (channel_id, error, time.time()))
+
+    def load_cursors(self) -> Dict[str, sqlite3.Row]:
+        return {r["channel_id"]: r for r in self.conn.execute("SELECT * FROM fetch_cursors")}
+
+    def save_cursor(self, channel_id: str, oldest: float, latest: float, cursor: str, newest_ts: Optional[str]) -> None:
+        # Checkpoint of a half-paginated channel, mark_synced drops it once the last page is in
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO fetch_cursors VALUES (?, ?, ?, ?, ?, ?)",
+                (channel_id, oldest, latest, cursor, newest_ts, time.time()),
+            )
+
+    def stale_threads(self, since: float, oldest: float, latest: float) -> List[sqlite3.Row]:
+        # Parents since `since` with a reply after `oldest` whose stored replies are behind their latest_reply.
+        # A never synced thread that lies entirely within [oldest, latest] is left out, its reply_count is exact.
+        return self.conn.execute(
+            "SELECT m.channel_id, m.ts, m.latest_reply, t.latest_reply AS synced_reply FROM messages m "
+            "LEFT JOIN threads t ON t.channel_id = m.channel_id AND t.thread_ts = m.ts "
+            "WHERE m.ts_num >= ? AND m.reply_count > 0 AND m.latest_reply IS NOT NULL "
+            "AND CAST(m.latest_reply AS REAL) >= ? AND (t.latest_reply IS NULL OR t.latest_reply != m.latest_reply) "
+            "AND NOT (t.latest_reply IS NULL AND m.ts_num >= ? AND CAST(m.latest_reply AS REAL) <= ?)",
+            (since, oldest, oldest, latest),
+        ).fetchall()
+
+    def save_thread_replies(self, channel_id: str, thread_ts: str, replies: List[Dict], latest_reply: str) -> None:
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO thread_replies VALUES (?, ?, ?, ?, ?)",
+                [(channel_id, r["ts"], thread_ts, float(r["ts"]), r.get("user")) for r in replies],
+            )
+            self.conn.execute(
+                "INSERT OR REPLACE INTO threads VALUES (?, ?, ?, ?)",
+                (channel_id, thread_ts, latest_reply, time.time()),
+            )
+
+    def iter_thread_activity(
+        self,
+        oldest: float,
+        latest: float,
+        exclude_user: Optional[str] = None,
+        channel_ids: Optional[Set[str]] = None,
+    ) -> Iterator[Tuple[str, str, int, str]]:
+        # (channel_id, thread_ts, replies, parent text) for threads with replies in the window. Threads whose replies
+        # were synced count the replies posted in the window, others fall back to the parent's reply_count.
+        exclude_user = exclude_user or ""
+        in_window: Dict[Tuple[str, str], int] = {}
+        rows = self.conn.execute(
+            "SELECT channel_id, thread_ts, COUNT(*) AS n FROM thread_replies "
+            "WHERE ts_num >= ? AND ts_num <= ? AND (user IS NULL OR user != ?) GROUP BY channel_id, thread_ts",
+            (oldest, latest, exclude_user),
+        )
+        for r in rows:
+            in_window[(r["channel_id"], r["thread_ts"])] = r["n"]
+
+        seen = set()
+        rows = self.conn.execute(
+            "SELECT m.channel_id, m.ts, m.text, m.reply_count, t.thread_ts IS NOT NULL AS synced FROM messages m "
+            "LEFT JOIN threads t ON t.channel_id = m.channel_id AND t.thread_ts = m.ts "
+            "WHERE m.ts_num >= ? AND m.ts_num <= ? AND m.reply_count > 0 AND (m.user IS NULL OR m.user != ?)",
+            (oldest, latest, exclude_user),
+        )
+        for r in rows:
+            key = (r["channel_id"], r["ts"])
+            seen.add(key)
+            if channel_ids is None or r["channel_id"] in channel_ids:
+                replies = in_window.get(key, 0) if r["synced"] else r["reply_count"]
+                if replies:
+                    yield r["channel_id"], r["ts"], replies, (r["text"] or "")[:slack_daily_summary_records.TEXT_PREVIEW_CHARS]
+
+        # Threads started before the window
+        for (channel_id, thread_ts), n in in_window.items():
+            if (channel_id, thread_ts) in seen or (channel_ids is not None and channel_id not in channel_ids):
+                continue
+            parent = self.conn.execute(
+                "SELECT text, user FROM messages WHERE channel_id = ? AND ts = ?", (channel_id, thread_ts),
+            ).fetchone()
+            if parent is None or (parent["user"] and parent["user"] == exclude_user):
+                continue
+            yield channel_id, thread_ts, n, (parent["text"] or "")[:slack_daily_summary_records.TEXT_PREVIEW_CHARS]
+
+    def get_job(self, job_key: str) -> Optional[sqlite3.Row]:
+        return self.conn.execute("SELECT * FROM jobs WHERE job_key = ?", (job_key,)).fetchone()
+
+    def set_job_state(self, job_key: str, state: str, summary_text: Optional[str] = None, message_ts: Optional[str] = None) -> None:
+        now = time.time()
+        with self.conn:
+            self.conn.execute(
+                "INSERT INTO jobs VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT (job_key) DO UPDATE SET "
+                "state = excluded.state, summary_text = COALESCE(excluded.summary_text, summary_text), "
+                "message_ts = COALESCE(excluded.message_ts, message_ts), updated_at = excluded.updated_at",
+                (job_key, state, summary_text, message_ts, now, now),
+            )
+
+    def get_kv(self, key: str, default: Any = None) -> Any:
+        row = self.conn.execute("SELECT value FROM kv WHERE key = ?", (key,)).fetchone()
+        return json.loads(row["value"]) if row else default
+
+    def set_kv(self, key: str, value: Any) -> None:
+        with self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO kv VALUES (?, ?)", (key, json.dumps(value)))
+
+    def load_channels(self) -> List[Dict]:
+        return [json.loads(r["data"]) for r in self.conn.execute("SELECT data FROM channels ORDER BY name")]
+
+    def save_channels(self, channels: List[Dict], listed_at: float) -> None:
+        with self.conn:
+            self.conn.execute("DELETE FROM channels")
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO channels VALUES (?, ?, ?)",
+                [(c["id"], c["name"], json.dumps(c)) for c in channels],
+            )
+            self.conn.execute("INSERT OR REPLACE INTO kv VALUES (?, ?)", ("channels_listed_at", json.dumps(listed_at)))
+
+    def load_users(self, user_ids: List[str]) -> Dict[str, Tuple[str, float]]:
+        found = {}
+        for i in range(0, len(user_ids), 500):
+            chunk = user_ids[i:i + 500]
+            rows = self.conn.execute(
+                f"SELECT * FROM users WHERE user_id IN ({','.join('?' * len(chunk))})",
+                chunk,
+            )
+            for r in rows:
+                found[r["user_id"]] = (r["name"], r["fetched_at"])
+        return found
+
+    def save_users(self, users: Dict[str, str], fetched_at: float) -> None:
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO users VALUES (?, ?, ?)",
+                [(user_id, name, fetched_at) for user_id, name in users.items()],
+            )
+
+    def complete_rollup_days(self, tz: str, scope: str, days: List[str]) -> Dict[str, float]:
+        # Day -> when its rollups were computed, for the days that have them
+        rows = self.conn.execute(
+            f"SELECT day, computed_at FROM rollup_days WHERE tz = ? AND scope = ? AND day IN ({','.join('?' * len(days))})",
+            [tz, scope] + days,
+        )
+        return {r["day"]: r["computed_at"] for r in rows}
+
+    def rollup_timezones(self) -> List[str]:
+        return [r["tz"] for r in self.conn.execute("SELECT DISTINCT tz FROM rollup_days")]
+
+    def invalidate_rollup_days(self, tz: str, days: List[str]) -> None:
+        # Every scope's rollups of the day go, a late edit changes what all of them saw.
+        # The per-channel rows stay until the day is rolled up again, only complete days are ever read
+        with self.conn:
+            self.conn.executemany("DELETE FROM rollup_days WHERE tz = ? AND day = ?", [(tz, day) for day in days])
+
+    def save_rollups(self, day: str, tz: str, scope: str, states: Dict[str, Any]) -> None:
+        with self.conn:
+            self.conn.execute("DELETE FROM rollups WHERE day = ? AND tz = ? AND scope = ?", (day, tz, scope))
+            self.conn.executemany(
+                "INSERT INTO rollups VALUES (?, ?, ?, ?, ?)",
+                [(day, tz, scope, channel_id, json.dumps(state)) for channel_id, state in states.items()],
+            )
+            self.conn.execute("INSERT OR REPLACE INTO rollup_days VALUES (?, ?, ?, ?)", (day, tz, scope, time.time()))
+
+    def save_term_days(self, day: str, tz: str, scope: str, docs: int, terms: Dict[str, int], oldest_kept: str) -> None:
+        # Replaces one day of the rolling document-frequency table and drops days that fell out of the window
+        with self.conn:
+            self.conn.execute("DELETE FROM term_df WHERE day = ? AND tz = ? AND scope = ?", (day, tz, scope))
+            self.conn.executemany("INSERT INTO term_df VALUES (?, ?, ?, ?, ?)", [(day, tz, scope, term, n) for term, n in terms.items()])
+            self.conn.execute("INSERT OR REPLACE INTO term_days VALUES (?, ?, ?, ?)", (day, tz, scope, docs))
+            # Every scope ages out together, so scopes no persona uses any more do not linger
+            self.conn.execute("DELETE FROM term_df WHERE tz = ? AND day < ?", (tz, oldest_kept))
+            self.conn.execute("DELETE FROM term_days WHERE tz = ? AND day < ?", (tz, oldest_kept))
+
+    def term_baseline(self, tz: str, scope: str, first_day: str, last_day: str) -> Tuple[int, int, Dict[str, int]]:
+        # Stored days, messages and per-term document frequency summed over [first_day, last_day]
+        days, docs = self.conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(docs), 0) FROM term_days WHERE tz = ? AND scope = ? AND day >= ? AND day <= ?",
+            (tz, scope, first_day, last_day),
+        ).fetchone()
+        rows = self.conn.execute(
+            "SELECT term, SUM(docs) FROM term_df WHERE tz = ? AND scope = ? AND day >= ? AND day <= ? GROUP BY term",
+            (tz, scope, first_day, last_day),
+        )
+        return days, docs, {term: n for term, n in rows}
+
+    def iter_rollups(self, tz: str, scope: str, days: List[str]) -> Iterator[Tuple[str, str, Any]]:
+        rows = self.conn.execute(
+            f"SELECT day, channel_id, state FROM rollups WHERE tz = ? AND scope = ? AND day IN ({','.join('?' * len(days))})",
+            [tz, scope] + days,
+        )
+        for r in rows:
+            yield r["day"], r["channel_id"], json.loads(r["state"])
+
+    def open_questions(self, oldest: float, latest: float, exclude_user: Optional[str] = None) -> List[sqlite3.Row]:
+        # Same condition as the open_questions partial index, so SQLite reads the index rather than the messages.
+        # The index follows every upsert, reaction, reply and delete, an answered question simply drops out of it.
+        return self.conn.execute(
+            "SELECT channel_id, ts_num, text FROM messages "
+            "WHERE reply_count = 0 AND reaction_count = 0 AND instr(text, '?') > 0 "
+            "AND ts_num >= ? AND ts_num <= ? AND (user IS NULL OR user != ?) ORDER BY ts_num",
+            (oldest, latest, exclude_user or ""),
+        ).fetchall()
+
+    def iter_records(
+        self,
+        oldest: float,
+        latest: float,
+        channels: Interner,
+        users: Interner,
+        exclude_user: Optional[str] = None,
+        channel_ids: Optional[Set[str]] = None,
+        page_size: int = 1000,
+    ) -> Iterator[List[MessageRecord]]:
+        # Plain tuples straight into compact records, no per-row dicts
+        cur = self.conn.cursor()
+        cur.row_factory = None
+        query = (
+            "SELECT channel_id, ts_num, user, text, reaction_count FROM messages "
+            "WHERE ts_num >= ? AND ts_num <= ? AND (user IS NULL OR user != ?)"
+        )
+        params = [oldest, latest, exclude_user or ""]
+        if channel_ids is not None and len(channel_ids) <= SQL_IN_LIMIT:
+            # A shard of a few channels should not read and drop every other channel's rows
+            query += f" AND channel_id IN ({', '.join('?' * len(channel_ids))})"
+            params.extend(channel_ids)
+        cur.execute(query + " ORDER BY ts_num", params)
+        from_fields = slack_daily_summary_records.from_fields
+        while True:
+            rows = cur.fetchmany(page_size)
+            if not rows:
+                break
+            yield [
+                from_fields(channels, users, *row)
+                for row in rows
+                if channel_ids is None or row[0] in channel_ids
+            ]
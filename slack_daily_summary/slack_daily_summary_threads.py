@@ -0,0 +1,136 @@
+import asyncio
+import logging
+import time
+from typing import Dict, Any, Optional, List, AsyncIterator, Set, Tuple
+
+from slack_sdk.web.async_client import AsyncWebClient
+from slack_sdk.errors import SlackApiError
+
+from slack_daily_summary import slack_daily_summary_fetch
+from slack_daily_summary import slack_daily_summary_store
+from slack_daily_summary import slack_daily_summary_metrics
+
+logger = logging.getLogger("slack_daily_summary")
+
+DEFAULT_THREAD_LOOKBACK_DAYS = 7
+
+
+async def iter_thread_reply_pages(
+    slack_client: AsyncWebClient,
+    channel_id: str,
+    thread_ts: str,
+    limiter: slack_daily_summary_fetch.SlackRateLimiter,
+    after: Optional[str] = None,
+) -> AsyncIterator[List[Dict]]:
+    cursor = None
+    while True:
+        response = await limiter.call(
+            "conversations.replies",
+            slack_client.conversations_replies,
+            channel=channel_id,
+            ts=thread_ts,
+            oldest=after,
+            limit=1000,
+            cursor=cursor,
+        )
+        # The parent comes back as the first message of every thread
+        yield [m for m in response["messages"] if m.get("ts") != thread_ts]
+        cursor = response.get("response_metadata", {}).get("next_cursor")
+        if not cursor:
+            break
+
+
+def extend_fetches(
+    store: slack_daily_summary_store.SummaryStore,
+    fetches: List[Tuple[Dict, float, float]],
+    since: float,
+    latest: float,
+) -> List[Tuple[Dict, float, float]]:
+    # Re-reads the parents of active channels within the history call that fetches their new messages, a week
+    # of history mostly fits in the same page, so the re-scan rarely costs a call of its own
+    active = store.message_counts_since(since, latest)
+    return [(c, min(o, since) if c["id"] in active else o, l) for c, o, l in fetches]
+
+
+async def rescan_parents(
+    slack_client: AsyncWebClient,
+    store: slack_daily_summary_store.SummaryStore,
+    limiter: slack_daily_summary_fetch.SlackRateLimiter,
+    concurrency: int,
+    channels: List[Dict],
+    since: float,
+    until: float,
+    latest: float,
+    reread: Set[str],
+) -> bool:
+    # Replies don't show up in channel history, only as a newer latest_reply on their parent, so re-read the
+    # [since, until) parents of channels active any time up to `latest`, unless the history fetch already has.
+    # Returns whether every channel was re-read.
+    active = store.message_counts_since(since, latest)
+    fetches = [(c, since, until) for c in channels if c["id"] in active and c["id"] not in reread]
+    complete = set()
+    async for channel, messages, next_cursor in slack_daily_summary_fetch.iter_channel_histories(
+        slack_client, fetches, limiter, concurrency,
+    ):
+        store.upsert_messages(channel["id"], messages)
+        if not next_cursor:
+            store.mark_synced(channel["id"], channel["name"], since, until, None)
+            complete.add(channel["id"])
+    return len(complete) == len(fetches)
+
+
+async def sync_threads(
+    slack_client: AsyncWebClient,
+    store: slack_daily_summary_store.SummaryStore,
+    limiter: slack_daily_summary_fetch.SlackRateLimiter,
+    concurrency: int,
+    channels: List[Dict],
+    oldest: float,
+    latest: float,
+    lookback_days: float = DEFAULT_THREAD_LOOKBACK_DAYS,
+    parents_current: bool = False,
+    reread: Set[str] = frozenset(),
+) -> bool:
+    # Brings the stored replies of every thread with a reply in [oldest, latest] up to date, started up to
+    # `lookback_days` earlier. Threads whose latest_reply did not move since their last sync cost nothing,
+    # and so do threads that never left the window.
+    # Returns whether every thread is in sync, so the caller knows if the result is final.
+    since = oldest - lookback_days * 86400
+    metrics = slack_daily_summary_metrics.current()
+    complete = True
+
+    if not parents_current:
+        complete = await rescan_parents(slack_client, store, limiter, concurrency, channels, since, oldest, latest, reread)
+
+    listed = {c["id"] for c in channels}
+    stale = [r for r in store.stale_threads(since, oldest, latest) if r["channel_id"] in listed]
+    logger.info(f"Syncing replies of {len(stale)} threads with new activity")
+    if metrics:
+        metrics.counters["threads_synced"] = len(stale)
+
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    failed = 0
+
+    async def sync_one(thread: Any) -> None:
+        nonlocal failed
+        async with semaphore:
+            replies = []
+            try:
+                async for page in iter_thread_reply_pages(
+                    slack_client, thread["channel_id"], thread["ts"], limiter, thread["synced_reply"],
+                ):
+                    replies.extend(page)
+            except SlackApiError as e:
+                logger.warning(f"Failed to fetch replies of {thread['channel_id']}/{thread['ts']}: {e}")
+                failed += 1
+                return
+            latest_reply = max([thread["latest_reply"]] + [r["ts"] for r in replies], key=float)
+            store.save_thread_replies(thread["channel_id"], thread["ts"], replies, latest_reply)
+            if metrics:
+                metrics.counters["thread_replies_fetched"] += len(replies)
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(sync_one(t) for t in stale))
+    if stale:
+        logger.info(f"Synced {len(stale) - failed} threads in {time.perf_counter() - t0:.1f}s")
+    return complete and not failed
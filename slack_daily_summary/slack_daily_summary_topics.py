@@ -0,0 +1,122 @@
+import math
+import re
+from collections import defaultdict
+from datetime import date, timedelta
+from typing import Dict, Any, Optional, List, Set, NamedTuple, Tuple
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Trailing days a day's terms are compared against, and how many of them must be stored before trends mean anything
+BASELINE_DAYS = 14
+MIN_BASELINE_DAYS = 3
+# Document-frequency rows kept per day, and how far back the table reaches before old days are pruned
+DAY_TERMS = 5000
+KEEP_DAYS = 2 * BASELINE_DAYS
+# A term needs this many messages in the summarized range and this many times its baseline rate to trend
+MIN_TERM_DOCS = 3
+MIN_LIFT = 2.0
+TRENDING_TERMS = 5
+
+MARKUP_RE = re.compile(r"<[^>]*>|:[a-z0-9_+'-]+:|```.*?```|`[^`]*`", re.S)
+# Words of three or more characters, identifiers like k8s or run-book included
+TOKEN_RE = re.compile(r"[a-z][a-z0-9_-]+[a-z0-9]")
+STOPWORDS = frozenset("""
+    a about above after again against all also am an and any anyone are aren as at be because been before being below
+    between both but by can cannot could did didn do does doesn doing don down during each either else even ever every
+    few for from further get gets getting got had has have having he hello her here hers herself hey hi him himself his how i if in
+    into is isn it its itself just know let like ll make many may me might more most much must my myself need no nor
+    not now of off ok okay on once one only or other our ours out over own please re really same see she should so some
+    still such sure than thank thanks that the their theirs them then there these they thing things think this those
+    though through to too under until up us use used using ve very via want was wasn way we well were what when where
+    which while who whom why will with would yeah yes yet you your yours yourself
+    http https www com slack channel message messages
+""".split())
+
+
+def terms(text: str) -> Set[str]:
+    # Distinct content words of one message, Slack mentions, links, emoji and code stripped
+    text = MARKUP_RE.sub(" ", text.lower())
+    return {t for t in TOKEN_RE.findall(text) if len(t) <= 30 and t not in STOPWORDS}
+
+
+class Baseline(NamedTuple):
+    days: int
+    docs: int
+    terms: Dict[str, int]
+
+
+def day_terms(states: Dict[str, Any], limit: int = DAY_TERMS) -> Dict[str, Any]:
+    # One day's document frequencies over every channel, from that day's per-channel rollup states
+    docs = 0
+    counts: Dict[str, int] = defaultdict(int)
+    for state in states.values():
+        topics = state.get("trending_topics")
+        if not topics:
+            continue
+        docs += topics["docs"]
+        for term, n in topics["terms"].items():
+            counts[term] += n
+    if len(counts) > limit:
+        counts = dict(sorted(counts.items(), key=lambda x: (-x[1], x[0]))[:limit])
+    return {"docs": docs, "terms": dict(counts)}
+
+
+def save_day_terms(store: Any, day: str, tz_name: str, scope: str, states: Dict[str, Any]) -> None:
+    # A day joins the rolling table once its rollups are final, earlier days are never rescanned
+    terms_of_day = day_terms(states)
+    oldest_kept = (date.fromisoformat(day) - timedelta(days=KEEP_DAYS)).isoformat()
+    store.save_term_days(day, tz_name, scope, terms_of_day["docs"], terms_of_day["terms"], oldest_kept)
+
+
+def baseline_days(first_day: str) -> Tuple[str, str]:
+    start = date.fromisoformat(first_day)
+    return (start - timedelta(days=BASELINE_DAYS)).isoformat(), (start - timedelta(days=1)).isoformat()
+
+
+def load_baseline(store: Any, tz_name: str, scope: str, first_day: str) -> Baseline:
+    return Baseline(*store.term_baseline(tz_name, scope, *baseline_days(first_day)))
+
+
+def sum_baseline(days: List[Dict[str, Any]]) -> Baseline:
+    # Same totals as load_baseline, for day_terms computed in memory
+    counts: Dict[str, int] = defaultdict(int)
+    for terms_of_day in days:
+        for term, n in terms_of_day["terms"].items():
+            counts[term] += n
+    return Baseline(sum(1 for d in days if d["docs"]), sum(d["docs"] for d in days), dict(counts))
+
+
+def score_terms(counts: List[int], docs: int, baseline: List[int], baseline_docs: int) -> List[float]:
+    # tf * log(rate / baseline rate): how much more often a term shows up than usual, weighted by how often
+    # it shows up at all. The baseline rate is smoothed so terms it never saw do not divide by zero.
+    if np is not None:
+        tf = np.asarray(counts, dtype=np.float64)
+        base_rate = (np.asarray(baseline, dtype=np.float64) + 1.0) / (baseline_docs + 1.0)
+        lift = (tf / docs) / base_rate
+        return np.where(lift >= MIN_LIFT, tf * np.log(np.maximum(lift, 1.0)), 0.0).tolist()
+    scores = []
+    for n, b in zip(counts, baseline):
+        lift = (n / docs) / ((b + 1.0) / (baseline_docs + 1.0))
+        scores.append(n * math.log(lift) if lift >= MIN_LIFT else 0.0)
+    return scores
+
+
+def trending(result: Optional[Dict[str, Any]], baseline: Baseline, limit: int = TRENDING_TERMS) -> List[str]:
+    # Terms of the summarized range that are unusually frequent against the BASELINE_DAYS before it
+    if not result or not result["docs"] or baseline.days < MIN_BASELINE_DAYS or not baseline.docs:
+        return []
+    candidates = sorted(t for t, n in result["terms"].items() if n >= MIN_TERM_DOCS)
+    if not candidates:
+        return []
+    scores = score_terms(
+        [result["terms"][t] for t in candidates],
+        result["docs"],
+        [baseline.terms.get(t, 0) for t in candidates],
+        baseline.docs,
+    )
+    # Candidates are sorted by term, so equal scores keep alphabetical order
+    ranked = sorted(range(len(candidates)), key=lambda i: -scores[i])
+    return [candidates[i] for i in ranked[:limit] if scores[i] > 0]
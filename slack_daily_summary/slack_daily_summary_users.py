@@ -0,0 +1,117 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, List, Tuple
+
+from slack_sdk.web.async_client import AsyncWebClient
+from slack_sdk.errors import SlackApiError
+
+from slack_daily_summary import slack_daily_summary_fetch
+from slack_daily_summary import slack_daily_summary_store
+
+logger = logging.getLogger("slack_daily_summary")
+
+# Below this many misses individual users.info calls are cheaper than a full users.list sweep
+USERS_INFO_MAX_MISSES = 5
+
+
+class UserDirectory:
+    # user_id -> name, LRU in memory, persisted in the store, refilled in bulk with users.list
+    def __init__(
+        self,
+        slack_client: AsyncWebClient,
+        store: slack_daily_summary_store.SummaryStore,
+        limiter: Optional[slack_daily_summary_fetch.SlackRateLimiter] = None,
+        ttl_seconds: float = 86400,
+        max_entries: int = 50_000,
+    ):
+        self.slack_client = slack_client
+        self.store = store
+        self.limiter = limiter or slack_daily_summary_fetch.SlackRateLimiter()
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.cache: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self.lock = asyncio.Lock()
+
+    def _remember(self, user_id: str, name: str, fetched_at: float) -> None:
+        self.cache[user_id] = (name, fetched_at)
+        self.cache.move_to_end(user_id)
+        while len(self.cache) > self.max_entries:
+            self.cache.popitem(last=False)
+
+    def _cached(self, user_ids: List[str]) -> Dict[str, str]:
+        now = time.time()
+        found = {}
+        missing = []
+        for user_id in user_ids:
+            hit = self.cache.get(user_id)
+            if hit and now - hit[1] < self.ttl_seconds:
+                self.cache.move_to_end(user_id)
+                found[user_id] = hit[0]
+            else:
+                missing.append(user_id)
+        if missing:
+            for user_id, (name, fetched_at) in self.store.load_users(missing).items():
+                if now - fetched_at < self.ttl_seconds:
+                    self._remember(user_id, name, fetched_at)
+                    found[user_id] = name
+        return found
+
+    async def prefetch(self) -> None:
+        users = {}
+        cursor = None
+        while True:
+            response = await self.limiter.call(
+                "users.list",
+                self.slack_client.users_list,
+                limit=200,
+                cursor=cursor,
+            )
+            for member in response["members"]:
+                users[member["id"]] = member["name"]
+
+            cursor = response.get("response_metadata", {}).get("next_cursor")
+            if not cursor:
+                break
+
+        fetched_at = time.time()
+        self.store.save_users(users, fetched_at)
+        for user_id, name in users.items():
+            self._remember(user_id, name, fetched_at)
+        logger.info(f"Prefetched {len(users)} users")
+
+    async def _fetch_one(self, user_id: str) -> Optional[str]:
+        try:
+            user_info = await self.limiter.call("users.info", self.slack_client.users_info, user=user_id)
+        except SlackApiError as e:
+            logger.warning(f"Failed to look up user {user_id}: {e}")
+            return None
+        name = user_info["user"]["name"]
+        fetched_at = time.time()
+        self.store.save_users({user_id: name}, fetched_at)
+        self._remember(user_id, name, fetched_at)
+        return name
+
+    async def names(self, user_ids: List[str]) -> Dict[str, str]:
+        # Unknown or deleted users map to their id so callers can always render something
+        user_ids = list(dict.fromkeys(user_ids))
+        found = self._cached(user_ids)
+        missing = [u for u in user_ids if u not in found]
+        if missing:
+            async with self.lock:
+                found.update(self._cached(missing))
+                missing = [u for u in missing if u not in found]
+                if len(missing) > USERS_INFO_MAX_MISSES:
+                    try:
+                        await self.prefetch()
+                    except SlackApiError as e:
+                        logger.warning(f"Failed to list users: {e}")
+                    found.update(self._cached(missing))
+                    # Whoever is still missing was not in the listing either, no point asking one by one
+                    missing = []
+                for user_id in missing:
+                    name = await self._fetch_one(user_id)
+                    if name:
+                        found[user_id] = name
+        return {u: found.get(u, u) for u in user_ids}
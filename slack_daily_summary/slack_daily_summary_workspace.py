@@ -0,0 +1,125 @@
+import asyncio
+import logging
+import time
+from typing import Dict, Any, Optional, Tuple, Awaitable, Callable
+
+from slack_daily_summary import slack_daily_summary_fetch
+from slack_daily_summary import slack_daily_summary_metrics
+
+logger = logging.getLogger("slack_daily_summary")
+
+# Reads whose identical in-flight calls are made once for every persona of a workspace
+SHARED_METHODS = {
+    "conversations.history",
+    "conversations.info",
+    "conversations.list",
+    "conversations.replies",
+    "users.conversations",
+    "users.info",
+    "users.list",
+}
+# Listings are also reused for a while after they complete, personas scheduled together start a few seconds apart
+CACHED_METHODS = {"conversations.list", "users.conversations", "users.list"}
+CACHE_SECONDS = 60
+
+
+class SingleFlight:
+    # Callers asking for the same key while it runs share one task, so a caller being cancelled
+    # does not cancel the call for the others
+    def __init__(self, cache_seconds: float = CACHE_SECONDS):
+        self.cache_seconds = cache_seconds
+        self.running: Dict[Any, asyncio.Task] = {}
+        self.cached: Dict[Any, Tuple[float, Any]] = {}
+
+    async def do(self, key: Any, fn: Callable[[], Awaitable[Any]], cache: bool = False) -> Tuple[Any, bool]:
+        # Returns (result, shared), shared is True when another caller's call was reused
+        now = time.monotonic()
+        hit = self.cached.get(key)
+        if hit is not None:
+            if hit[0] > now:
+                return hit[1], True
+            del self.cached[key]
+        task = self.running.get(key)
+        if task is not None:
+            return await asyncio.shield(task), True
+
+        task = asyncio.ensure_future(fn())
+        self.running[key] = task
+
+        def finished(t: asyncio.Task) -> None:
+            self.running.pop(key, None)
+            if t.cancelled() or t.exception() is not None:
+                return
+            if cache:
+                self.prune(time.monotonic())
+                self.cached[key] = (time.monotonic() + self.cache_seconds, t.result())
+
+        task.add_done_callback(finished)
+        return await asyncio.shield(task), False
+
+    def prune(self, now: float) -> None:
+        for key in [k for k, (expires, _) in self.cached.items() if expires <= now]:
+            del self.cached[key]
+
+
+class WorkspaceLimiter(slack_daily_summary_fetch.SlackRateLimiter):
+    # One rate limit budget per token, with identical reads deduplicated across everyone holding it
+    def __init__(self, tiers: Optional[Dict[str, Tuple[float, int]]] = None, flights: Optional[SingleFlight] = None):
+        super().__init__(tiers)
+        self.flights = flights or SingleFlight()
+
+    def scaled(self, share: float) -> "WorkspaceLimiter":
+        base = super().scaled(share)
+        low = WorkspaceLimiter(base.tiers, self.flights)
+        low.default_tier = base.default_tier
+        low.paused_until = self.paused_until
+        low.parent = self
+        return low
+
+    async def call(self, method: str, fn: Callable[..., Awaitable[Any]], **kwargs) -> Any:
+        if method not in SHARED_METHODS:
+            return await super().call(method, fn, **kwargs)
+        key = (method, tuple(sorted(kwargs.items())))
+        response, shared = await self.flights.do(key, lambda: super(WorkspaceLimiter, self).call(method, fn, **kwargs), method in CACHED_METHODS)
+        if shared:
+            metrics = slack_daily_summary_metrics.current()
+            if metrics:
+                metrics.counters["api_calls_shared"] += 1
+        return response
+
+
+class Workspace:
+    def __init__(self, team_id: str):
+        self.team_id = team_id
+        self.limiter = WorkspaceLimiter()
+        self.background: Dict[float, WorkspaceLimiter] = {}
+        self.personas = 0
+
+    def background_limiter(self, share: float) -> WorkspaceLimiter:
+        # Every persona's background work draws from the same reduced budget, and gives way to any persona's requests
+        if share not in self.background:
+            self.background[share] = self.limiter.scaled(share)
+        return self.background[share]
+
+
+# Keyed by token: Slack limits each app per workspace, and what a listing returns depends on the bot user
+_workspaces: Dict[str, Workspace] = {}
+
+
+def acquire(token: str, team_id: str) -> Workspace:
+    workspace = _workspaces.get(token)
+    if workspace is None:
+        workspace = _workspaces[token] = Workspace(team_id)
+    workspace.personas += 1
+    if workspace.personas > 1:
+        logger.info(f"Sharing Slack rate limits and reads for team {team_id} with {workspace.personas - 1} other personas")
+    return workspace
+
+
+def release(token: str) -> None:
+    workspace = _workspaces.get(token)
+    if workspace is None:
+        return
+    workspace.personas -= 1
+    if workspace.personas <= 0:
+        del _workspaces[token]
@@ -0,0 +1,39 @@
+import contextlib
+from typing import AsyncIterator, Tuple
+
+from slack_sdk.web.async_client import AsyncWebClient
+
+from slack_daily_summary import slack_daily_summary_fakeslack
+from slack_daily_summary import slack_daily_summary_fetch
+from slack_daily_summary import slack_daily_summary_store
+from slack_daily_summary import slack_daily_summary_channels
+
+UNTHROTTLED = {m: (600_000, 10_000) for m in slack_daily_summary_fetch.SLACK_METHOD_TIERS}
+
+
+def unthrottled_limiter() -> slack_daily_summary_fetch.SlackRateLimiter:
+    return slack_daily_summary_fetch.SlackRateLimiter(UNTHROTTLED)
+
+
+@contextlib.asynccontextmanager
+async def fake_slack(**workspace_args) -> AsyncIterator[Tuple[slack_daily_summary_fakeslack.FakeSlackServer, dict]]:
+    # A fake workspace plus everything the pipeline takes, over an in-memory store
+    workspace_args.setdefault("channels", 20)
+    workspace_args.setdefault("idle_fraction", 0.2)
+    workspace_args.setdefault("seed", 7)
+    server = slack_daily_summary_fakeslack.FakeSlackServer(slack_daily_summary_fakeslack.SyntheticWorkspace(**workspace_args))
+    url = await server.start()
+    slack_client = AsyncWebClient(token="xoxb-fake", base_url=url)
+    store = slack_daily_summary_store.SummaryStore(":memory:")
+    limiter = unthrottled_limiter()
+    try:
+        yield server, {
+            "limiter": limiter,
+            "store": store,
+            "channel_directory": slack_daily_summary_channels.ChannelDirectory(slack_client, store, limiter, discovery="all"),
+            "tz_name": "Asia/Kolkata",
+            "slack_client": slack_client,
+        }
+    finally:
+        store.close()
+        await server.stop()
@@ -0,0 +1,78 @@
+from slack_daily_summary import slack_daily_summary_channels
+from slack_daily_summary import slack_daily_summary_store
+
+DAY = 86400
+OLDEST = 1_700_000_000.0
+LATEST = OLDEST + DAY
+# Past the reprobe interval, so the channel is no longer skipped as idle
+IDLE_AGE = slack_daily_summary_channels.IDLE_REPROBE_SECONDS + 60
+
+
+def channel(**fields):
+    return {"id": "C1", "name": "general", "is_member": True, "num_members": 5, "created": OLDEST - 100 * DAY, "updated": 0, **fields}
+
+
+def synced_store(synced_until, latest_ts, synced_ago):
+    store = slack_daily_summary_store.SummaryStore(":memory:")
+    store.mark_synced("C1", "general", synced_until - 30 * DAY, synced_until, latest_ts)
+    with store.conn:
+        store.conn.execute("UPDATE channel_sync SET synced_at = synced_at - ?", (synced_ago,))
+    return store
+
+
+def planned(store, channels, idle_days=14):
+    return [c["id"] for c, _, _ in slack_daily_summary_channels.plan_history_fetches(channels, store, OLDEST, LATEST, idle_days=idle_days)]
+
+
+def test_channel_quiet_for_idle_days_is_skipped_until_its_reprobe():
+    store = synced_store(OLDEST - 2 * DAY, f"{OLDEST - 40 * DAY:.6f}", synced_ago=DAY)
+    try:
+        assert planned(store, [channel()]) == []
+        # 0 turns idle skipping off
+        assert planned(store, [channel()], idle_days=0) == ["C1"]
+    finally:
+        store.close()
+
+
+def test_channel_with_messages_within_idle_days_is_not_idle():
+    store = synced_store(OLDEST - 2 * DAY, f"{OLDEST - 3 * DAY:.6f}", synced_ago=DAY)
+    try:
+        assert planned(store, [channel()]) == ["C1"]
+    finally:
+        store.close()
+
+
+def test_channel_updated_within_the_range_is_not_idle():
+    store = synced_store(OLDEST - 2 * DAY, f"{OLDEST - 40 * DAY:.6f}", synced_ago=DAY)
+    try:
+        assert planned(store, [channel(updated=int((OLDEST + 60) * 1000))]) == ["C1"]
+    finally:
+        store.close()
+
+
+def test_never_synced_channel_is_fetched_and_empty_or_unjoined_ones_are_not():
+    store = slack_daily_summary_store.SummaryStore(":memory:")
+    try:
+        channels = [channel(), channel(id="C2", num_members=0), channel(id="C3", is_member=False)]
+        assert planned(store, channels) == ["C1"]
+    finally:
+        store.close()
+
+
+def test_reprobed_idle_channel_is_fetched_from_where_its_sync_stopped():
+    # Skipped as idle for two days, `updated` never moved although messages were posted
+    store = synced_store(OLDEST - 2 * DAY, f"{OLDEST - 40 * DAY:.6f}", synced_ago=IDLE_AGE)
+    try:
+        fetches = slack_daily_summary_channels.plan_history_fetches([channel()], store, OLDEST, LATEST, idle_days=14)
+        assert [(c["id"], o, l) for c, o, l in fetches] == [("C1", OLDEST - 2 * DAY, LATEST)]
+    finally:
+        store.close()
+
+
+def test_channel_synced_long_ago_is_fetched_for_the_range_only():
+    store = synced_store(OLDEST - 30 * DAY, None, synced_ago=30 * DAY)
+    try:
+        fetches = slack_daily_summary_channels.plan_history_fetches([channel()], store, OLDEST, LATEST, idle_days=14)
+        assert [(o, l) for _, o, l in fetches] == [(OLDEST, LATEST)]
+    finally:
+        store.close()
@@ -0,0 +1,157 @@
+import asyncio
+import time
+import types
+
+import pytest
+from slack_sdk.errors import SlackApiError
+
+from conftest import unthrottled_limiter
+from slack_daily_summary import slack_daily_summary_fetch
+from slack_daily_summary import slack_daily_summary_metrics
+
+
+def slack_error(status_code, headers=None):
+    response = types.SimpleNamespace(status_code=status_code, headers=headers or {}, data={"ok": False})
+    return SlackApiError("ratelimited" if status_code == 429 else "failed", response)
+
+
+class RateLimitedOnce:
+    def __init__(self):
+        self.calls = []
+
+    async def __call__(self, **kwargs):
+        self.calls.append(time.monotonic())
+        if len(self.calls) == 1:
+            raise slack_error(429, {"Retry-After": "1"})
+        return {"ok": True}
+
+
+def test_retry_after_is_read_from_429s_only():
+    assert slack_daily_summary_fetch.retry_after_seconds(slack_error(429, {"Retry-After": "7"})) == 7.0
+    assert slack_daily_summary_fetch.retry_after_seconds(slack_error(429, {"retry-after": "3"})) == 3.0
+    # Slack never asks for less than a second, a missing or zero header still backs off
+    assert slack_daily_summary_fetch.retry_after_seconds(slack_error(429, {"Retry-After": "0"})) == 1.0
+    assert slack_daily_summary_fetch.retry_after_seconds(slack_error(429)) == 1.0
+    assert slack_daily_summary_fetch.retry_after_seconds(slack_error(500, {"Retry-After": "7"})) is None
+
+
+def test_rate_limited_call_waits_retry_after_and_pauses_the_method_for_every_caller():
+    async def run():
+        limiter = unthrottled_limiter()
+        limited = RateLimitedOnce()
+        metrics = slack_daily_summary_metrics.RunMetrics()
+        slack_daily_summary_metrics.current_run.set(metrics)
+
+        async def ok(**kwargs):
+            return {"ok": True}
+
+        async def other_caller():
+            # Starts while the method is paused by the first caller's 429
+            await asyncio.sleep(0.1)
+            started = time.monotonic()
+            await limiter.call("conversations.history", ok)
+            return time.monotonic() - started
+
+        response, other_waited = await asyncio.gather(limiter.call("conversations.history", limited), other_caller())
+        assert response == {"ok": True}
+        assert limited.calls[1] - limited.calls[0] >= 1.0
+        assert limiter.paused_until["conversations.history"] <= time.monotonic()
+        assert metrics.api_retries["conversations.history"] == 1
+        assert metrics.rate_limit_wait["conversations.history"] == 1.0
+        assert other_waited >= 0.8
+
+    asyncio.run(run())
+
+
+def test_background_calls_spend_the_shared_budget_after_waiting_callers():
+    async def run():
+        limiter = slack_daily_summary_fetch.SlackRateLimiter({"conversations.history": (600, 1)})
+        background = limiter.scaled(1.0)
+        order = []
+
+        def caller(name):
+            async def fn(**kwargs):
+                order.append(name)
+                return {"ok": True}
+            return fn
+
+        await asyncio.gather(
+            *(limiter.call("conversations.history", caller("request")) for _ in range(3)),
+            *(background.call("conversations.history", caller("background")) for _ in range(3)),
+        )
+        assert order == ["request"] * 3 + ["background"] * 3
+        # Every background call also took a token of the shared bucket, on top of its own capped one
+        assert limiter.bucket("conversations.history").tokens < 1.0
+
+    asyncio.run(run())
+
+
+def test_rate_limited_call_gives_up_after_the_retry_limit(monkeypatch):
+    monkeypatch.setattr(slack_daily_summary_fetch, "MAX_RATE_LIMIT_RETRIES", 1)
+
+    async def always_limited(**kwargs):
+        calls.append(kwargs)
+        raise slack_error(429, {"Retry-After": "1"})
+
+    async def run():
+        with pytest.raises(SlackApiError):
+            await unthrottled_limiter().call("users.list", always_limited, limit=200)
+
+    calls = []
+    asyncio.run(run())
+    assert calls == [{"limit": 200}, {"limit": 200}]
+
+
+def test_other_slack_errors_are_not_retried():
+    async def failing(**kwargs):
+        calls.append(kwargs)
+        raise slack_error(200)
+
+    async def run():
+        with pytest.raises(SlackApiError):
+            await unthrottled_limiter().call("users.list", failing)
+
+    calls = []
+    asyncio.run(run())
+    assert len(calls) == 1
+
+
+class EndlessHistory:
+    # Every channel has another page, except one whose call fails with a bug rather than a Slack error
+    def __init__(self):
+        self.calls = 0
+
+    async def conversations_history(self, channel, **kwargs):
+        await asyncio.sleep(0)
+        if channel == "CBUG":
+            raise RuntimeError("bug")
+        self.calls += 1
+        return {"messages": [{"ts": "1.000000"}], "response_metadata": {"next_cursor": "more"}}
+
+
+def test_failed_fetch_stops_its_siblings():
+    async def run():
+        client = EndlessHistory()
+        fetches = [({"id": "C1"}, 0.0, 1.0), ({"id": "CBUG"}, 0.0, 1.0), ({"id": "C2"}, 0.0, 1.0)]
+        with pytest.raises(RuntimeError):
+            async for _ in slack_daily_summary_fetch.iter_channel_histories(client, fetches, unthrottled_limiter(), concurrency=3):
+                pass
+        calls = client.calls
+        await asyncio.sleep(0.05)
+        assert client.calls == calls
+        assert asyncio.all_tasks() == {asyncio.current_task()}
+
+    asyncio.run(run())
+
+
+def test_abandoned_iteration_stops_every_fetch():
+    async def run():
+        client = EndlessHistory()
+        fetches = [({"id": f"C{i}"}, 0.0, 1.0) for i in range(4)]
+        pages = slack_daily_summary_fetch.iter_channel_histories(client, fetches, unthrottled_limiter(), concurrency=2)
+        async for _ in pages:
+            break
+        await pages.aclose()
+        assert asyncio.all_tasks() == {asyncio.current_task()}
+
+    asyncio.run(run())
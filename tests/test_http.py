@@ -0,0 +1,22 @@
+import asyncio
+import json
+
+from conftest import fake_slack
+from slack_daily_summary import slack_daily_summary_http
+from slack_daily_summary import slack_daily_summary_metrics
+
+
+def test_bytes_received_counts_the_decoded_body_of_a_gzipped_response():
+    async def scenario():
+        async with fake_slack() as (server, ctx):
+            slack_client = slack_daily_summary_http.web_client("xoxb-fake", base_url=ctx["slack_client"].base_url)
+            metrics = slack_daily_summary_metrics.RunMetrics()
+            slack_daily_summary_metrics.current_run.set(metrics)
+            try:
+                response = await slack_client.conversations_list(limit=1000)
+            finally:
+                await slack_daily_summary_http.close_shared_sessions()
+            assert response.headers.get("Content-Encoding") == "gzip"
+            assert metrics.bytes_received == len(json.dumps(response.data).encode())
+
+    asyncio.run(scenario())
@@ -0,0 +1,208 @@
+import asyncio
+import time
+import types
+from datetime import datetime, timedelta
+
+from slack_daily_summary import slack_daily_summary_digests
+from slack_daily_summary import slack_daily_summary_fakeslack
+from slack_daily_summary import slack_daily_summary_pipeline
+from slack_daily_summary import slack_daily_summary_rollups
+
+from conftest import fake_slack
+
+
+def run_digests(ctx, digests, **kwargs):
+    ctx = dict(ctx)
+    slack_client = ctx.pop("slack_client")
+    return slack_daily_summary_pipeline.generate_summaries(slack_client, "UBOT", digests, **ctx, **kwargs)
+
+
+def job_of(ctx, digest):
+    windows, _ = slack_daily_summary_rollups.resolve_days(None, None, ctx["tz_name"])
+    key = slack_daily_summary_pipeline.digest_job_key(windows, ctx["tz_name"], digest)
+    return key, ctx["store"].get_job(key)
+
+
+def test_posted_summary_is_not_posted_again():
+    async def scenario():
+        async with fake_slack() as (server, ctx):
+            digest = slack_daily_summary_digests.default_digest("bob-testing")
+            [first] = await run_digests(ctx, [digest])
+            assert first.summary_text and not first.already_posted
+            _, job = job_of(ctx, digest)
+            assert job["state"] == slack_daily_summary_pipeline.JOB_POSTED
+            assert job["message_ts"] == server.posted[0]["ts"]
+
+            history_calls = server.calls["conversations.history"]
+            [again] = await run_digests(ctx, [digest])
+            assert again.already_posted and again.summary_text == first.summary_text
+            assert len(server.posted) == 1
+            assert server.calls["conversations.history"] == history_calls
+
+    asyncio.run(scenario())
+
+
+def test_interrupted_post_that_reached_slack_is_found_instead_of_posted_again():
+    async def scenario():
+        async with fake_slack() as (server, ctx):
+            digest = slack_daily_summary_digests.default_digest("bob-testing")
+            await run_digests(ctx, [digest])
+            # The response to chat.postMessage was lost, the job never left JOB_POSTING
+            key, _ = job_of(ctx, digest)
+            ctx["store"].set_job_state(key, slack_daily_summary_pipeline.JOB_POSTING)
+
+            [result] = await run_digests(ctx, [digest])
+            assert result.already_posted
+            assert len(server.posted) == 1
+            _, job = job_of(ctx, digest)
+            assert job["state"] == slack_daily_summary_pipeline.JOB_POSTED
+            assert job["message_ts"] == server.posted[0]["ts"]
+
+    asyncio.run(scenario())
+
+
+def test_interrupted_post_that_never_reached_slack_is_posted():
+    async def scenario():
+        async with fake_slack() as (server, ctx):
+            digest = slack_daily_summary_digests.default_digest("bob-testing")
+            key, _ = job_of(ctx, digest)
+            ctx["store"].set_job_state(key, slack_daily_summary_pipeline.JOB_POSTING, "stale")
+
+            [result] = await run_digests(ctx, [digest])
+            assert not result.already_posted
+            assert len(server.posted) == 1
+            assert job_of(ctx, digest)[1]["state"] == slack_daily_summary_pipeline.JOB_POSTED
+
+    asyncio.run(scenario())
+
+
+def test_named_digests_are_posted_once_each():
+    async def scenario():
+        async with fake_slack() as (server, ctx):
+            digests = [
+                slack_daily_summary_digests.Digest("low", "bob-testing", include=["channel-1*"]),
+                slack_daily_summary_digests.Digest("high", "bob-testing", include=["channel-2*"]),
+            ]
+            results = await run_digests(ctx, digests)
+            assert [r.already_posted for r in results] == [False, False]
+            assert len(server.posted) == 2
+
+            results = await run_digests(ctx, digests)
+            assert [r.already_posted for r in results] == [True, True]
+            assert len(server.posted) == 2
+
+    asyncio.run(scenario())
+
+
+def test_precomputed_summary_is_recomputed_and_posted_without_realtime():
+    async def scenario():
+        async with fake_slack() as (server, ctx):
+            digest = slack_daily_summary_digests.default_digest("bob-testing")
+            ctx = dict(ctx)
+            slack_client = ctx.pop("slack_client")
+            store = ctx.pop("store")
+            await slack_daily_summary_pipeline.precompute_summaries(slack_client, "UBOT", [digest], store, **ctx)
+            ctx.update(store=store, slack_client=slack_client)
+            assert job_of(ctx, digest)[1]["state"] == slack_daily_summary_pipeline.JOB_AGGREGATED
+
+            [result] = await run_digests(ctx, [digest])
+            assert not result.already_posted
+            assert len(server.posted) == 1
+            assert job_of(ctx, digest)[1]["state"] == slack_daily_summary_pipeline.JOB_POSTED
+
+    asyncio.run(scenario())
+
+
+def test_precomputed_summary_is_recomputed_once_a_carried_over_question_is_answered():
+    async def scenario():
+        async with fake_slack() as (server, ctx):
+            digest = slack_daily_summary_digests.default_digest("bob-testing", top_n=3)
+            channel_id = server.workspace.channels[0]["id"]
+            # Asked a few days before the summarized one, carried over from the store
+            question = {"type": "message", "ts": f"{server.workspace.day_start - 3 * 86400:.6f}", "user": "U0000001", "text": "who owns the deploy?"}
+            ctx["store"].upsert_messages(channel_id, [question])
+            realtime = types.SimpleNamespace(connected_since=0.0, live_until=time.time)
+            ctx = dict(ctx, realtime=realtime)
+            slack_client = ctx.pop("slack_client")
+            store = ctx.pop("store")
+            [precomputed] = await slack_daily_summary_pipeline.precompute_summaries(slack_client, "UBOT", [digest], store, **ctx)
+            assert "who owns the deploy?" in precomputed.summary_text
+
+            # Answered with a reaction after the precompute, realtime only updates the stored message
+            store.add_reactions(channel_id, question["ts"], 1)
+            ctx.update(store=store, slack_client=slack_client)
+            [result] = await run_digests(ctx, [digest])
+            assert "who owns the deploy?" not in result.summary_text
+            assert server.posted[0]["text"] == result.summary_text
+
+    asyncio.run(scenario())
+
+
+def test_default_job_is_not_taken_for_a_named_digest_post_in_the_same_channel():
+    async def scenario():
+        async with fake_slack() as (server, ctx):
+            default = slack_daily_summary_digests.default_digest("bob-testing")
+            named = slack_daily_summary_digests.Digest("eng", "bob-testing")
+            await run_digests(ctx, [named])
+            assert len(server.posted) == 1
+
+            # The default recap's post was interrupted before it reached Slack
+            windows, _ = slack_daily_summary_rollups.resolve_days(None, None, ctx["tz_name"])
+            key = slack_daily_summary_pipeline.digest_job_key(windows, ctx["tz_name"], default)
+            ctx["store"].set_job_state(key, slack_daily_summary_pipeline.JOB_POSTING, "stale")
+
+            results = await run_digests(ctx, [default, named])
+            by_name = {r.digest.name: r for r in results}
+            assert not by_name["default"].already_posted
+            assert by_name["eng"].already_posted
+            assert len(server.posted) == 2
+            assert server.posted[1]["text"].split("\n", 1)[0] == "📊 Daily Slack Recap (Yesterday)"
+
+    asyncio.run(scenario())
+
+
+def test_precompute_is_not_redone_once_every_digest_has_a_cached_summary():
+    async def scenario():
+        async with fake_slack() as (server, ctx):
+            ctx = dict(ctx)
+            slack_client = ctx.pop("slack_client")
+            store = ctx.pop("store")
+            digests = [slack_daily_summary_digests.default_digest("bob-testing")]
+            first = await slack_daily_summary_pipeline.precompute_summaries(slack_client, "UBOT", digests, store, **ctx)
+            assert first and first[0].summary_text
+            calls = sum(server.calls.values())
+
+            # A restart later that day
+            assert await slack_daily_summary_pipeline.precompute_summaries(slack_client, "UBOT", digests, store, **ctx) == []
+            assert sum(server.calls.values()) == calls
+
+    asyncio.run(scenario())
+
+
+def test_thread_parents_are_reread_within_the_history_fetch():
+    async def scenario():
+        ist = slack_daily_summary_fakeslack.IST
+        yesterday = datetime.now(ist).date() - timedelta(days=1)
+        day_before = datetime.combine(yesterday - timedelta(days=1), datetime.min.time(), tzinfo=ist)
+        async with fake_slack(day=day_before, idle_fraction=0.0) as (server, ctx):
+            digest = slack_daily_summary_digests.default_digest("bob-testing")
+            await run_digests(ctx, [digest], start_date=day_before.date().isoformat(), end_date=day_before.date().isoformat(), post=False)
+
+            # A thread from the day before gets another reply yesterday, only its parent in history shows it
+            (channel_id, thread_ts), replies = next(iter(server.workspace.replies.items()))
+            parent = next(m for m in server.workspace.messages[channel_id] if m["ts"] == thread_ts)
+            late = {"type": "message", "ts": f"{day_before.timestamp() + 86400 + 600:.6f}", "thread_ts": thread_ts, "user": "U0000001", "text": "late reply"}
+            replies.append(late)
+            parent["reply_count"] += 1
+            parent["latest_reply"] = late["ts"]
+
+            history_calls = server.calls["conversations.history"]
+            await run_digests(ctx, [digest], post=False)
+            fetched = len([c for c in server.workspace.channels if server.workspace.messages[c["id"]]])
+            assert server.calls["conversations.history"] - history_calls == fetched
+            stored = ctx["store"].conn.execute(
+                "SELECT COUNT(*) FROM thread_replies WHERE channel_id = ? AND ts = ?", (channel_id, late["ts"]),
+            ).fetchone()[0]
+            assert stored == 1
+
+    asyncio.run(scenario())
@@ -0,0 +1,25 @@
+import argparse
+import asyncio
+import json
+from datetime import datetime, timezone
+
+from slack_daily_summary import slack_daily_summary_replay
+
+
+def test_capture_messages_outside_the_range_are_not_loaded(tmp_path):
+    capture = tmp_path / "capture.jsonl"
+    lines = [{"kind": "channel", "channel": {"id": "C1", "name": "general"}}]
+    # One message a day for two months, the recap and its lookback need about ten of them
+    for day in range(1, 61):
+        ts = datetime(2024, 1, 1, 12, tzinfo=timezone.utc).timestamp() + (day - 1) * 86400
+        lines.append({"kind": "message", "channel": "C1", "message": {"type": "message", "ts": f"{ts:.6f}", "user": "U1", "text": "hello"}})
+    capture.write_text("\n".join(json.dumps(line) for line in lines))
+
+    args = argparse.Namespace(
+        source=str(capture), start_date="2024-01-31", end_date=None, timezone="UTC", digests=None, top_n=1,
+        exclude_user=None, thread_lookback_days=7, baseline_days=0, store=None, processes=1,
+    )
+    report = asyncio.run(slack_daily_summary_replay.replay(args))
+    assert report["recaps"]["default"].endswith("📈 1 messages · 1 active members")
+    # Jan 23 (lookback and a day of margin) to Feb 1
+    assert report["metrics"]["counters"]["messages_loaded"] == 10
@@ -0,0 +1,102 @@
+import asyncio
+import json
+
+from slack_daily_summary import slack_daily_summary_aggregate
+from slack_daily_summary import slack_daily_summary_digests
+from slack_daily_summary import slack_daily_summary_rollups
+from slack_daily_summary import slack_daily_summary_store
+
+TZ = "UTC"
+SCOPE = slack_daily_summary_digests.scope_key([slack_daily_summary_digests.default_digest("")])
+
+
+def test_top_thread_merge_sums_replies_across_days():
+    merged = slack_daily_summary_aggregate.TopThread()
+    merged.merge([["100.0", 10, "spanning thread"]])
+    merged.merge([["100.0", 10, "spanning thread"], ["200.0", 15, "one day thread"]])
+    assert merged.result()[:2] == [
+        {"text": "spanning thread", "reply_count": 20},
+        {"text": "one day thread", "reply_count": 15},
+    ]
+
+
+def test_top_thread_outside_each_days_top_can_lead_the_merge():
+    days = []
+    for day in range(2):
+        acc = slack_daily_summary_aggregate.TopThread()
+        for i in range(slack_daily_summary_aggregate.MAX_LEADERBOARD):
+            acc.add_thread(f"{day}{i:02d}.0", 10, "busy that day")
+        acc.add_thread("1.0", 9, "steady thread")
+        days.append(acc.state())
+    merged = slack_daily_summary_aggregate.TopThread()
+    for state in days:
+        merged.merge(state)
+    assert merged.result()[0] == {"text": "steady thread", "reply_count": 18}
+
+
+def test_top_thread_counts_a_thread_once_within_a_window():
+    acc = slack_daily_summary_aggregate.TopThread()
+    acc.add_thread("100.0", 3, "thread")
+    acc.add_thread("100.0", 5, "thread")
+    assert acc.result() == [{"text": "thread", "reply_count": 5}]
+
+
+def test_leaderboard_with_one_entry_keeps_the_singular_heading():
+    results = {"top_thread": [{"text": "only thread", "reply_count": 4}], "most_helpful_user": [("U1", 3), ("U2", 2)]}
+    lines = slack_daily_summary_aggregate.format_summary(results, {"U1": "ann", "U2": "bo"}, top_n=3).split("\n")
+    assert '🔥 Top thread: "only thread" (4 replies)' in lines
+    assert lines[-3:] == ["⭐ Shoutouts:", "   1. @ann (3 reactions)", "   2. @bo (2 reactions)"]
+
+
+def test_multi_day_range_merges_stored_rollups():
+    windows, _ = slack_daily_summary_rollups.resolve_days("2024-03-01", "2024-03-02", TZ)
+    day1, day2 = windows
+    parent_ts = f"{day1.oldest + 60:.6f}"
+    store = slack_daily_summary_store.SummaryStore(":memory:")
+    try:
+        store.upsert_messages("C1", [{"ts": parent_ts, "user": "U1", "text": "spanning thread", "reply_count": 20, "thread_ts": parent_ts}])
+        replies = [{"ts": f"{w.oldest + 120 + i:.6f}", "user": "U2"} for w in windows for i in range(10)]
+        store.save_thread_replies("C1", parent_ts, replies, replies[-1]["ts"])
+        channel_names = {"C1": "general"}
+        for w in windows:
+            store.save_rollups(w.day, TZ, SCOPE, slack_daily_summary_rollups.compute_rollups(store, w, channel_names))
+
+        merged = asyncio.run(slack_daily_summary_rollups.merge_scoped_rollups(store, TZ, SCOPE, windows, {}, {"": channel_names}))
+        assert merged[""]["top_thread"][0] == {"text": "spanning thread", "reply_count": 20}
+
+        one_day = asyncio.run(slack_daily_summary_rollups.merge_scoped_rollups(store, TZ, SCOPE, [day2], {}, {"": channel_names}))
+        assert one_day[""]["top_thread"][0]["reply_count"] == 10
+    finally:
+        store.close()
+
+
+def test_rollups_of_different_digest_scopes_do_not_replace_each_other():
+    narrow = slack_daily_summary_digests.parse_digests(json.dumps([{"name": "eng", "target_channel": "eng", "include": ["eng-*"]}]), "general")
+    narrow_scope = slack_daily_summary_digests.scope_key(narrow)
+    assert narrow_scope != SCOPE
+    store = slack_daily_summary_store.SummaryStore(":memory:")
+    try:
+        store.save_rollups("2024-03-01", TZ, SCOPE, {"C1": {}, "C2": {}})
+        store.save_rollups("2024-03-01", TZ, narrow_scope, {"C2": {}})
+        assert set(store.complete_rollup_days(TZ, SCOPE, ["2024-03-01"])) == {"2024-03-01"}
+        assert [c for _, c, _ in store.iter_rollups(TZ, SCOPE, ["2024-03-01"])] == ["C1", "C2"]
+        assert [c for _, c, _ in store.iter_rollups(TZ, narrow_scope, ["2024-03-01"])] == ["C2"]
+
+        # A late edit changes what every scope saw
+        store.invalidate_rollup_days(TZ, ["2024-03-01"])
+        assert not store.complete_rollup_days(TZ, SCOPE, ["2024-03-01"])
+        assert not store.complete_rollup_days(TZ, narrow_scope, ["2024-03-01"])
+    finally:
+        store.close()
+
+
+def test_backfilled_messages_invalidate_the_days_they_were_posted_on():
+    windows, _ = slack_daily_summary_rollups.resolve_days("2024-03-01", "2024-03-02", TZ)
+    store = slack_daily_summary_store.SummaryStore(":memory:")
+    try:
+        for w in windows:
+            store.save_rollups(w.day, TZ, SCOPE, {})
+        slack_daily_summary_rollups.invalidate_at(store, windows[0].oldest + 60, windows[0].oldest + 120)
+        assert list(store.complete_rollup_days(TZ, SCOPE, [w.day for w in windows])) == ["2024-03-02"]
+    finally:
+        store.close()
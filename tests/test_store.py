@@ -0,0 +1,29 @@
+from slack_daily_summary import slack_daily_summary_store
+
+
+def test_deleted_reply_comes_off_its_parent_and_synced_thread():
+    store = slack_daily_summary_store.SummaryStore(":memory:")
+    try:
+        parent = {"type": "message", "ts": "100.000000", "user": "U1", "text": "deploy?", "thread_ts": "100.000000", "reply_count": 2, "latest_reply": "300.000000"}
+        replies = [
+            {"type": "message", "ts": "200.000000", "thread_ts": "100.000000", "user": "U2", "text": "yes"},
+            {"type": "message", "ts": "300.000000", "thread_ts": "100.000000", "user": "U3", "text": "done"},
+        ]
+        store.upsert_messages("C1", [parent])
+        store.save_thread_replies("C1", "100.000000", replies, "300.000000")
+        assert not store.stale_threads(0, 0, 1000)
+
+        store.delete_message("C1", "300.000000", "100.000000")
+        row = store.conn.execute("SELECT reply_count, latest_reply FROM messages WHERE ts = '100.000000'").fetchone()
+        assert (row["reply_count"], row["latest_reply"]) == (1, "200.000000")
+        # Still in sync, nothing to fetch again
+        assert not store.stale_threads(0, 0, 1000)
+
+        # Without the thread_ts of the deleted message, the stored reply tells which parent it belonged to
+        store.delete_message("C1", "200.000000")
+        row = store.conn.execute("SELECT reply_count, latest_reply FROM messages WHERE ts = '100.000000'").fetchone()
+        assert (row["reply_count"], row["latest_reply"]) == (0, None)
+        assert store.conn.execute("SELECT COUNT(*) FROM threads").fetchone()[0] == 0
+        assert [r["ts_num"] for r in store.open_questions(0, 1000)] == [100.0]
+    finally:
+        store.close()
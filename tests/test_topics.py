@@ -0,0 +1,57 @@
+import asyncio
+from datetime import date, timedelta
+
+from conftest import fake_slack
+from slack_daily_summary import slack_daily_summary_digests
+from slack_daily_summary import slack_daily_summary_pipeline
+from slack_daily_summary import slack_daily_summary_rollups
+
+BASELINE_DAYS = 10
+
+
+def day_messages(day_start, channel, texts):
+    return [{"type": "message", "ts": f"{day_start + 60 * (i + 1):.6f}", "user": f"U{channel}{i % 7}", "text": t} for i, t in enumerate(texts)]
+
+
+def trending_line(text):
+    return next((line for line in (text or "").split("\n") if line.startswith("🔎 Trending")), None)
+
+
+def test_each_digest_trends_against_its_own_channels():
+    async def scenario():
+        async with fake_slack(channels=2, idle_fraction=1.0) as (server, ctx):
+            windows, _ = slack_daily_summary_rollups.resolve_days(None, None, ctx["tz_name"])
+            yesterday = date.fromisoformat(windows[0].day)
+            small, big = (c["id"] for c in server.workspace.channels[:2])
+            messages = {small: [], big: []}
+            for back in range(BASELINE_DAYS, -1, -1):
+                day = (yesterday - timedelta(days=back)).isoformat()
+                [window], _ = slack_daily_summary_rollups.resolve_days(day, day, ctx["tz_name"])
+                # A small team that always talks about kubernetes, in a workspace that never does
+                small_texts = ["kubernetes rollout going fine"] * 5
+                big_texts = ["quarterly revenue numbers look good"] * 100
+                if back == 0:
+                    small_texts += ["incident postmortem draft ready"] * 4
+                messages[small] += day_messages(window.oldest, "S", small_texts)
+                messages[big] += day_messages(window.oldest, "B", big_texts)
+            for channel_id, msgs in messages.items():
+                server.workspace.messages[channel_id] = list(reversed(msgs))
+
+            digests = [
+                slack_daily_summary_digests.Digest("small", "bob-testing", include=["channel-0"]),
+                slack_daily_summary_digests.Digest("everyone", "bob-testing"),
+            ]
+            ctx = dict(ctx)
+            slack_client = ctx.pop("slack_client")
+            first = (yesterday - timedelta(days=BASELINE_DAYS)).isoformat()
+            last = (yesterday - timedelta(days=1)).isoformat()
+            await slack_daily_summary_pipeline.generate_summaries(
+                slack_client, "UBOT", digests, start_date=first, end_date=last, post=False, **ctx,
+            )
+            results = await slack_daily_summary_pipeline.generate_summaries(slack_client, "UBOT", digests, post=False, **ctx)
+            by_name = {r.digest.name: trending_line(r.summary_text) for r in results}
+            # Against the workspace's vocabulary kubernetes and rollout would trend every day
+            assert by_name["small"] == "🔎 Trending: draft, incident, postmortem, ready"
+            assert "kubernetes" not in (by_name["everyone"] or "")
+
+    asyncio.run(scenario())